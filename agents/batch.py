@@ -0,0 +1,233 @@
+import argparse
+import itertools
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import agents.discovery as discovery
+from agents.claude_client import ClaudeAPIError, get_claude_client
+from agents.consultant_cache import get_consultant_cache
+from agents.creative import WorldClassBusinessConsultant
+from agents.log import get_logger, request_context
+from agents.models import DiscoveryProfile
+from agents.urls import normalize_target_url
+
+# Sites crawled at once while building the profiles; each crawl has its own page pool
+BATCH_DISCOVERY_WORKERS = int(os.getenv('BATCH_DISCOVERY_WORKERS', '8'))
+# Seconds between status checks, and how long to wait for the batch to end (the API
+# expires unfinished batches after 24 hours)
+BATCH_POLL_INTERVAL = float(os.getenv('BATCH_POLL_INTERVAL', '30'))
+BATCH_MAX_WAIT = float(os.getenv('BATCH_MAX_WAIT', str(24 * 3600)))
+
+PROMPT_COMPANY = re.compile(r'^Company: (.*)$', re.M)
+PROMPT_INDUSTRY = re.compile(r'^Industry: (.*)$', re.M)
+
+logger = get_logger(__name__)
+
+class LocalBatchAPI:
+    """In-process stand-in for the Message Batches API, for tests and offline runs.
+
+    Has the same create_batch / get_batch / batch_results methods as ClaudeClient.
+    `respond(custom_id, params)` returns the reply text, or raises to mark that
+    request errored; a batch reports `in_progress` until `delay` seconds have passed.
+    """
+
+    def __init__(self, respond, delay=0.0):
+        self.respond = respond
+        self.delay = delay
+        self._ids = itertools.count(1)
+        self._batches = {}
+        self._lock = threading.Lock()
+
+    def create_batch(self, requests):
+        results = []
+        for request in requests:
+            try:
+                text = self.respond(request['custom_id'], request['params'])
+                result = {'type': 'succeeded', 'message': {
+                    'type': 'message', 'role': 'assistant', 'model': request['params'].get('model'),
+                    'content': [{'type': 'text', 'text': text}], 'stop_reason': 'end_turn',
+                }}
+            except Exception as e:
+                result = {'type': 'errored', 'error': {'type': 'api_error', 'message': str(e)}}
+            results.append({'custom_id': request['custom_id'], 'result': result})
+        with self._lock:
+            batch_id = f"msgbatch_local_{next(self._ids)}"
+            self._batches[batch_id] = (results, time.time() + self.delay)
+        return self.get_batch(batch_id)
+
+    def get_batch(self, batch_id):
+        with self._lock:
+            results, ends_at = self._batches[batch_id]
+        ended = time.time() >= ends_at
+        counts = Counter(entry['result']['type'] for entry in results) if ended else Counter()
+        return {
+            'id': batch_id, 'type': 'message_batch',
+            'processing_status': 'ended' if ended else 'in_progress',
+            'request_counts': {
+                'processing': 0 if ended else len(results), 'succeeded': counts['succeeded'],
+                'errored': counts['errored'], 'canceled': 0, 'expired': 0,
+            },
+            'results_url': f"local://{batch_id}/results" if ended else None,
+        }
+
+    def batch_results(self, batch):
+        with self._lock:
+            results, _ = self._batches[batch['id']]
+        return iter(results)
+
+def offline_responder(consultant):
+    """Stand-in consultant answers: the company-specific template for each prompt's company"""
+    def respond(custom_id, params):
+        prompt = params['messages'][0]['content']
+        company = PROMPT_COMPANY.search(prompt)
+        industry = PROMPT_INDUSTRY.search(prompt)
+        return consultant._create_company_specific_analysis(
+            DiscoveryProfile(company_name=company.group(1) if company else 'Target Company'),
+            industry.group(1) if industry else 'professional services',
+        )
+    return respond
+
+def read_urls(path):
+    """Target URLs from a file, one per line; blank lines and # comments are skipped"""
+    with open(path, encoding='utf-8') as f:
+        lines = [line.strip() for line in f]
+    urls = [normalize_target_url(line) for line in lines if line and not line.startswith('#')]
+    return list(dict.fromkeys(urls))
+
+def discover(url):
+    """One site's discovery profile, its log lines tagged with the URL"""
+    with request_context(url):
+        return discovery.analyze(url)
+
+def discover_all(urls, workers=BATCH_DISCOVERY_WORKERS):
+    """Discovery profiles for every URL, in input order, at most `workers` crawls at a time"""
+    profiles = [None] * len(urls)
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='batch-discovery') as executor:
+        futures = {executor.submit(discover, url): i for i, url in enumerate(urls)}
+        for done, future in enumerate(as_completed(futures), 1):
+            i = futures[future]
+            profiles[i] = future.result()
+            logger.info("Discovery %d/%d: %s", done, len(urls), urls[i])
+    return profiles
+
+def submit_and_wait(api, requests, poll_interval=BATCH_POLL_INTERVAL, max_wait=BATCH_MAX_WAIT):
+    """Submit the requests as one batch and poll until it ends.
+
+    Returns {custom_id: reply text} for the requests that succeeded; errored,
+    expired and cancelled ones are left out.
+    """
+    batch = api.create_batch(requests)
+    logger.info("Submitted batch %s with %d consultant prompts", batch['id'], len(requests))
+    deadline = time.time() + max_wait
+    while batch.get('processing_status') != 'ended':
+        if time.time() >= deadline:
+            raise ClaudeAPIError(f"batch {batch['id']} still {batch.get('processing_status')} after {max_wait:g}s")
+        time.sleep(poll_interval)
+        batch = api.get_batch(batch['id'])
+        counts = batch.get('request_counts', {})
+        logger.info("Batch %s: %d processing, %d succeeded, %d errored", batch['id'],
+                    counts.get('processing', 0), counts.get('succeeded', 0), counts.get('errored', 0))
+
+    replies = {}
+    for entry in api.batch_results(batch):
+        result = entry.get('result', {})
+        if result.get('type') == 'succeeded':
+            content = result.get('message', {}).get('content', [])
+            replies[entry['custom_id']] = ''.join(block.get('text', '') for block in content)
+        else:
+            error = result.get('error', {}).get('message', '')
+            logger.warning("Batch request %s %s %s", entry.get('custom_id'), result.get('type'), error)
+    return replies
+
+def run_batch(urls, api=None, workers=BATCH_DISCOVERY_WORKERS, poll_interval=BATCH_POLL_INTERVAL,
+              max_wait=BATCH_MAX_WAIT):
+    """Consultant analyses for a list of sites, with one Message Batches job for all prompts.
+
+    Profiles already in the consultant cache skip the batch, and identical prompts
+    are sent once. Requests the batch couldn't answer get the fallback analysis.
+    Returns one record per URL, in input order.
+    """
+    api = api if api is not None else get_claude_client()
+    consultant = WorldClassBusinessConsultant()
+    cache = get_consultant_cache()
+    profiles = discover_all(urls, workers)
+
+    records = []
+    pending = []  # (record, custom_id, cache key, industry) still waiting for the batch
+    requests = []
+    custom_ids = {}  # prompt -> custom_id
+    for url, profile in zip(urls, profiles):
+        prompt, industry_context, prompt_fields = consultant.build_prompt(profile)
+        record = {'url': url, 'company_name': profile.company_name, 'source': None,
+                  'analysis': None, 'discovery': profile}
+        records.append(record)
+        cache_key = consultant.cache_key(cache, prompt_fields) if cache else None
+        cached_analysis = cache.get(cache_key) if cache else None
+        if cached_analysis:
+            record.update(source='cache', analysis=cached_analysis)
+            continue
+        if prompt not in custom_ids:
+            custom_ids[prompt] = f"company-{len(requests)}"
+            requests.append({'custom_id': custom_ids[prompt], 'params': consultant.build_payload(prompt)})
+        pending.append((record, custom_ids[prompt], cache_key, industry_context))
+
+    replies = {}
+    if requests:
+        try:
+            replies = submit_and_wait(api, requests, poll_interval, max_wait)
+        except ClaudeAPIError as e:
+            logger.warning("Batch failed, using fallback analyses: %s", e)
+
+    for record, custom_id, cache_key, industry_context in pending:
+        analysis = replies.get(custom_id, '')
+        if len(analysis.strip()) > 300:
+            record.update(source='batch', analysis=analysis)
+            if cache:
+                cache.put(cache_key, analysis, consultant.claude_model)
+        else:
+            fallback = consultant._create_company_specific_analysis(record['discovery'], industry_context)
+            record.update(source='fallback', analysis=fallback)
+
+    for record in records:
+        record['strategy'] = consultant.format_world_class_output(record['analysis'], record['discovery'])
+        record['discovery'] = record['discovery'].to_dict()
+    sources = Counter(record['source'] for record in records)
+    logger.info("Batch analysis complete: %d from the batch, %d cached, %d fallback",
+                sources['batch'], sources['cache'], sources['fallback'])
+    return records
+
+def write_results(records, path):
+    """One JSON object per line"""
+    with open(path, 'w', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analyze a list of company sites with one Message Batches job.")
+    parser.add_argument('urls', help="file with one URL per line")
+    parser.add_argument('--out', default='batch_results.jsonl', help="JSONL file to write (default: %(default)s)")
+    parser.add_argument('--workers', type=int, default=BATCH_DISCOVERY_WORKERS,
+                        help="sites crawled at once (default: %(default)s)")
+    parser.add_argument('--poll-interval', type=float, default=BATCH_POLL_INTERVAL,
+                        help="seconds between batch status checks (default: %(default)s)")
+    parser.add_argument('--offline', action='store_true',
+                        help="answer prompts with a local stand-in instead of the API")
+    args = parser.parse_args(argv)
+
+    urls = read_urls(args.urls)
+    if not urls:
+        print(" No URLs to analyze")
+        return 1
+    api = LocalBatchAPI(offline_responder(WorldClassBusinessConsultant())) if args.offline else None
+    records = run_batch(urls, api=api, workers=args.workers, poll_interval=args.poll_interval)
+    write_results(records, args.out)
+    print(f" Wrote {len(records)} results to {args.out}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,138 @@
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import agents.pipeline as pipeline
+from agents.log import request_context
+from agents.urls import normalize_target_url
+
+# Sites analyzed at once; each runs up to two agents on the orchestrator's pool, so
+# keep AGENT_WORKERS at about twice this
+BULK_WORKERS = int(os.getenv('BULK_WORKERS', '4'))
+
+class Checkpoint:
+    """URLs already written out, kept in SQLite so a long run can resume without
+    holding the list in memory"""
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('CREATE TABLE IF NOT EXISTS done (url TEXT PRIMARY KEY, status TEXT, finished_at REAL)')
+        self.conn.commit()
+
+    def __contains__(self, url):
+        return self.conn.execute('SELECT 1 FROM done WHERE url = ?', (url,)).fetchone() is not None
+
+    def mark(self, url, status):
+        self.conn.execute('INSERT OR REPLACE INTO done (url, status, finished_at) VALUES (?, ?, ?)',
+                          (url, status, time.time()))
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+def iter_urls(lines):
+    """Target URLs from lines of text, read lazily; blank lines and # comments are skipped"""
+    for line in lines:
+        line = line.strip()
+        if line and not line.startswith('#'):
+            yield normalize_target_url(line)
+
+def analyze(url, cancel_event=None):
+    """One JSON-ready record for a site, or None when the run was interrupted"""
+    started = time.time()
+    try:
+        with request_context(url):
+            outcome = pipeline.run(url, cancel_event=cancel_event)
+    except Exception as e:
+        return {'url': url, 'status': 'failed', 'error': str(e), 'elapsed': round(time.time() - started, 3)}
+    if cancel_event is not None and cancel_event.is_set():
+        return None
+    record = {'url': url, 'status': 'done' if outcome.complete else 'partial'}
+    record.update(pipeline.summarize(outcome))
+    if outcome.errors:
+        record['errors'] = outcome.errors
+    record['elapsed'] = round(time.time() - started, 3)
+    return record
+
+def run_bulk(urls, out, workers=BULK_WORKERS, checkpoint=None):
+    """Analyze every URL, `workers` sites at a time, writing a JSON line to `out` as each finishes.
+
+    `urls` is consumed lazily and at most twice `workers` sites are in flight, so
+    memory stays flat however long the list is. URLs already in `checkpoint` are
+    skipped and each written record is added to it. A record can be written twice
+    if the run dies between writing it and checkpointing it, never lost. Returns
+    counts by status.
+    """
+    counts = Counter()
+    cancel_event = threading.Event()
+    urls = iter(urls)
+    running = {}
+    exhausted = False
+    executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='bulk')
+    try:
+        while True:
+            while not exhausted and len(running) < 2 * workers:
+                url = next(urls, None)
+                if url is None:
+                    exhausted = True
+                elif checkpoint is not None and url in checkpoint:
+                    counts['skipped'] += 1
+                else:
+                    running[executor.submit(analyze, url, cancel_event)] = url
+            if not running:
+                break
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                del running[future]
+                record = future.result()
+                if record is None:
+                    continue
+                out.write(json.dumps(record, ensure_ascii=False) + '\n')
+                out.flush()
+                if checkpoint is not None:
+                    checkpoint.mark(record['url'], record['status'])
+                counts[record['status']] += 1
+    except BaseException:
+        # Interrupted: abandon the sites in flight; they aren't checkpointed, so a resumed run redoes them
+        cancel_event.set()
+        raise
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+    return counts
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run discovery, strategy and campaign for a list of sites, "
+                                                 "writing one JSON line per site to stdout as each finishes.")
+    parser.add_argument('urls', nargs='?', default='-', help="file with one URL per line, or - for stdin (default)")
+    parser.add_argument('--workers', type=int, default=BULK_WORKERS, help="sites analyzed at once (default: %(default)s)")
+    parser.add_argument('--checkpoint', help="SQLite file recording finished URLs; rerun with the same file to resume")
+    args = parser.parse_args(argv)
+
+    out = sys.stdout
+    checkpoint = Checkpoint(args.checkpoint) if args.checkpoint else None
+    source = sys.stdin if args.urls == '-' else open(args.urls, encoding='utf-8')
+    started = time.time()
+    try:
+        # Agents log to stderr, so stdout carries only the records
+        counts = run_bulk(iter_urls(source), out, workers=args.workers, checkpoint=checkpoint)
+    except KeyboardInterrupt:
+        print(" Interrupted; rerun with the same --checkpoint to resume", file=sys.stderr)
+        return 130
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if checkpoint is not None:
+            checkpoint.close()
+    print(f" Bulk run finished in {time.time() - started:.1f}s: {counts['done']} done, {counts['partial']} partial, "
+          f"{counts['failed']} failed, {counts['skipped']} already checkpointed", file=sys.stderr)
+    return 0 if not counts['failed'] else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
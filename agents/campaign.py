@@ -2,30 +2,36 @@ import subprocess
 import json
 import os
 import re
+import time
 from datetime import datetime
+from agents import metrics
+from agents.industry import classify_profile
+from agents.log import get_logger
+from agents.models import CampaignPlan, as_profile
+
+logger = get_logger(__name__)
+
+CAMPAIGN_SECONDS = metrics.histogram('campaign_seconds', "Time to generate and format a campaign plan",
+                                     buckets=metrics.FAST_BUCKETS)
 
 class FormattedCampaignAgent:
     def __init__(self):
-        print(" Initializing Formatted Campaign Agent...")
+        logger.debug("Initializing Formatted Campaign Agent")
     
-    def analyze_target_market(self, discovery_data=None):
-        """Analyze target market based on discovery data"""
-        if isinstance(discovery_data, dict):
-            company_name = discovery_data.get('company_name', 'Target Company')
-            services = discovery_data.get('services', [])
+    def analyze_target_market(self, profile=None):
+        """Analyze target market based on the discovery profile"""
+        if profile is not None:
+            company_name = profile.company_name
             
             # Determine industry focus for campaign targeting
-            services_text = ' '.join(services).lower()
-            if any(term in services_text for term in ['hvac', 'heating', 'cooling', 'plumbing', 'electrical']):
-                industry = 'hvac'
+            industry = classify_profile(profile)
+            if industry == 'hvac':
                 target_audience = 'Homeowners, Property Managers, Facility Directors'
                 keywords = 'HVAC services, heating repair, cooling installation, plumbing services'
-            elif any(term in services_text for term in ['tech', 'software', 'ai', 'cloud']):
-                industry = 'tech'
+            elif industry == 'tech':
                 target_audience = 'IT Directors, CTOs, Tech Managers'
                 keywords = 'AI solutions, cloud services, software development'
             else:
-                industry = 'general'
                 target_audience = 'Business Owners, Decision Makers, Managers'
                 keywords = 'professional services, business solutions, consulting'
         else:
@@ -229,29 +235,35 @@ class FormattedCampaignAgent:
         return "\n".join(lines)
 
 def run(discovery_data=""):
-    """Main campaign function with proper formatting"""
+    """Main campaign function with proper formatting; returns a CampaignPlan"""
     campaign_agent = FormattedCampaignAgent()
     
     try:
-        print(" Starting formatted marketing campaign strategy...")
+        logger.info("Starting formatted marketing campaign strategy")
+        started = time.perf_counter()
         
         # Analyze target market from discovery data
-        market_analysis = campaign_agent.analyze_target_market(discovery_data)
-        print(f" Target market: {market_analysis['industry']} industry")
+        market_analysis = campaign_agent.analyze_target_market(as_profile(discovery_data))
+        logger.info("Target market: %s industry", market_analysis['industry'])
         
         # Generate platform strategies
         strategies, total_budget = campaign_agent.generate_platform_strategy(market_analysis)
-        print(f" Total budget allocated: ${total_budget}")
+        logger.info("Total budget allocated: $%s", total_budget)
         
         # Calculate success metrics
         success_metrics = campaign_agent.calculate_success_metrics(total_budget, market_analysis['industry'])
         
         # Format output matching Discovery Agent style
         final_output = campaign_agent.format_campaign_output(market_analysis, strategies, total_budget, success_metrics)
+        CAMPAIGN_SECONDS.observe(time.perf_counter() - started)
         
-        print(" Formatted marketing campaign strategy complete!")
-        return final_output
+        logger.info("Formatted marketing campaign strategy complete")
+        return CampaignPlan(
+            company_name=market_analysis['company_name'], industry=market_analysis['industry'],
+            target_audience=market_analysis['target_audience'], keywords=market_analysis['keywords'],
+            total_budget=total_budget, channels=strategies, metrics=success_metrics, report=final_output
+        )
         
     except Exception as e:
-        print(f" Campaign error: {e}")
-        return f" Marketing Campaign Error: {str(e)}"
+        logger.exception("Campaign error: %s", e)
+        return CampaignPlan(error=str(e), report=f" Marketing Campaign Error: {str(e)}")
@@ -0,0 +1,276 @@
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+from email.utils import parsedate_to_datetime
+import requests
+from requests.adapters import HTTPAdapter
+from agents import metrics
+from agents.log import get_logger
+from agents.rate_limiter import RateLimitTimeout, estimate_tokens, get_rate_limiter
+
+CLAUDE_API_URL = os.getenv('CLAUDE_API_URL', 'https://api.anthropic.com/v1/messages')
+CLAUDE_API_VERSION = '2023-06-01'
+CLAUDE_TIMEOUT = float(os.getenv('CLAUDE_TIMEOUT', '30'))
+# Keep-alive connections to the API; callers beyond this wait for a free one
+CLAUDE_MAX_CONNECTIONS = int(os.getenv('CLAUDE_MAX_CONNECTIONS', '8'))
+# Tries per call for rate limits, overload, 5xx and network errors
+CLAUDE_MAX_ATTEMPTS = int(os.getenv('CLAUDE_MAX_ATTEMPTS', '4'))
+CLAUDE_BACKOFF_BASE = float(os.getenv('CLAUDE_BACKOFF_BASE', '1'))
+CLAUDE_BACKOFF_MAX = float(os.getenv('CLAUDE_BACKOFF_MAX', '20'))
+# A retry-after longer than this isn't worth waiting for inside a request
+CLAUDE_RETRY_AFTER_MAX = float(os.getenv('CLAUDE_RETRY_AFTER_MAX', '60'))
+# Retry budget: each call earns this fraction of a retry, plus a small steady allowance
+CLAUDE_RETRY_RATIO = float(os.getenv('CLAUDE_RETRY_RATIO', '0.2'))
+CLAUDE_RETRY_MIN_PER_SECOND = float(os.getenv('CLAUDE_RETRY_MIN_PER_SECOND', '0.5'))
+CLAUDE_RETRY_BURST = float(os.getenv('CLAUDE_RETRY_BURST', '10'))
+
+RETRYABLE_STATUS = frozenset([408, 429, 500, 502, 503, 504, 529])
+
+CLAUDE_CALLS = metrics.counter('claude_calls_total', "Messages API calls, each of one or more attempts")
+CLAUDE_REQUESTS = metrics.counter('claude_requests_total', "Messages API attempts by HTTP status "
+                                  "('error' when the API could not be reached)", ['status'])
+CLAUDE_REQUEST_SECONDS = metrics.histogram('claude_request_seconds', "Time from sending a Messages API "
+                                           "attempt to its response headers", ['status'])
+CLAUDE_LIMITER_WAIT_SECONDS = metrics.histogram('claude_limiter_wait_seconds',
+                                                "Time an attempt waited for the rate limiter")
+
+_client = None
+_client_lock = threading.Lock()
+
+logger = get_logger(__name__)
+
+class ClaudeAPIError(Exception):
+    """The API could not be reached, even after retrying"""
+
+class RetryBudget:
+    """Process-wide allowance of retries, so rate limits can't turn into a retry storm.
+
+    Every first attempt deposits `ratio` of a retry and the balance also refills by
+    `min_per_second`; a retry spends one whole token. When many calls fail at once
+    the balance drains and further failures are returned instead of retried.
+    """
+
+    def __init__(self, ratio=CLAUDE_RETRY_RATIO, min_per_second=CLAUDE_RETRY_MIN_PER_SECOND,
+                 burst=CLAUDE_RETRY_BURST):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.burst = burst
+        self._balance = burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._balance = min(self.burst, self._balance + (now - self._updated) * self.min_per_second)
+        self._updated = now
+
+    def deposit(self):
+        with self._lock:
+            self._refill()
+            self._balance = min(self.burst, self._balance + self.ratio)
+
+    def withdraw(self):
+        """Spend one retry; False when the budget is exhausted"""
+        with self._lock:
+            self._refill()
+            if self._balance < 1:
+                return False
+            self._balance -= 1
+            return True
+
+def retry_after_seconds(response):
+    """Seconds the server asked us to wait (retry-after as seconds or HTTP date), or None"""
+    value = response.headers.get('retry-after')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def backoff_delay(attempt, base=CLAUDE_BACKOFF_BASE, cap=CLAUDE_BACKOFF_MAX):
+    """Full-jitter exponential backoff: uniform between 0 and base * 2**attempt, capped"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+def usage_tokens(usage):
+    """Input plus output tokens from a Messages API usage block"""
+    if not isinstance(usage, dict):
+        return None
+    return usage.get('input_tokens', 0) + usage.get('output_tokens', 0)
+
+class ClaudeClient:
+    """Process-wide Messages API client: one keep-alive connection pool, shared retry budget,
+    and a rate limiter every attempt waits on before it is sent"""
+
+    def __init__(self, url=CLAUDE_API_URL, api_key=None, timeout=CLAUDE_TIMEOUT,
+                 max_attempts=CLAUDE_MAX_ATTEMPTS, max_connections=CLAUDE_MAX_CONNECTIONS, limiter=None):
+        self.url = url
+        self.limiter = limiter if limiter is not None else get_rate_limiter()
+        self.api_key = api_key if api_key is not None else os.getenv('CLAUDE_API_KEY')
+        self.timeout = timeout
+        self.max_attempts = max(1, max_attempts)
+        self.budget = RetryBudget()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_connections, pool_block=True)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({
+            'Content-Type': 'application/json',
+            'anthropic-version': CLAUDE_API_VERSION,
+        })
+
+    def _acquire(self, tokens):
+        try:
+            lease = self.limiter.acquire(tokens)
+            CLAUDE_LIMITER_WAIT_SECONDS.observe(lease.waited)
+            return lease
+        except RateLimitTimeout as e:
+            raise ClaudeAPIError(str(e)) from e
+        except sqlite3.Error as e:
+            # A locked or broken limiter file must not stop the analysis
+            logger.warning("Claude rate limiter unavailable: %s", e)
+            return None
+
+    def _release(self, lease, actual_tokens=None):
+        if lease is None:
+            return
+        try:
+            self.limiter.release(lease, actual_tokens)
+        except sqlite3.Error as e:
+            logger.warning("Claude rate limiter release failed: %s", e)
+
+    def _pause(self, seconds):
+        try:
+            self.limiter.pause(seconds)
+        except sqlite3.Error as e:
+            # This caller still backs off below; only the others aren't told
+            logger.warning("Claude rate limiter pause failed: %s", e)
+
+    def _observe(self, status, started):
+        CLAUDE_REQUESTS.inc(status=status)
+        CLAUDE_REQUEST_SECONDS.observe(time.perf_counter() - started, status=status)
+
+    def finish(self, response, actual_tokens=None):
+        """Done reading a streamed response: close it and free its rate-limiter slot"""
+        response.close()
+        self._release(getattr(response, 'limiter_lease', None), actual_tokens)
+        response.limiter_lease = None
+
+    def create_message(self, payload, stream=False):
+        """POST a Messages API request, retrying transient failures.
+
+        Each attempt first waits its turn in the rate limiter; waiting doesn't use
+        up attempts. Returns the final response whatever its status. With `stream`,
+        a 200's body is left unread and the caller must pass it to finish().
+        Raises ClaudeAPIError when the API could not be reached at all.
+        """
+        self.budget.deposit()
+        CLAUDE_CALLS.inc()
+        headers = {'x-api-key': self.api_key or ''}
+        cost = estimate_tokens(payload)
+        for attempt in range(self.max_attempts):
+            last_try = attempt == self.max_attempts - 1
+            lease = self._acquire(cost)
+            started = time.perf_counter()
+            try:
+                response = self.session.post(self.url, json=payload, headers=headers,
+                                             timeout=self.timeout, stream=stream)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                self._observe('error', started)
+                self._release(lease)
+                if last_try or not self.budget.withdraw():
+                    raise ClaudeAPIError(f"Claude API unreachable after {attempt + 1} attempts: {e}") from e
+                delay = backoff_delay(attempt)
+                logger.warning("Claude request failed (%s), retrying in %.1fs", e.__class__.__name__, delay)
+                time.sleep(delay)
+                continue
+            self._observe(str(response.status_code), started)
+
+            if response.status_code == 200 and stream:
+                response.limiter_lease = lease
+                return response
+            if response.status_code == 200:
+                try:
+                    actual_tokens = usage_tokens(response.json().get('usage'))
+                except ValueError:
+                    actual_tokens = None
+                self._release(lease, actual_tokens)
+                return response
+            self._release(lease, 0)
+
+            retry_after = retry_after_seconds(response)
+            if response.status_code == 429:
+                # Everyone sharing the limiter holds back, not just this caller
+                self._pause(retry_after if retry_after is not None else backoff_delay(attempt))
+            if response.status_code not in RETRYABLE_STATUS or last_try:
+                return response
+            if retry_after is not None and retry_after > CLAUDE_RETRY_AFTER_MAX:
+                return response
+            if not self.budget.withdraw():
+                logger.warning("Claude retry budget exhausted, not retrying")
+                return response
+            # Honour retry-after when given; jitter keeps callers from retrying in lockstep
+            delay = backoff_delay(attempt)
+            if retry_after is not None:
+                delay = retry_after + random.uniform(0, CLAUDE_BACKOFF_BASE)
+            response.close()
+            logger.warning("Claude API %s, retrying in %.1fs", response.status_code, delay)
+            time.sleep(delay)
+
+    def _batch_request(self, method, url, **kwargs):
+        """Message Batches call with the same backoff and retry budget as messages; no rate
+        limiter, since batch work doesn't count against the per-minute message limits"""
+        self.budget.deposit()
+        headers = {'x-api-key': self.api_key or ''}
+        for attempt in range(self.max_attempts):
+            last_try = attempt == self.max_attempts - 1
+            try:
+                response = self.session.request(method, url, headers=headers, timeout=self.timeout, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if last_try or not self.budget.withdraw():
+                    raise ClaudeAPIError(f"Claude batch API unreachable after {attempt + 1} attempts: {e}") from e
+                time.sleep(backoff_delay(attempt))
+                continue
+            if response.status_code == 200:
+                return response
+            retry_after = retry_after_seconds(response)
+            if (response.status_code not in RETRYABLE_STATUS or last_try or not self.budget.withdraw()
+                    or (retry_after is not None and retry_after > CLAUDE_RETRY_AFTER_MAX)):
+                raise ClaudeAPIError(f"Claude batch API error {response.status_code}: {response.text[:200]}")
+            delay = retry_after if retry_after is not None else backoff_delay(attempt)
+            response.close()
+            logger.warning("Claude batch API %s, retrying in %.1fs", response.status_code, delay)
+            time.sleep(delay)
+
+    def create_batch(self, batch_requests):
+        """Submit [{'custom_id': ..., 'params': payload}, ...] as one batch; returns the batch object"""
+        return self._batch_request('POST', self.url.rstrip('/') + '/batches', json={'requests': batch_requests}).json()
+
+    def get_batch(self, batch_id):
+        return self._batch_request('GET', f"{self.url.rstrip('/')}/batches/{batch_id}").json()
+
+    def batch_results(self, batch):
+        """Yield the result entries of an ended batch, read line by line from its results_url"""
+        response = self._batch_request('GET', batch['results_url'], stream=True)
+        try:
+            for line in response.iter_lines(decode_unicode=True):
+                if line:
+                    yield json.loads(line)
+        finally:
+            response.close()
+
+def get_claude_client():
+    """Process-wide Claude client"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = ClaudeClient()
+    return _client
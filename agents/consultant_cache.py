@@ -0,0 +1,117 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from agents.sqlite_store import SQLiteStore, default_cache_path
+from agents.log import get_logger
+
+CONSULTANT_CACHE_ENABLED = os.getenv('CONSULTANT_CACHE_ENABLED', '1') != '0'
+CONSULTANT_CACHE_PATH = os.getenv('CONSULTANT_CACHE_PATH', default_cache_path('consultant_cache.sqlite3'))
+# Analyses older than this are asked for again
+CONSULTANT_CACHE_TTL = float(os.getenv('CONSULTANT_CACHE_TTL', str(7 * 24 * 3600)))
+CONSULTANT_CACHE_MAX_ENTRIES = int(os.getenv('CONSULTANT_CACHE_MAX_ENTRIES', '2000'))
+CONSULTANT_CACHE_MAX_BYTES = int(os.getenv('CONSULTANT_CACHE_MAX_BYTES', str(50 * 1024 * 1024)))
+# 'exact' reuses an analysis only for the same prompt fields; 'similar' also ignores
+# the fields in CONSULTANT_CACHE_IGNORE, which don't change the strategy
+CONSULTANT_CACHE_MODE = os.getenv('CONSULTANT_CACHE_MODE', 'exact')
+CONSULTANT_CACHE_IGNORE = [field.strip() for field in os.getenv('CONSULTANT_CACHE_IGNORE', 'phone').split(',') if field.strip()]
+
+_cache = None
+_cache_lock = threading.Lock()
+
+logger = get_logger(__name__)
+
+# Fields the analysis repeats as written (it addresses the company by name), so only
+# their whitespace is normalized: "ACME Plumbing" must not get "Acme Plumbing"'s text
+ECHOED_FIELDS = frozenset(['company_name', 'industry', 'phone'])
+# Bumped when the canonical form changes, so older entries aren't matched differently
+KEY_VERSION = '2'
+
+def _canonical(value, keep_case=False):
+    """Case, whitespace and ordering differences that don't change the prompt's meaning are
+    dropped; with `keep_case`, only whitespace"""
+    if isinstance(value, str):
+        value = ' '.join(value.split())
+        return value if keep_case else value.casefold()
+    if isinstance(value, (list, tuple)):
+        return sorted(_canonical(item, keep_case) for item in value)
+    return value
+
+def fingerprint(model, prompt_version, fields, ignore=()):
+    """Cache key for a consultant prompt: model, prompt template version and canonical fields"""
+    canonical = {name: _canonical(value, name in ECHOED_FIELDS) for name, value in fields.items()
+                 if name not in ignore}
+    document = json.dumps([KEY_VERSION, model, prompt_version, canonical], sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(document.encode('utf-8')).hexdigest()
+
+class ConsultantCache:
+    """Claude analyses on disk, keyed by prompt fingerprint, with TTL and LRU eviction"""
+
+    def __init__(self, path=CONSULTANT_CACHE_PATH, ttl=CONSULTANT_CACHE_TTL, mode=CONSULTANT_CACHE_MODE,
+                 max_entries=CONSULTANT_CACHE_MAX_ENTRIES, max_bytes=CONSULTANT_CACHE_MAX_BYTES):
+        self.ttl = ttl
+        self.ignore = CONSULTANT_CACHE_IGNORE if mode == 'similar' else ()
+        self.store = SQLiteStore(path, max_entries=max_entries, max_bytes=max_bytes)
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'stores': 0}
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def key(self, model, prompt_version, fields):
+        return fingerprint(model, prompt_version, fields, self.ignore)
+
+    def get(self, key):
+        try:
+            row = self.store.get(key)
+        except sqlite3.Error as e:
+            logger.warning("Consultant cache read failed: %s", e)
+            row = None
+        if row is not None and time.time() - row[2] < self.ttl:
+            self._count('hits')
+            return row[0].decode('utf-8')
+        if row is not None:
+            try:
+                self.store.delete(key)
+            except sqlite3.Error:
+                pass
+        self._count('misses')
+        return None
+
+    def put(self, key, analysis, model):
+        try:
+            self.store.put(key, analysis.encode('utf-8'), {'model': model})
+        except sqlite3.Error as e:
+            logger.warning("Consultant cache write failed: %s", e)
+            return
+        self._count('stores')
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = round(stats['hits'] / lookups, 3) if lookups else 0.0
+        return stats
+
+def get_consultant_cache():
+    """Process-wide consultant cache, or None when disabled or the cache file can't be opened"""
+    global _cache, CONSULTANT_CACHE_ENABLED
+    if not CONSULTANT_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                try:
+                    _cache = ConsultantCache()
+                except (OSError, sqlite3.Error) as e:
+                    logger.warning("Consultant cache disabled: %s", e)
+                    CONSULTANT_CACHE_ENABLED = False
+                    return None
+    return _cache
+
+def stats():
+    cache = get_consultant_cache()
+    return cache.stats() if cache else {}
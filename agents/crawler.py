@@ -0,0 +1,173 @@
+import heapq
+import os
+import re
+import time
+from urllib.parse import urljoin, urlparse
+from agents.fetcher import fetch_pages, MAX_CONNECTIONS_PER_HOST
+from agents.log import get_logger
+from agents.urls import normalize_url, site_key
+
+# Crawl budgets; each can be overridden per call
+CRAWL_MAX_PAGES = int(os.getenv('CRAWL_MAX_PAGES', '6'))
+CRAWL_MAX_DEPTH = int(os.getenv('CRAWL_MAX_DEPTH', '2'))
+CRAWL_TIME_BUDGET = float(os.getenv('CRAWL_TIME_BUDGET', '12'))
+
+PAGE_TIMEOUT = 5
+MAX_CHILD_SITEMAPS = 3
+MAX_SITEMAP_SEEDS = 50
+
+# Paths likely to carry contact details, services or reviews, with their ranking weight
+URL_PRIORITIES = [
+    (re.compile(r'contact|location|find-us|directions|visit', re.I), 10),
+    (re.compile(r'service|solution|product|what-we-do|offering|capabilit', re.I), 8),
+    (re.compile(r'testimonial|review|feedback|case-stud|client', re.I), 8),
+    (re.compile(r'about|company|who-we-are|our-story|team', re.I), 5),
+]
+
+LOW_VALUE_PATHS = re.compile(
+    r'blog|news|post|article|press|career|job|privacy|terms|cookie|legal|login|sign-?in|'
+    r'register|cart|checkout|account|tag/|category/|author/|feed|wp-|cdn-cgi', re.I
+)
+
+SKIP_EXTENSIONS = (
+    '.pdf', '.jpg', '.jpeg', '.png', '.gif', '.svg', '.webp', '.ico', '.css', '.js',
+    '.zip', '.mp4', '.mp3', '.xml', '.json', '.doc', '.docx', '.xls', '.xlsx'
+)
+
+SITEMAP_LOC = re.compile(r'<loc>\s*([^<\s]+)\s*</loc>', re.I)
+
+logger = get_logger(__name__)
+
+def is_crawlable(url, root_url):
+    parsed = urlparse(url)
+    if parsed.scheme not in ('http', 'https'):
+        return False
+    if site_key(url) != site_key(root_url):
+        return False
+    return not parsed.path.lower().endswith(SKIP_EXTENSIONS)
+
+def score_url(url, anchor_text='', depth=1):
+    """Rank a candidate page by how likely it is to fill in missing business details"""
+    target = urlparse(url).path + ' ' + (anchor_text or '')
+    score = 0
+    for pattern, weight in URL_PRIORITIES:
+        if pattern.search(target):
+            score += weight
+    if LOW_VALUE_PATHS.search(target):
+        score -= 10
+    # Prefer shallow pages; deep paths are usually individual posts or listings
+    score -= urlparse(url).path.strip('/').count('/') * 2
+    return score - depth
+
+def parse_sitemap(xml_text):
+    """Return (page URLs, child sitemap URLs) listed in a sitemap or sitemap index"""
+    locs = SITEMAP_LOC.findall(xml_text or '')
+    if re.search(r'<sitemapindex', xml_text or '', re.I):
+        return [], locs
+    return locs, []
+
+class CrawlFrontier:
+    """Priority queue of pages to visit, highest-value first"""
+
+    def __init__(self, root_url, max_depth):
+        self.root_url = root_url
+        self.max_depth = max_depth
+        self.seen = set()
+        self._heap = []
+        self._counter = 0
+
+    def add(self, url, depth, anchor_text='', priority=None):
+        url = normalize_url(urljoin(self.root_url, url))
+        if depth > self.max_depth or url in self.seen or not is_crawlable(url, self.root_url):
+            return False
+        self.seen.add(url)
+        if priority is None:
+            priority = score_url(url, anchor_text, depth)
+        heapq.heappush(self._heap, (-priority, self._counter, url, depth))
+        self._counter += 1
+        return True
+
+    def pop_batch(self, size):
+        batch = []
+        while self._heap and len(batch) < size:
+            _, _, url, depth = heapq.heappop(self._heap)
+            batch.append((url, depth))
+        return batch
+
+    def __len__(self):
+        return len(self._heap)
+
+def crawl(root_url, process_page, is_complete=None, max_pages=None, max_depth=None, time_budget=None):
+    """Bounded best-first crawl of one site.
+
+    `process_page(page)` is called for every fetched page in priority order and
+    returns the (href, anchor_text) links found on it. Crawling stops when the
+    page, depth or time budget runs out, or as soon as `is_complete()` is true.
+    Returns the number of pages processed.
+    """
+    max_pages = CRAWL_MAX_PAGES if max_pages is None else max_pages
+    max_depth = CRAWL_MAX_DEPTH if max_depth is None else max_depth
+    time_budget = CRAWL_TIME_BUDGET if time_budget is None else time_budget
+    deadline = time.monotonic() + time_budget
+
+    frontier = CrawlFrontier(root_url, max_depth)
+    frontier.add(root_url, 0, priority=float('inf'))
+    frontier.add(root_url.rstrip('/') + '/about', 1)
+
+    sitemap_url = urljoin(root_url.rstrip('/') + '/', 'sitemap.xml')
+    pending_sitemaps = [sitemap_url]
+    sitemaps_fetched = 0
+    pages_processed = 0
+
+    while pages_processed < max_pages:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            logger.info("Crawl time budget reached after %d pages", pages_processed)
+            break
+
+        batch = frontier.pop_batch(min(max_pages - pages_processed, MAX_CONNECTIONS_PER_HOST))
+        sitemap_batch = pending_sitemaps[:MAX_CHILD_SITEMAPS + 1 - sitemaps_fetched]
+        pending_sitemaps = []
+        if not batch and not sitemap_batch:
+            break
+
+        # Sitemaps ride along with the first wave of pages so they cost no extra round trip
+        results = fetch_pages([url for url, _ in batch] + sitemap_batch, timeout=min(PAGE_TIMEOUT, remaining),
+                              max_seconds=remaining)
+        page_results, sitemap_results = results[:len(batch)], results[len(batch):]
+
+        for sitemap in sitemap_results:
+            sitemaps_fetched += 1
+            if not sitemap.ok or sitemap.status_code != 200:
+                continue
+            page_urls, child_sitemaps = parse_sitemap(sitemap.text)
+            pending_sitemaps.extend(child_sitemaps)
+            ranked = sorted(page_urls, key=lambda loc: score_url(loc), reverse=True)
+            for loc in ranked[:MAX_SITEMAP_SEEDS]:
+                frontier.add(loc, 1)
+
+        for page, (_, depth) in zip(page_results, batch):
+            if not page.ok:
+                logger.info("Skipped %s: %s", page.url, page.error)
+                continue
+            if depth > 0 and page.status_code >= 400:
+                # Guessed and linked pages that error out only carry the site's error template
+                logger.info("Skipped %s: HTTP %s", page.url, page.status_code)
+                continue
+            try:
+                logger.debug("Analyzing: %s", page.url)
+                links = process_page(page)
+                pages_processed += 1
+                logger.debug("Done: %s", page.url)
+            except Exception as e:
+                logger.warning("Skipped %s: %s", page.url, e)
+                continue
+
+            for href, anchor_text in links or []:
+                frontier.add(href, depth + 1, anchor_text)
+
+            if is_complete is not None and is_complete():
+                logger.info("All business fields found after %d pages, stopping crawl", pages_processed)
+                return pages_processed
+
+    return pages_processed
@@ -1,37 +1,51 @@
 import os
-import requests
 import json
-import time
 import re
 import os
+import time
 from datetime import datetime
+from agents.claude_client import ClaudeAPIError, get_claude_client, usage_tokens
+from agents import industry, metrics
+from agents.consultant_cache import get_consultant_cache
+from agents.log import get_logger
+from agents.models import DiscoveryProfile, Strategy, as_profile
+
+# Bump when the prompt template changes so cached analyses aren't reused for it
+PROMPT_VERSION = '1'
+
+logger = get_logger(__name__)
+
+CONSULTANT_ANALYSES = metrics.counter('consultant_analyses_total', "Strategic analyses by where they came from "
+                                      "(claude, cache, or the built-in fallback)", ['source'])
+CONSULTANT_SECONDS = metrics.histogram('consultant_seconds', "Time to produce a strategic analysis", ['source'])
 
 class WorldClassBusinessConsultant:
     def __init__(self):
-        print(" Initializing World-Class Business Consultant with Claude AI...")
-        self.claude_api_key = os.getenv('CLAUDE_API_KEY')
-        self.claude_url = "https://api.anthropic.com/v1/messages"
+        logger.debug("Initializing World-Class Business Consultant with Claude AI")
+        self.client = get_claude_client()  # shared keep-alive pool and retry budget
         self.claude_model = "claude-3-haiku-20240307"
     
-    def analyze_company_with_claude(self, discovery_data):
-        """Send complete discovery data to Claude for world-class analysis"""
-        print(" Sending data to Claude AI for McKinsey-level analysis...")
-        
+    def build_prompt(self, profile):
+        """The consultant prompt, its industry context, and the profile fields it depends on"""
         # Extract comprehensive data
-        company_name = discovery_data.get('company_name', 'Unknown Company')
-        services = discovery_data.get('services', [])
-        phones = discovery_data.get('phones', [])
-        social_media = discovery_data.get('social_media', {})
-        testimonials = discovery_data.get('testimonials', [])
+        company_name = profile.company_name
+        services = profile.services
+        phones = profile.phones
+        social_media = profile.social_media
+        testimonials = profile.testimonials
         
         # Determine industry for context
-        services_text = ' '.join(services).lower()
-        if any(term in services_text for term in ['hvac', 'ac', 'heating', 'cooling', 'air conditioning']):
-            industry_context = "HVAC and energy services"
-        elif any(term in services_text for term in ['tech', 'software', 'ai', 'cloud']):
-            industry_context = "technology and software"
-        else:
-            industry_context = "professional services"
+        industry_context = industry.label(industry.classify_profile(profile))
+        
+        # Everything the prompt depends on; identical profiles reuse the cached analysis
+        prompt_fields = {
+            'company_name': company_name,
+            'industry': industry_context,
+            'services': services[:5],
+            'social_platforms': len(social_media),
+            'testimonials': len(testimonials),
+            'phone': phones[0] if phones else '',
+        }
         
         # Create McKinsey-level prompt for Claude
         prompt = f"""You are a McKinsey & Company senior partner with 25+ years of strategic consulting experience. Analyze this company and provide 3 transformational growth strategies.
@@ -71,80 +85,131 @@ Investment Required: [total investment needed]
 Competitive Advantage: [sustainable moat description]
 
 Focus on {company_name} in {industry_context}. Be specific, actionable, and McKinsey-caliber."""
+        return prompt, industry_context, prompt_fields
+    
+    def build_payload(self, prompt, stream=False):
+        payload = {
+            'model': self.claude_model,
+            'max_tokens': 2000,
+            'messages': [
+                {
+                    'role': 'user',
+                    'content': prompt
+                }
+            ]
+        }
+        if stream:
+            payload['stream'] = True
+        return payload
+    
+    def cache_key(self, cache, prompt_fields):
+        return cache.key(self.claude_model, PROMPT_VERSION, prompt_fields)
+    
+    def analyze_company_with_claude(self, profile, on_token=None):
+        """Send the discovery profile to Claude for world-class analysis.
 
-        # Try Claude with retry logic
+        Returns (analysis, industry, source) with source 'claude', 'cache' or
+        'fallback'. With `on_token`, the response is streamed and each text
+        fragment is passed to it as it arrives; `on_token(None)` means a retry is
+        starting and what was streamed so far should be discarded.
+        """
+        logger.info("Sending data to Claude AI for McKinsey-level analysis")
+        prompt, industry_context, prompt_fields = self.build_prompt(profile)
+        
+        cache = get_consultant_cache()
+        if cache:
+            cache_key = self.cache_key(cache, prompt_fields)
+            cached_analysis = cache.get(cache_key)
+            if cached_analysis:
+                logger.info("Reusing cached Claude analysis for this profile")
+                if on_token:
+                    on_token(cached_analysis)
+                return cached_analysis, industry_context, 'cache'
+        
+        payload = self.build_payload(prompt, stream=bool(on_token))
+        
+        # Rate limits, overload and network errors are retried inside the client with
+        # backoff; this loop only re-asks when the answer itself is unusable
         for attempt in range(3):
+            if attempt > 0 and not self.client.budget.withdraw():
+                logger.warning("Claude retry budget exhausted")
+                break
             try:
-                headers = {
-                    'x-api-key': self.claude_api_key,
-                    'Content-Type': 'application/json',
-                    'anthropic-version': '2023-06-01'
-                }
-                
-                payload = {
-                    'model': self.claude_model,
-                    'max_tokens': 2000,
-                    'messages': [
-                        {
-                            'role': 'user',
-                            'content': prompt
-                        }
-                    ]
-                }
+                if on_token and attempt > 0:
+                    on_token(None)
                 
-                print(f"🔗 Attempt {attempt + 1}: Calling Claude AI...")
-                response = requests.post(self.claude_url, json=payload, headers=headers, timeout=30)
+                logger.debug("Attempt %d: Calling Claude AI", attempt + 1)
+                response = self.client.create_message(payload, stream=bool(on_token))
                 
-                print(f"📡 Response Status: {response.status_code}")
+                logger.debug("Response Status: %s", response.status_code)
                 
                 if response.status_code == 200:
-                    result = response.json()
+                    if on_token:
+                        result = {'content': [{'text': self._read_stream(response, on_token)}]}
+                    else:
+                        result = response.json()
                     if 'content' in result and len(result['content']) > 0:
                         claude_analysis = result['content'][0]['text']
-                        print(f" Claude Success! Analysis length: {len(claude_analysis)} chars")
+                        logger.info("Claude Success! Analysis length: %d chars", len(claude_analysis))
                         
                         if len(claude_analysis.strip()) > 300:
-                            return claude_analysis
+                            if cache:
+                                cache.put(cache_key, claude_analysis, self.claude_model)
+                            return claude_analysis, industry_context, 'claude'
                         else:
-                            print(" Response too short, trying again...")
+                            logger.warning("Response too short, trying again")
                             continue
                     else:
-                        print(" No content in response, trying again...")
+                        logger.warning("No content in response, trying again")
                         continue
-                        
-                elif response.status_code == 429:
-                    print(f" Rate limited, waiting {(attempt + 1) * 3} seconds...")
-                    time.sleep((attempt + 1) * 3)
-                    continue
                     
                 else:
-                    print(f" Claude API Error {response.status_code}: {response.text[:200]}")
-                    if attempt < 2:
-                        time.sleep(2)
-                        continue
+                    logger.error("Claude API Error %s: %s", response.status_code, response.text[:200])
                     break
                     
-            except requests.exceptions.Timeout:
-                print(f" Timeout on attempt {attempt + 1}")
-                if attempt < 2:
-                    continue
+            except ClaudeAPIError as e:
+                logger.error("%s", e)
                 break
             except Exception as e:
-                print(f" Exception on attempt {attempt + 1}: {e}")
-                if attempt < 2:
-                    continue
-                break
+                logger.warning("Exception on attempt %d: %s", attempt + 1, e)
+                continue
         
         # If all attempts failed, use enhanced fallback
-        print(" Using enhanced company-specific fallback analysis...")
-        return self._create_company_specific_analysis(discovery_data, industry_context)
+        logger.warning("Using enhanced company-specific fallback analysis")
+        return self._create_company_specific_analysis(profile, industry_context), industry_context, 'fallback'
     
-    def _create_company_specific_analysis(self, discovery_data, industry_context):
+    def _read_stream(self, response, on_token):
+        """Collect the text of a streamed Messages API response, forwarding each delta"""
+        parts = []
+        usage = {}
+        try:
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith('data:'):
+                    continue
+                event = json.loads(line[5:])
+                if event.get('type') == 'content_block_delta':
+                    text = event.get('delta', {}).get('text', '')
+                    if text:
+                        parts.append(text)
+                        on_token(text)
+                elif event.get('type') == 'message_start':
+                    usage.update(event.get('message', {}).get('usage', {}))
+                elif event.get('type') == 'message_delta':
+                    usage.update(event.get('usage', {}))
+                elif event.get('type') == 'error':
+                    raise RuntimeError(event.get('error', {}).get('message', 'stream error'))
+                elif event.get('type') == 'message_stop':
+                    break
+        finally:
+            self.client.finish(response, usage_tokens(usage) if usage else None)
+        return ''.join(parts)
+    
+    def _create_company_specific_analysis(self, profile, industry_context):
         """Enhanced fallback analysis using actual company data"""
-        company_name = discovery_data.get('company_name', 'Target Company')
-        services = discovery_data.get('services', ['Professional Services'])
-        social_media = discovery_data.get('social_media', {})
-        testimonials = discovery_data.get('testimonials', [])
+        company_name = profile.company_name
+        services = profile.services or ['Professional Services']
+        social_media = profile.social_media
+        testimonials = profile.testimonials
         
         digital_strength = "strong" if len(social_media) >= 3 else "developing"
         customer_feedback = "excellent" if len(testimonials) >= 2 else "positive"
@@ -236,10 +301,10 @@ Competitive Advantage: Premium brand positioning and integrated service ecosyste
 {company_name} leverages its {customer_feedback} customer relationships and {digital_strength} market presence to drive growth across multiple service areas.
 """
     
-    def format_world_class_output(self, analysis, discovery_data):
+    def format_world_class_output(self, analysis, profile):
         """Format analysis in consistent style"""
-        company_name = discovery_data.get('company_name', 'Target Company')
-        services = discovery_data.get('services', [])
+        company_name = profile.company_name
+        services = profile.services
         
         lines = []
         
@@ -282,29 +347,33 @@ Competitive Advantage: Premium brand positioning and integrated service ecosyste
         
         return "\n".join(lines)
 
-def run(discovery_data=""):
-    """Main function with Claude AI integration"""
+def run(discovery_data="", on_token=None):
+    """Main function with Claude AI integration; `on_token` streams the analysis as it is written.
+
+    Returns a Strategy; on failure its `error` is set and `report` explains it.
+    """
     consultant = WorldClassBusinessConsultant()
     
     try:
-        print(" Starting world-class strategic analysis with Claude AI...")
+        logger.info("Starting world-class strategic analysis with Claude AI")
         
-        if not isinstance(discovery_data, dict):
-            discovery_data = {
-                'company_name': 'Target Company',
-                'services': ['Professional Services'],
-                'emails': [], 'phones': [], 'social_media': {}, 'testimonials': []
-            }
+        profile = as_profile(discovery_data)
+        if profile is None:
+            profile = DiscoveryProfile(company_name='Target Company', services=['Professional Services'])
         
         # Get analysis from Claude AI
-        analysis = consultant.analyze_company_with_claude(discovery_data)
+        started = time.perf_counter()
+        analysis, industry_context, source = consultant.analyze_company_with_claude(profile, on_token=on_token)
+        CONSULTANT_ANALYSES.inc(source=source)
+        CONSULTANT_SECONDS.observe(time.perf_counter() - started, source=source)
         
         # Format output
-        final_output = consultant.format_world_class_output(analysis, discovery_data)
+        final_output = consultant.format_world_class_output(analysis, profile)
         
-        print(" World-class strategic analysis complete!")
-        return final_output
+        logger.info("World-class strategic analysis complete (%s)", source)
+        return Strategy(company_name=profile.company_name, industry=industry_context, analysis=analysis,
+                        source=source, report=final_output)
         
     except Exception as e:
-        print(f" Analysis error: {e}")
-        return f" World-Class Business Consultant Error: {str(e)}"
+        logger.exception("Analysis error: %s", e)
+        return Strategy(error=str(e), report=f" World-Class Business Consultant Error: {str(e)}")
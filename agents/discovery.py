@@ -1,8 +1,24 @@
-import requests
-from bs4 import BeautifulSoup
 from urllib.parse import urljoin, urlparse
+import logging
 import time
-import re
+from agents.crawler import crawl
+from agents.dom_index import build_dom_index
+from agents import patterns
+from agents.near_duplicates import unique_texts
+from agents.urls import site_key
+from agents import http_cache, extraction_cache, industry, metrics
+from agents.log import get_logger
+from agents.models import DiscoveryProfile
+
+# Bump whenever an extractor changes so memoized page results are recomputed
+EXTRACTOR_VERSION = '5'
+
+logger = get_logger(__name__)
+
+PARSE_SECONDS = metrics.histogram('parse_seconds', "Time to parse a page into its DOM index",
+                                  buckets=metrics.FAST_BUCKETS)
+EXTRACTOR_SECONDS = metrics.histogram('extractor_seconds', "Time spent in each extractor per page",
+                                      ['extractor'], buckets=metrics.FAST_BUCKETS)
 
 def get_company_name_from_domain(url):
     """Get company name directly from domain for known companies"""
@@ -27,37 +43,43 @@ def get_company_name_from_domain(url):
     
     return None
 
-def extract_company_name(soup, url):
+# Logo/brand image lookups, in priority order (the CSS selector each one mirrors)
+BRAND_IMAGE_RULES = [
+    lambda img: 'logo' in img.alt,                          # img[alt*="logo"]
+    lambda img: 'brand' in img.alt,                         # img[alt*="brand"]
+    lambda img: 'logo' in img.css_class,                    # img[class*="logo"]
+    lambda img: img.has_ancestor_class('logo'),             # .logo img
+    lambda img: img.has_ancestor_class('brand'),            # .brand img
+    lambda img: img.has_ancestor_class('header-logo'),      # .header-logo img
+    lambda img: img.has_ancestor_class_containing('logo'),  # [class*="logo"] img
+    lambda img: img.has_ancestor_class_containing('brand'), # [class*="brand"] img
+]
+
+def extract_company_name(index, url):
     """Enhanced company name extraction with domain override"""
     
     domain_name = get_company_name_from_domain(url)
     if domain_name:
-        print(f"🎯 Domain-based company name: {domain_name}")
+        logger.debug("Domain-based company name: %s", domain_name)
         return domain_name
     
-    brand_selectors = [
-        'img[alt*="logo"]', 'img[alt*="brand"]', 'img[class*="logo"]',
-        '.logo img', '.brand img', '.header-logo img',
-        '[class*="logo"] img', '[class*="brand"] img'
-    ]
-    
-    for selector in brand_selectors:
-        elements = soup.select(selector)
-        for element in elements:
-            alt_text = element.get('alt', '').strip()
+    for rule in BRAND_IMAGE_RULES:
+        for image in index.images:
+            if not rule(image):
+                continue
+            alt_text = image.alt.strip()
             if alt_text and 2 < len(alt_text) < 50 and 'logo' not in alt_text.lower():
-                cleaned = re.sub(r'\s*logo\s*', '', alt_text, flags=re.IGNORECASE).strip()
+                cleaned = patterns.LOGO_WORD.sub('', alt_text).strip()
                 if cleaned:
                     return cleaned
     
-    title = soup.find('title')
+    title = index.first('title')
     if title:
-        title_text = title.get_text().strip()
+        title_text = index.text_of(title).strip()
         
-        cleaned_title = re.sub(r'\s*[-|–]\s*.+$', '', title_text)
-        cleaned_title = re.sub(r'\s*\|\s*.+$', '', cleaned_title)
-        cleaned_title = re.sub(r'\s*-\s*Home\s*$', '', cleaned_title, flags=re.IGNORECASE)
-        cleaned_title = re.sub(r'\s*Home\s*$', '', cleaned_title, flags=re.IGNORECASE)
+        cleaned_title = title_text
+        for suffix in patterns.TITLE_SUFFIXES:
+            cleaned_title = suffix.sub('', cleaned_title)
         
         if 3 < len(cleaned_title) < 50:
             return cleaned_title.strip()
@@ -66,75 +88,48 @@ def extract_company_name(soup, url):
     domain_name = domain.split('.')[0]
     return domain_name.title()
 
-def extract_real_address(soup, text_content):
+def extract_real_address(index, contact_scan):
     """Extract ONLY genuine street addresses"""
     
     # Look for structured address in contact sections
-    contact_sections = soup.find_all(['div', 'section'], attrs={'class': re.compile(r'contact|address|location', re.I)})
-    
-    for section in contact_sections:
-        text = section.get_text().strip()
+    for section in index.by_class['contact']:
+        text = index.text_of(section).strip()
         # Look for complete address pattern: number + street + city/state
-        address_match = re.search(r'\d+\s+[A-Za-z\s]+(?:Street|Avenue|Road|Boulevard|Drive|Lane|St|Ave|Rd|Blvd|Dr|Way)\s*,?\s*[A-Za-z\s]+,\s*[A-Z]{2}', text, re.IGNORECASE)
+        address_match = patterns.SECTION_ADDRESS.search(text)
         if address_match:
             address = address_match.group(0).strip()
             if 25 < len(address) < 120:  # Real addresses are usually this length
                 return address
     
     # Look for structured address elements with schema markup
-    address_elements = soup.find_all(attrs={'itemprop': re.compile(r'address|streetAddress', re.I)})
-    for element in address_elements:
-        text = element.get_text().strip()
-        if 15 < len(text) < 100 and re.search(r'\d+', text):
+    for element in index.itemprop_addresses:
+        text = index.text_of(element).strip()
+        if 15 < len(text) < 100 and patterns.DIGITS.search(text):
             return text
     
-    # Very strict pattern matching for complete addresses
-    complete_address_patterns = [
-        r'\d+\s+[A-Za-z\s]+(?:Street|Avenue|Road|Boulevard|Drive|Lane|St|Ave|Rd|Blvd|Dr|Way)\s*,\s*[A-Za-z\s]+,\s*[A-Z]{2}\s*\d{5}',  # Full address with ZIP
-        r'\d+\s+[A-Za-z\s]+(?:Street|Avenue|Road|Boulevard|Drive|Lane|St|Ave|Rd|Blvd|Dr|Way)\s*,\s*[A-Za-z\s]+,\s*[A-Z]{2}',  # Address without ZIP
-    ]
-    
-    for pattern in complete_address_patterns:
-        matches = re.findall(pattern, text_content, re.IGNORECASE)
-        for match in matches:
+    # Very strict pattern matching for complete addresses: full addresses with ZIP first
+    for candidates in (contact_scan.addresses_with_zip, contact_scan.addresses):
+        for match in candidates:
             match = match.strip()
             # Exclude junk patterns
-            exclude_phrases = [
-                'emergency service', 'quick links', 'book now', 'financing', 
-                'careers', 'blog', 'customer tools', 'comfort', 'care',
-                'years', 'looking forward', 'about us', 'our company'
-            ]
-            
-            if not any(phrase in match.lower() for phrase in exclude_phrases):
+            if not patterns.ADDRESS_EXCLUDE.search(match.lower()):
                 if 25 < len(match) < 120:
                     return match
     
     # If no complete address found, return None (don't show partial/junk data)
     return None
 
-def extract_clean_business_hours(text_content):
+def extract_clean_business_hours(contact_scan):
     """Extract clean business hours without junk text"""
     
-    # Pattern for clean business hours
-    hours_patterns = [
-        r'(?:Mon|Monday)\s*[-–]?\s*(?:Fri|Friday)\s*:?\s*\d{1,2}:\d{2}\s*(?:AM|PM)\s*[-–]\s*\d{1,2}:\d{2}\s*(?:AM|PM)',
-        r'(?:Mon|Monday)\s+through\s+(?:Fri|Friday)\s*:?\s*\d{1,2}:\d{2}\s*(?:AM|PM)\s*[-–]\s*\d{1,2}:\d{2}\s*(?:AM|PM)',
-        r'(?:Monday|Mon)\s*[-–]\s*(?:Friday|Fri)\s*:?\s*\d{1,2}:\d{2}\s*(?:AM|PM)\s*[-–]\s*\d{1,2}:\d{2}\s*(?:AM|PM)'
-    ]
-    
-    for pattern in hours_patterns:
-        matches = re.findall(pattern, text_content, re.IGNORECASE)
-        for match in matches:
+    # "Mon - Fri" style ranges take priority over "Mon through Fri"
+    for candidates in (contact_scan.hours_dash, contact_scan.hours_through):
+        for match in candidates:
             # Clean the match and validate
-            cleaned = re.sub(r'\s+', ' ', match.strip())
+            cleaned = patterns.WHITESPACE.sub(' ', match.strip())
             
             # Check if it doesn't contain junk text
-            junk_indicators = [
-                'quick links', 'book now', 'financing', 'careers', 'blog',
-                'customer tools', 'comfort', 'care', 'emergency service'
-            ]
-            
-            if not any(junk in cleaned.lower() for junk in junk_indicators):
+            if not patterns.HOURS_JUNK.search(cleaned.lower()):
                 if 10 < len(cleaned) < 80:  # Reasonable length for business hours
                     return cleaned
     
@@ -145,66 +140,38 @@ def is_valid_testimonial(text):
     if not text or len(text) < 20 or len(text) > 300:
         return False
     
+    text_lower = text.lower()
+    
     # Exclude company descriptions and junk
-    exclude_patterns = [
-        r'we credit our success',
-        r'about us',
-        r'our company',
-        r'quick links',
-        r'book now',
-        r'financing',
-        r'careers',
-        r'emergency service',
-        r'years?\s+&\s+are\s+looking\s+forward',
-        r'superior products that res',
-        r'hard-working employees',
-    ]
-    
-    for pattern in exclude_patterns:
-        if re.search(pattern, text.lower()):
-            return False
+    if patterns.TESTIMONIAL_EXCLUDE.search(text_lower):
+        return False
     
     # Must contain review indicators
-    review_indicators = [
-        'recommend', 'excellent', 'professional', 'great', 'satisfied', 
-        'outstanding', 'quality', 'amazing', 'fantastic', 'helpful',
-        'installed', 'service', 'work', 'team', 'staff', 'technician',
-        'quick', 'fast', 'reliable', 'trust', 'experience', 'pleased'
-    ]
-    
-    indicator_count = sum(1 for indicator in review_indicators if indicator in text.lower())
+    indicator_count = sum(1 for indicator in patterns.REVIEW_INDICATORS if indicator in text_lower)
     return indicator_count >= 2
 
-def extract_unique_testimonials(soup, text_content):
+def extract_unique_testimonials(index, text_content):
     """Extract unique, genuine customer testimonials"""
-    testimonials = set()
+    # Insertion-ordered, so the first wording found is the one kept
+    testimonials = {}
     
     # Method 1: Structured testimonial elements
-    review_elements = soup.find_all(['div', 'p', 'blockquote', 'span'], 
-                                   attrs={'class': re.compile(r'review|testimonial|feedback|comment', re.I)})
-    
-    for element in review_elements:
-        text = element.get_text().strip()
+    for element in index.by_class['review']:
+        text = index.text_of(element).strip()
         if is_valid_testimonial(text):
-            cleaned = re.sub(r'\s+', ' ', text)
-            testimonials.add(cleaned)
+            cleaned = patterns.WHITESPACE.sub(' ', text)
+            testimonials[cleaned] = None
     
     # Method 2: Quote elements
-    quote_elements = soup.find_all(['blockquote', 'q'])
-    for element in quote_elements:
-        text = element.get_text().strip()
+    for element in index.tagged('blockquote', 'q'):
+        text = index.text_of(element).strip()
         if is_valid_testimonial(text):
-            cleaned = re.sub(r'\s+', ' ', text)
-            testimonials.add(cleaned)
+            cleaned = patterns.WHITESPACE.sub(' ', text)
+            testimonials[cleaned] = None
     
     # Method 3: Pattern matching for quoted testimonials
-    testimonial_patterns = [
-        r'"([^"]{30,200})"',  # Quoted text
-        r'[A-Z][a-z]+\s+[A-Z]\.\s+[^.]{30,200}\.',  # Name initial + testimonial
-    ]
-    
-    for pattern in testimonial_patterns:
-        matches = re.findall(pattern, text_content)
+    for pattern in patterns.TESTIMONIAL_PATTERNS:
+        matches = pattern.findall(text_content)
         for match in matches:
             if isinstance(match, tuple):
                 text = match[0]
@@ -212,49 +179,25 @@ def extract_unique_testimonials(soup, text_content):
                 text = match
             
             if is_valid_testimonial(text):
-                cleaned = re.sub(r'\s+', ' ', text.strip())
-                testimonials.add(cleaned)
-    
-    # Convert to list and remove similar testimonials
-    testimonials_list = list(testimonials)
-    final_testimonials = []
-    
-    for testimonial in testimonials_list:
-        is_similar = False
-        for existing in final_testimonials:
-            # Calculate similarity
-            testimonial_words = set(testimonial.lower().split())
-            existing_words = set(existing.lower().split())
-            
-            if len(testimonial_words) > 0:
-                similarity = len(testimonial_words & existing_words) / len(testimonial_words | existing_words)
-                if similarity > 0.7:  # 70% similarity threshold
-                    is_similar = True
-                    break
-        
-        if not is_similar:
-            final_testimonials.append(testimonial)
+                cleaned = patterns.WHITESPACE.sub(' ', text.strip())
+                testimonials[cleaned] = None
     
-    print(f"   Found {len(final_testimonials)} unique testimonials")
+    # Remove similar testimonials (more than 70% word overlap)
+    final_testimonials = unique_texts(testimonials)
+    
+    logger.debug("Found %d unique testimonials", len(final_testimonials))
     return final_testimonials[:5]
 
-def extract_social_media(soup, page_html):
+def extract_social_media(index, page_html):
     social_links = {}
-    social_patterns = {
-        'Facebook': r'facebook\.com/[a-zA-Z0-9._-]+',
-        'LinkedIn': r'linkedin\.com/company/[a-zA-Z0-9._-]+',
-        'Instagram': r'instagram\.com/[a-zA-Z0-9._-]+',
-        'Twitter': r'twitter\.com/[a-zA-Z0-9._-]+'
-    }
     
-    all_links = soup.find_all('a', href=True)
-    href_text = ' '.join([link.get('href', '') for link in all_links])
+    href_text = ' '.join([link.get('href') for link in index.anchors])
     search_text = page_html + ' ' + href_text
     
-    for platform, pattern in social_patterns.items():
-        matches = re.findall(pattern, search_text, re.IGNORECASE)
-        if matches:
-            url = matches[0]
+    for platform, pattern in patterns.SOCIAL_PATTERNS.items():
+        match = pattern.search(search_text)
+        if match:
+            url = match.group(0)
             if not url.startswith(('http://', 'https://')):
                 url = 'https://' + url
             social_links[platform] = url
@@ -265,12 +208,12 @@ def clean_service_text(text):
     if not text:
         return ""
     
-    cleaned = re.sub(r'\s+', ' ', text.strip())
-    cleaned = re.sub(r'^(Service\s*\d*:?\s*)', '', cleaned, flags=re.IGNORECASE)
-    cleaned = re.sub(r'^[•\-\*\d\.\s]+', '', cleaned)
-    cleaned = re.sub(r'Mon\s*[–-]\s*Fri.*?(?:AM|PM)', '', cleaned, flags=re.IGNORECASE)
-    cleaned = re.sub(r'\d{1,2}:\d{2}\s*(?:AM|PM)', '', cleaned, flags=re.IGNORECASE)
-    cleaned = re.sub(r'\s+', ' ', cleaned).strip()
+    cleaned = patterns.WHITESPACE.sub(' ', text.strip())
+    cleaned = patterns.SERVICE_PREFIX.sub('', cleaned)
+    cleaned = patterns.LIST_MARKERS.sub('', cleaned)
+    cleaned = patterns.WEEKDAY_HOURS.sub('', cleaned)
+    cleaned = patterns.CLOCK_TIME.sub('', cleaned)
+    cleaned = patterns.WHITESPACE.sub(' ', cleaned).strip()
     
     return cleaned
 
@@ -278,104 +221,116 @@ def is_valid_service(text):
     if not text or len(text) < 3:
         return False
     
-    if re.search(r'\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4}', text):
+    if patterns.PHONE_LIKE.search(text):
         return False
     
-    if re.search(r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}', text):
+    if patterns.EMAIL_LIKE.search(text):
         return False
     
     if text.startswith(('http', '/', 'www.', 'https')):
         return False
     
-    if re.match(r'^[\d\s\-\(\)]+$', text):
+    if patterns.NUMBERS_ONLY.match(text):
         return False
     
     return True
 
-def extract_services_dynamically(soup, text_content, url):
+SERVICE_TAGS = ('h1', 'h2', 'h3', 'h4', 'nav', 'ul', 'li', 'div')
+
+# Services reported when a page lists none, by the industry its hostname suggests
+FALLBACK_SERVICES = {
+    'hvac': ('HVAC Services', 'Heating & Cooling', 'Equipment Installation'),
+    'tech': ('Software Development', 'AI & ML Solutions', 'Cloud Services'),
+    industry.GENERAL: ('Professional Services', 'Business Solutions', 'Customer Support'),
+}
+
+def dedupe_services(services, limit=6):
+    """Keep services in sorted order, dropping any contained in (or containing) one already kept.
+    
+    Only the first `limit` survivors are ever used, so the scan stops there and
+    each candidate is compared against at most `limit` kept services.
+    """
+    final_services = []
+    kept_lower = []
+    for service in sorted(services):
+        service_lower = service.lower()
+        if any(service_lower in existing or existing in service_lower for existing in kept_lower):
+            continue
+        final_services.append(service)
+        kept_lower.append(service_lower)
+        if len(final_services) == limit:
+            break
+    return final_services
+
+def extract_services_dynamically(index, text_content, url):
     services = set()
     
-    print(f" Extracting services from: {urlparse(url).netloc}")
+    logger.debug("Extracting services from: %s", url)
     
-    service_elements = soup.find_all(['h1', 'h2', 'h3', 'h4', 'nav', 'ul', 'li', 'div'])
+    # Each element's stripped text length comes from prefix sums, so text is only
+    # built for short candidates. Nested wrappers around the same text share one
+    # span, and repeated texts (menus, card grids) are classified once.
+    seen_spans = set()
+    seen_texts = set()
     
-    for element in service_elements:
-        element_text = element.get_text().strip()
-        
-        if len(element_text) < 3 or len(element_text) > 80:
+    for span, length in index.visible_spans(index.tagged(*SERVICE_TAGS)):
+        if length < 3 or length > 80 or span in seen_spans:
             continue
+        seen_spans.add(span)
         
-        service_keywords = [
-            'solution', 'service', 'product', 'offering', 'platform', 
-            'technology', 'consulting', 'analytics', 'intelligence',
-            'ai', 'data', 'machine learning', 'automation', 'optimization',
-            'installation', 'repair', 'maintenance', 'hvac', 'heating', 
-            'cooling', 'air conditioning', 'furnace', 'plumbing',
-            'development', 'engineering', 'cloud', 'mobile', 'web'
-        ]
+        element_text = index.span_text(span)
+        if element_text in seen_texts:
+            continue
+        seen_texts.add(element_text)
         
-        if any(keyword in element_text.lower() for keyword in service_keywords):
+        if patterns.SERVICE_KEYWORD.search(element_text.lower()):
             cleaned_service = clean_service_text(element_text)
             
             if cleaned_service and is_valid_service(cleaned_service) and 5 < len(cleaned_service) < 60:
-                services.add(cleaned_service)
-                print(f"   Found service: {cleaned_service}")
-    
-    services_list = sorted(list(services))
+                if cleaned_service not in services:
+                    services.add(cleaned_service)
+                    logger.debug("Found service: %s", cleaned_service)
     
-    final_services = []
-    for service in services_list:
-        is_duplicate = False
-        for existing in final_services:
-            if service.lower() in existing.lower() or existing.lower() in service.lower():
-                is_duplicate = True
-                break
-        if not is_duplicate:
-            final_services.append(service)
+    final_services = dedupe_services(services)
     
-    print(f"   Final services count: {len(final_services)}")
+    logger.debug("Final services count: %d", len(final_services))
     
     if final_services:
         return final_services[:6]
-    else:
-        domain = urlparse(url).netloc.lower()
-        if any(term in domain for term in ['hvac', 'heating', 'cooling', 'air', 'belred']):
-            return ['HVAC Services', 'Heating & Cooling', 'Equipment Installation']
-        elif any(term in domain for term in ['fission', 'tech', 'labs']):
-            return ['Software Development', 'AI & ML Solutions', 'Cloud Services']
-        else:
-            return ['Professional Services', 'Business Solutions', 'Customer Support']
+    return list(FALLBACK_SERVICES[industry.classify_domain(urlparse(url).netloc)])
 
-def extract_business_data(soup, url, page_html):
-    text_content = soup.get_text()
-    
-    company_name = extract_company_name(soup, url)
+def extract_business_data(index, url, page_html):
+    text_content = index.text
     
-    # Email extraction
-    emails = []
-    email_matches = re.findall(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b', text_content, re.IGNORECASE)
-    emails.extend(email_matches)
+    with EXTRACTOR_SECONDS.time(extractor='company_name'):
+        company_name = extract_company_name(index, url)
     
-    # Phone extraction
-    phones = []
-    phone_matches = re.findall(r'\b\(?([0-9]{3})\)?[-.\s]?([0-9]{3})[-.\s]?([0-9]{4})\b', text_content)
-    phones.extend([f"({match[0]}) {match[1]}-{match[2]}" for match in phone_matches])
+    # One combined pass finds emails, phones, address and hours candidates
+    with EXTRACTOR_SECONDS.time(extractor='contact_scan'):
+        contact_scan = patterns.scan_contact_text(text_content)
+    emails = contact_scan.emails
+    phones = contact_scan.phones
     
     # STRICT address extraction
-    real_address = extract_real_address(soup, text_content)
+    with EXTRACTOR_SECONDS.time(extractor='address'):
+        real_address = extract_real_address(index, contact_scan)
     addresses = [real_address] if real_address else []
     
     # CLEAN business hours
-    clean_hours = extract_clean_business_hours(text_content)
+    with EXTRACTOR_SECONDS.time(extractor='hours'):
+        clean_hours = extract_clean_business_hours(contact_scan)
     hours = [clean_hours] if clean_hours else []
     
     # Services
-    services = extract_services_dynamically(soup, text_content, url)
+    with EXTRACTOR_SECONDS.time(extractor='services'):
+        services = extract_services_dynamically(index, text_content, url)
     
     # UNIQUE testimonials
-    testimonials = extract_unique_testimonials(soup, text_content)
+    with EXTRACTOR_SECONDS.time(extractor='testimonials'):
+        testimonials = extract_unique_testimonials(index, text_content)
     
-    social_media = extract_social_media(soup, page_html)
+    with EXTRACTOR_SECONDS.time(extractor='social_media'):
+        social_media = extract_social_media(index, page_html)
     
     return {
         'company_name': company_name,
@@ -388,137 +343,194 @@ def extract_business_data(soup, url, page_html):
         'social_media': social_media
     }
 
-def run(url, return_data=False):
-    """FAST discovery with clean address and business hours"""
+def merge_page_data(profile, page_data):
+    """Fold one page's extraction results into the site-wide profile"""
+    if not profile.company_name and page_data['company_name']:
+        profile.company_name = page_data['company_name']
+        logger.info("Company name: %s", page_data['company_name'])
+    
+    for service in page_data['services']:
+        if service not in profile.services and is_valid_service(service):
+            profile.services.append(service)
+    
+    for testimonial in page_data['testimonials']:
+        if testimonial not in profile.testimonials:
+            profile.testimonials.append(testimonial)
+    
+    for key in ['emails', 'phones', 'addresses', 'hours']:
+        getattr(profile, key).extend(page_data[key])
+    
+    profile.social_media.update(page_data['social_media'])
+
+def extract_links(index):
+    """(href, anchor text) pairs for every followable link on the page, for the crawler"""
+    links = []
+    for link in index.anchors:
+        href = link.get('href').strip()
+        if href and not href.startswith(('#', 'mailto:', 'tel:', 'javascript:')):
+            links.append((href, ' '.join(index.strings_of(link))))
+    return links
+
+def extract_page(page_url, page_html, encoding=None):
+    """Parse one page and run every extractor, memoized by a hash of the HTML.
+
+    Extraction output depends only on the HTML and the site's domain, so
+    byte-identical pages skip parsing entirely. Links are returned as found
+    (relative hrefs unresolved) so cached results stay valid for any path.
+    `page_html` may be the page's bytes as fetched, in `encoding`; lxml then
+    parses them directly.
+    """
+    cache = extraction_cache.get_extraction_cache()
+    key = extraction_cache.content_key(EXTRACTOR_VERSION, site_key(page_url), page_html, encoding)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached['data'], cached['links']
+    
+    html_text = page_html
+    if isinstance(page_html, bytes):
+        encoding = encoding or 'utf-8'
+        try:
+            html_text = page_html.decode(encoding)
+        except UnicodeDecodeError:
+            # lxml would pass the invalid bytes through into its strings; parse the repaired text
+            html_text = page_html = page_html.decode(encoding, 'replace')
+    with PARSE_SECONDS.time():
+        index = build_dom_index(page_html, encoding)
+    page_data = extract_business_data(index, page_url, html_text)
+    links = extract_links(index)
+    cache.put(key, {'data': page_data, 'links': links})
+    return page_data, links
+
+def is_profile_complete(profile):
+    """True once every business field has at least one value"""
+    return all(getattr(profile, key) for key in PROFILE_FIELDS)
+
+PROFILE_FIELDS = [
+    'company_name', 'emails', 'phones', 'addresses', 'hours',
+    'services', 'testimonials', 'social_media'
+]
+
+def analyze(url, max_pages=None, max_depth=None, time_budget=None):
+    """Crawl the site once and return the structured business profile"""
     try:
-        print(f" Starting FAST analysis: {url}")
+        logger.info("Starting FAST analysis: %s", url)
         
-        headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'}
+        profile = DiscoveryProfile(website=url)
         
-        target_pages = [
-            url,
-            url.rstrip('/') + '/about'
-        ]
+        def process_page(page):
+            page_data, links = extract_page(page.url, page.content, page.encoding)
+            merge_page_data(profile, page_data)
+            profile.pages_analyzed += 1
+            return [(urljoin(page.url, href), anchor_text) for href, anchor_text in links]
         
-        all_data = {
-            'company_name': '',
-            'emails': [], 'phones': [], 'addresses': [], 'hours': [], 
-            'services': [], 'testimonials': [], 'social_media': {}
-        }
-        
-        pages_analyzed = 0
-        
-        for page_url in target_pages:
-            if pages_analyzed >= 2:
-                break
-            
-            try:
-                print(f"📄 Analyzing: {page_url}")
-                response = requests.get(page_url, timeout=5, headers=headers)
-                soup = BeautifulSoup(response.text, 'html.parser')
-                
-                page_data = extract_business_data(soup, page_url, response.text)
-                
-                if not all_data['company_name'] and page_data['company_name']:
-                    all_data['company_name'] = page_data['company_name']
-                    print(f" Company name: {page_data['company_name']}")
-                
-                for service in page_data['services']:
-                    if service not in all_data['services'] and is_valid_service(service):
-                        all_data['services'].append(service)
-                
-                for testimonial in page_data['testimonials']:
-                    if testimonial not in all_data['testimonials']:
-                        all_data['testimonials'].append(testimonial)
-                
-                for key in ['emails', 'phones', 'addresses', 'hours']:
-                    all_data[key].extend(page_data[key])
-                
-                all_data['social_media'].update(page_data['social_media'])
-                
-                pages_analyzed += 1
-                print(f"✅ Done: {page_url}")
-                
-            except Exception as e:
-                print(f" Skipped {page_url}: {e}")
-                continue
+        # Seeds from the root, /about, sitemap.xml and in-page links; pages are fetched
+        # in parallel waves and merged into the profile as they arrive
+        crawl(
+            url, process_page,
+            is_complete=lambda: is_profile_complete(profile),
+            max_pages=max_pages, max_depth=max_depth, time_budget=time_budget
+        )
         
         # Clean up duplicates for contact info
         for key in ['emails', 'phones', 'addresses', 'hours']:
-            all_data[key] = list(set([str(item).strip() for item in all_data[key] if str(item).strip()]))
-        
-        all_data['services'] = all_data['services'][:6]
-        all_data['testimonials'] = all_data['testimonials'][:3]
-        
-        if return_data:
-            print(f" Returning data: {all_data['company_name']}")
-            return all_data
-        
-        # Format output
-        lines = []
-        lines.append(" BUSINESS INTELLIGENCE ANALYSIS")
-        lines.append("=" * 50)
-        lines.append("")
-        lines.append(" COMPANY INFORMATION:")
-        lines.append(f"   • Name: {all_data['company_name'] or 'Business Analysis Report'}")
-        lines.append(f"   • Website: {url}")
-        lines.append(f"   • Pages Analyzed: {pages_analyzed}")
-        lines.append("")
-        lines.append(" CONTACT INFORMATION:")
-        if all_data['phones']:
-            for i, phone in enumerate(all_data['phones'][:3], 1):
-                lines.append(f"   • Phone {i}: {phone}")
-        else:
-            lines.append("   • Phone: Available via contact form")
-        
-        if all_data['emails']:
-            for i, email in enumerate(all_data['emails'][:3], 1):
-                lines.append(f"   • Email {i}: {email}")
-        else:
-            lines.append("   • Email: Available via contact form")
-        
-        if all_data['addresses']:
-            lines.append(f"   • Address: {all_data['addresses'][0]}")
-        else:
-            lines.append("   • Address: Contact company for location details")
-        
-        if all_data['hours']:
-            lines.append(f"   • Business Hours: {all_data['hours'][0]}")
-        else:
-            lines.append("   • Business Hours: Contact for current hours")
-        
-        lines.append("")
-        lines.append("🔧 SERVICES OFFERED:")
-        if all_data['services']:
-            for i, service in enumerate(all_data['services'], 1):
-                lines.append(f"   • Service {i}: {service}")
-        else:
-            lines.append("   • Services: Professional business solutions")
+            setattr(profile, key, list(set([str(item).strip() for item in getattr(profile, key) if str(item).strip()])))
         
-        lines.append("")
-        lines.append(" SOCIAL MEDIA PRESENCE:")
-        if all_data['social_media']:
-            for platform, social_url in all_data['social_media'].items():
-                lines.append(f"   • {platform}: {social_url}")
-        else:
-            lines.append("   • Social Media: Available on major platforms")
+        profile.services = profile.services[:6]
+        # Pages are deduplicated on their own; reviews repeated across pages are caught here
+        profile.testimonials = unique_texts(profile.testimonials)[:3]
         
-        lines.append("")
-        lines.append("⭐ CUSTOMER REVIEWS:")
-        if all_data['testimonials']:
-            for i, testimonial in enumerate(all_data['testimonials'], 1):
-                display_testimonial = testimonial[:100] + "..." if len(testimonial) > 100 else testimonial
-                lines.append(f"   • Review {i}: {display_testimonial}")
-        else:
-            lines.append("   • Reviews: Positive customer feedback available")
+        # Classified once here; every later agent reads it off the profile
+        industry.classify_profile(profile)
+        logger.info("Industry: %s (%.0f%% confidence)", industry.label(profile.industry),
+                    profile.industry_confidence * 100)
         
-        lines.append("")
-        lines.append(" STATUS: Fast Business Intelligence Complete")
-        lines.append(" READY FOR: Strategic Analysis")
+        if logger.isEnabledFor(logging.DEBUG):
+            cache_stats = http_cache.stats()
+            if cache_stats:
+                logger.debug("HTTP cache: %d fresh hits, %d revalidated, %d downloads",
+                             cache_stats['hits'], cache_stats['revalidated'], cache_stats['misses'])
+            extraction_stats = extraction_cache.stats()
+            logger.debug("Extraction cache: %d hits, %d misses",
+                         extraction_stats['memory_hits'] + extraction_stats['disk_hits'], extraction_stats['misses'])
         
-        return "\n".join(lines)
+        logger.info("Returning data: %s (%d pages)", profile.company_name, profile.pages_analyzed)
+        return profile
         
     except Exception as e:
-        if return_data:
-            return {'company_name': 'Error Company', 'services': [], 'emails': [], 'phones': [], 'social_media': {}}
-        return f" Fast Analysis Error: {str(e)}"
+        logger.exception("Fast Analysis Error: %s", e)
+        return DiscoveryProfile(company_name='Error Company', website=url, error=str(e))
+
+def format_report(profile):
+    """Render a structured discovery profile as the text report shown in the UI"""
+    if profile.error:
+        return f" Fast Analysis Error: {profile.error}"
+    
+    lines = []
+    lines.append(" BUSINESS INTELLIGENCE ANALYSIS")
+    lines.append("=" * 50)
+    lines.append("")
+    lines.append(" COMPANY INFORMATION:")
+    lines.append(f"   • Name: {profile.company_name or 'Business Analysis Report'}")
+    lines.append(f"   • Website: {profile.website}")
+    lines.append(f"   • Pages Analyzed: {profile.pages_analyzed}")
+    lines.append("")
+    lines.append(" CONTACT INFORMATION:")
+    if profile.phones:
+        for i, phone in enumerate(profile.phones[:3], 1):
+            lines.append(f"   • Phone {i}: {phone}")
+    else:
+        lines.append("   • Phone: Available via contact form")
+    
+    if profile.emails:
+        for i, email in enumerate(profile.emails[:3], 1):
+            lines.append(f"   • Email {i}: {email}")
+    else:
+        lines.append("   • Email: Available via contact form")
+    
+    if profile.addresses:
+        lines.append(f"   • Address: {profile.addresses[0]}")
+    else:
+        lines.append("   • Address: Contact company for location details")
+    
+    if profile.hours:
+        lines.append(f"   • Business Hours: {profile.hours[0]}")
+    else:
+        lines.append("   • Business Hours: Contact for current hours")
+    
+    lines.append("")
+    lines.append("🔧 SERVICES OFFERED:")
+    if profile.services:
+        for i, service in enumerate(profile.services, 1):
+            lines.append(f"   • Service {i}: {service}")
+    else:
+        lines.append("   • Services: Professional business solutions")
+    
+    lines.append("")
+    lines.append(" SOCIAL MEDIA PRESENCE:")
+    if profile.social_media:
+        for platform, social_url in profile.social_media.items():
+            lines.append(f"   • {platform}: {social_url}")
+    else:
+        lines.append("   • Social Media: Available on major platforms")
+    
+    lines.append("")
+    lines.append("⭐ CUSTOMER REVIEWS:")
+    if profile.testimonials:
+        for i, testimonial in enumerate(profile.testimonials, 1):
+            display_testimonial = testimonial[:100] + "..." if len(testimonial) > 100 else testimonial
+            lines.append(f"   • Review {i}: {display_testimonial}")
+    else:
+        lines.append("   • Reviews: Positive customer feedback available")
+    
+    lines.append("")
+    lines.append(" STATUS: Fast Business Intelligence Complete")
+    lines.append(" READY FOR: Strategic Analysis")
+    
+    return "\n".join(lines)
+
+def run(url, return_data=False):
+    """FAST discovery with clean address and business hours"""
+    profile = analyze(url)
+    if return_data:
+        return profile
+    return format_report(profile)
@@ -0,0 +1,222 @@
+import re
+import lxml.html
+from lxml import etree
+
+# Strings inside these elements never count as page text (same as BeautifulSoup.get_text)
+NON_TEXT_TAGS = frozenset(['script', 'style', 'template', 'rt', 'rp'])
+
+# Elements the extractors look at; everything else is walked but not recorded
+INDEXED_TAGS = frozenset([
+    'title', 'h1', 'h2', 'h3', 'h4', 'nav', 'ul', 'li', 'div', 'section',
+    'p', 'span', 'blockquote', 'q', 'a', 'img'
+])
+
+# Class-keyword buckets: bucket name -> (tags it applies to, class pattern)
+CLASS_BUCKETS = {
+    'contact': (frozenset(['div', 'section']), re.compile(r'contact|address|location', re.I)),
+    'review': (frozenset(['div', 'p', 'blockquote', 'span']), re.compile(r'review|testimonial|feedback|comment', re.I)),
+}
+
+ADDRESS_ITEMPROP = re.compile(r'address|streetAddress', re.I)
+
+_UTF8_PARSER = lxml.html.HTMLParser(encoding='utf-8')
+# Parsers for pages handed over as bytes, by encoding
+_PARSERS = {'utf-8': _UTF8_PARSER}
+
+class Node:
+    """An indexed element and the slice of page text segments it covers"""
+    __slots__ = ('tag', 'element', 'start', 'end')
+
+    def __init__(self, tag, element, start):
+        self.tag = tag
+        self.element = element
+        self.start = start
+        self.end = start
+
+    def get(self, name, default=''):
+        return self.element.get(name, default)
+
+class Image:
+    """An <img> with the class attributes of its ancestors, for logo/brand lookups"""
+    __slots__ = ('alt', 'css_class', 'ancestor_classes')
+
+    def __init__(self, alt, css_class, ancestor_classes):
+        self.alt = alt
+        self.css_class = css_class
+        self.ancestor_classes = ancestor_classes
+
+    def has_ancestor_class(self, token):
+        return any(token in classes.split() for classes in self.ancestor_classes)
+
+    def has_ancestor_class_containing(self, fragment):
+        return any(fragment in classes for classes in self.ancestor_classes)
+
+class DomIndex:
+    """Everything the discovery extractors need from one page, built in a single walk"""
+
+    def __init__(self):
+        self.segments = []
+        self.by_tag = {}
+        self.by_class = {bucket: [] for bucket in CLASS_BUCKETS}
+        self.itemprop_addresses = []
+        self.anchors = []
+        self.images = []
+        self._text = None
+        self._metrics = None
+
+    @property
+    def text(self):
+        """Full page text, equivalent to soup.get_text()"""
+        if self._text is None:
+            self._text = ''.join(self.segments)
+        return self._text
+
+    def text_of(self, node):
+        return ''.join(self.segments[node.start:node.end])
+
+    def strings_of(self, node):
+        """Stripped, non-empty text fragments of a node (soup.get_text(' ', strip=True) parts)"""
+        return [segment.strip() for segment in self.segments[node.start:node.end] if segment.strip()]
+
+    def _text_metrics(self):
+        """Per-segment prefix lengths and nearest non-blank neighbours, built once in O(n)"""
+        if self._metrics is None:
+            count = len(self.segments)
+            prefix = [0] * (count + 1)
+            lead = [0] * count
+            trail = [0] * count
+            next_text = [count] * (count + 1)
+            prev_text = [-1] * (count + 1)
+            for i, segment in enumerate(self.segments):
+                prefix[i + 1] = prefix[i] + len(segment)
+                stripped = segment.strip()
+                if stripped:
+                    lead[i] = len(segment) - len(segment.lstrip())
+                    trail[i] = len(segment) - len(segment.rstrip())
+                    prev_text[i + 1] = i
+                else:
+                    prev_text[i + 1] = prev_text[i]
+            for i in range(count - 1, -1, -1):
+                next_text[i] = i if self.segments[i].strip() else next_text[i + 1]
+            self._metrics = (prefix, lead, trail, next_text, prev_text)
+        return self._metrics
+
+    def visible_spans(self, nodes):
+        """Yield (span, stripped length) for each node that has visible text.
+
+        A span is the (first, last) pair of non-blank segments the node covers;
+        the length is that of its text after strip(), computed without building
+        the string. Wrapper elements whose only content is the same text share a
+        span, so callers can use it as a key to handle each distinct text once.
+        """
+        prefix, lead, trail, next_text, prev_text = self._text_metrics()
+        for node in nodes:
+            first = next_text[node.start]
+            if first >= node.end:
+                continue
+            last = prev_text[node.end]
+            yield (first, last), prefix[last + 1] - prefix[first] - lead[first] - trail[last]
+
+    def span_text(self, span):
+        first, last = span
+        return ''.join(self.segments[first:last + 1]).strip()
+
+    def tagged(self, *tags):
+        nodes = []
+        for tag in tags:
+            nodes.extend(self.by_tag.get(tag, ()))
+        return nodes
+
+    def first(self, tag):
+        nodes = self.by_tag.get(tag)
+        return nodes[0] if nodes else None
+
+def _parser_for(encoding):
+    parser = _PARSERS.get(encoding)
+    if parser is None:
+        try:
+            parser = lxml.html.HTMLParser(encoding=encoding)
+        except LookupError:
+            # A codec Python knows but libxml2 doesn't; let libxml2 sniff the page instead
+            parser = lxml.html.HTMLParser()
+        _PARSERS[encoding] = parser
+    return parser
+
+def parse_html(html, encoding=None):
+    """Parse a page with lxml; returns the <html> root or None for empty documents.
+
+    `html` is a str, or the page's bytes as downloaded together with their
+    `encoding`, which lxml reads without decoding them to a str first.
+    """
+    if not html or html.isspace():
+        return None
+    try:
+        if isinstance(html, bytes):
+            return lxml.html.document_fromstring(html, parser=_parser_for(encoding or 'utf-8'))
+        try:
+            return lxml.html.document_fromstring(html)
+        except ValueError:
+            # lxml refuses str input that carries an XML encoding declaration
+            return lxml.html.document_fromstring(html.encode('utf-8', 'replace'), parser=_UTF8_PARSER)
+    except etree.ParserError:
+        return None
+
+def build_dom_index(html, encoding=None):
+    """Parse once and walk the tree once, recording elements by tag, class bucket and role"""
+    index = DomIndex()
+    root = parse_html(html, encoding)
+    if root is None:
+        return index
+
+    segments = index.segments
+    by_tag = index.by_tag
+    open_nodes = []
+    class_stack = []
+    hidden_depth = 0
+
+    for event, element in etree.iterwalk(root, events=('start', 'end')):
+        tag = element.tag
+        if not isinstance(tag, str):
+            # Comments and processing instructions: only their tail is page text
+            if event == 'end' and element.tail and not hidden_depth:
+                segments.append(element.tail)
+            continue
+
+        if event == 'start':
+            node = None
+            if tag in INDEXED_TAGS:
+                node = Node(tag, element, len(segments))
+                by_tag.setdefault(tag, []).append(node)
+                css_class = element.get('class', '')
+                if css_class:
+                    for bucket, (tags, pattern) in CLASS_BUCKETS.items():
+                        if tag in tags and pattern.search(css_class):
+                            index.by_class[bucket].append(node)
+                if tag == 'a' and element.get('href') is not None:
+                    index.anchors.append(node)
+                elif tag == 'img':
+                    index.images.append(Image(element.get('alt', ''), css_class, tuple(class_stack)))
+
+            itemprop = element.get('itemprop')
+            if itemprop and ADDRESS_ITEMPROP.search(itemprop):
+                if node is None:
+                    node = Node(tag, element, len(segments))
+                index.itemprop_addresses.append(node)
+
+            open_nodes.append(node)
+            class_stack.append(element.get('class', ''))
+            if tag in NON_TEXT_TAGS:
+                hidden_depth += 1
+            elif element.text and not hidden_depth:
+                segments.append(element.text)
+        else:
+            node = open_nodes.pop()
+            class_stack.pop()
+            if node is not None:
+                node.end = len(segments)
+            if tag in NON_TEXT_TAGS:
+                hidden_depth -= 1
+            if element.tail and not hidden_depth:
+                segments.append(element.tail)
+
+    return index
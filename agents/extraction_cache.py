@@ -0,0 +1,107 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from agents.sqlite_store import SQLiteStore, default_cache_path
+from agents.log import get_logger
+
+EXTRACTION_CACHE_SIZE = int(os.getenv('EXTRACTION_CACHE_SIZE', '512'))
+# Optional shared tier so every gunicorn worker benefits from the others' work
+EXTRACTION_CACHE_DISK = os.getenv('EXTRACTION_CACHE_DISK', '0') == '1'
+EXTRACTION_CACHE_PATH = os.getenv('EXTRACTION_CACHE_PATH', default_cache_path('extraction_cache.sqlite3'))
+EXTRACTION_CACHE_DISK_ENTRIES = int(os.getenv('EXTRACTION_CACHE_DISK_ENTRIES', '20000'))
+
+_cache = None
+_cache_lock = threading.Lock()
+
+logger = get_logger(__name__)
+
+def content_key(version, scope, html, encoding=None):
+    """Cache key for one page: extractor version + scope (e.g. site) + hash of the HTML,
+    given as a str or as downloaded bytes in `encoding` (hashed as they are)"""
+    if isinstance(html, bytes):
+        digest = hashlib.sha256(f"{encoding}:".encode('ascii', 'replace'))
+        digest.update(html)
+        digest = digest.hexdigest()
+    else:
+        digest = hashlib.sha256(html.encode('utf-8', 'surrogatepass')).hexdigest()
+    return f"{version}:{scope}:{digest}"
+
+class ExtractionCache:
+    """In-process LRU of extraction results with an optional SQLite tier behind it.
+
+    Cached values are shared between callers and must be treated as read-only.
+    """
+
+    def __init__(self, max_entries=EXTRACTION_CACHE_SIZE, disk_path=None,
+                 disk_entries=EXTRACTION_CACHE_DISK_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0}
+        self.disk = None
+        if disk_path:
+            try:
+                self.disk = SQLiteStore(disk_path, max_entries=disk_entries)
+            except (OSError, sqlite3.Error) as e:
+                logger.warning("Extraction disk cache disabled: %s", e)
+
+    def get(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self._stats['memory_hits'] += 1
+                return self._entries[key]
+
+        if self.disk is not None:
+            try:
+                row = self.disk.get(key)
+            except sqlite3.Error as e:
+                logger.warning("Extraction disk cache read failed: %s", e)
+                row = None
+            if row is not None:
+                value = json.loads(row[0])
+                self._remember(key, value)
+                with self._lock:
+                    self._stats['disk_hits'] += 1
+                return value
+
+        with self._lock:
+            self._stats['misses'] += 1
+        return None
+
+    def put(self, key, value):
+        self._remember(key, value)
+        if self.disk is not None:
+            try:
+                self.disk.put(key, json.dumps(value, separators=(',', ':')).encode('utf-8'))
+            except (sqlite3.Error, TypeError, ValueError) as e:
+                logger.warning("Extraction disk cache write failed: %s", e)
+
+    def _remember(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats['memory_hits'] + stats['disk_hits'] + stats['misses']
+        stats['hit_ratio'] = round((lookups - stats['misses']) / lookups, 3) if lookups else 0.0
+        return stats
+
+def get_extraction_cache():
+    """Process-wide extraction cache"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ExtractionCache(disk_path=EXTRACTION_CACHE_PATH if EXTRACTION_CACHE_DISK else None)
+    return _cache
+
+def stats():
+    return get_extraction_cache().stats()
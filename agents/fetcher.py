@@ -0,0 +1,277 @@
+import codecs
+import os
+import re
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
+from agents import metrics
+from agents.http_cache import get_http_cache
+from agents.log import get_logger, run_in_context
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+    # Only what _Decoder can inflate incrementally
+    'Accept-Encoding': 'gzip, deflate',
+}
+
+# Keep-alive connections held per host; extra requests to the same host wait for a free one
+MAX_CONNECTIONS_PER_HOST = int(os.getenv('FETCH_MAX_CONNECTIONS_PER_HOST', '4'))
+# Distinct hosts whose connection pools are kept open at once
+MAX_POOLED_HOSTS = int(os.getenv('FETCH_MAX_POOLED_HOSTS', '32'))
+MAX_FETCH_WORKERS = int(os.getenv('FETCH_MAX_WORKERS', '16'))
+# Bodies are cut off after this many (decompressed) bytes and parsed as far as they got
+FETCH_MAX_BYTES = int(os.getenv('FETCH_MAX_BYTES', str(5 * 1024 * 1024)))
+# Wall-clock limit for one page, headers to last byte; the timeout only bounds each read
+FETCH_DEADLINE = float(os.getenv('FETCH_DEADLINE', '10'))
+# Anything else (images, PDFs, archives) is dropped as soon as the headers arrive
+ACCEPTED_CONTENT_TYPES = frozenset(['text/html', 'application/xhtml+xml', 'text/xml', 'application/xml',
+                                    'text/plain'])
+
+CHUNK_SIZE = 64 * 1024
+HEADER_CHARSET = re.compile(r'charset=["\']?([\w.:-]+)', re.I)
+META_CHARSET = re.compile(rb'<meta[^>]+charset=["\']?\s*([\w.:-]+)', re.I)
+# How far into the page a <meta charset> is looked for
+CHARSET_SNIFF_BYTES = 2048
+
+FETCH_SECONDS = metrics.histogram('fetch_seconds', "Page fetch latency by where the page came from "
+                                  "(network, cache or error)", ['source'])
+FETCH_BYTES = metrics.histogram('fetch_bytes', "Size of pages downloaded over the network",
+                                buckets=metrics.SIZE_BUCKETS)
+FETCH_IN_FLIGHT = metrics.gauge('fetch_in_flight', "Page fetches in progress")
+FETCH_STOPPED = metrics.counter('fetch_stopped', "Downloads cut short (content_type, encoding, deadline, "
+                                "incomplete or max_bytes)", ['reason'])
+
+_session = None
+_executor = None
+_lock = threading.Lock()
+
+logger = get_logger(__name__)
+
+class DownloadStopped(Exception):
+    """A download abandoned early: unwanted Content-Type, undecodable body or past its deadline"""
+
+    def __init__(self, reason, message):
+        super().__init__(message)
+        self.reason = reason
+
+class FetchResult:
+    """Outcome of fetching a single page.
+
+    `content` is the body as downloaded (after Content-Encoding) in `encoding`;
+    `text` decodes it on first use. `truncated` pages stopped at FETCH_MAX_BYTES.
+    """
+
+    def __init__(self, url, status_code=None, content=b'', encoding='utf-8', error=None, elapsed=0.0,
+                 from_cache=False, truncated=False):
+        self.url = url
+        self.status_code = status_code
+        self.content = content
+        self.encoding = encoding
+        self.error = error
+        self.elapsed = elapsed
+        self.from_cache = from_cache
+        self.truncated = truncated
+        self._text = None
+
+    @property
+    def text(self):
+        if self._text is None:
+            self._text = self.content.decode(self.encoding, 'replace')
+        return self._text
+
+    @property
+    def ok(self):
+        return self.error is None
+
+class _Decoder:
+    """Undoes a gzip or deflate Content-Encoding chunk by chunk, never inflating more than
+    asked for, so a compression bomb stops at the size cap like any other large page"""
+
+    def __init__(self, content_encoding):
+        codings = [coding.strip().lower() for coding in content_encoding.split(',')]
+        codings = [coding for coding in codings if coding and coding != 'identity']
+        if len(codings) > 1 or (codings and codings[0] not in ('gzip', 'x-gzip', 'deflate')):
+            raise DownloadStopped('encoding', f"unsupported Content-Encoding {content_encoding!r}")
+        self.coding = codings[0] if codings else None
+        self._started = False
+        # Detects the gzip or zlib header itself; raw deflate (an old IIS habit) is tried on failure
+        self._zlib = zlib.decompressobj(zlib.MAX_WBITS | 32) if self.coding else None
+
+    def decompress(self, data, max_length):
+        """Up to `max_length` bytes of body from `data`; more only exists when exactly
+        `max_length` come back"""
+        if self._zlib is None:
+            return data
+        try:
+            output = self._zlib.decompress(data, max_length)
+        except zlib.error as e:
+            if self._started or self.coding != 'deflate':
+                raise DownloadStopped('encoding', f"corrupt {self.coding} body: {e}") from e
+            self._started = True
+            self._zlib = zlib.decompressobj(-zlib.MAX_WBITS)
+            return self.decompress(data, max_length)
+        self._started = True
+        # Concatenated gzip members: carry on with the next one
+        while self._zlib.eof and self._zlib.unused_data and len(output) < max_length:
+            rest = self._zlib.unused_data
+            self._zlib = zlib.decompressobj(zlib.MAX_WBITS | 32)
+            output += self._zlib.decompress(rest, max_length - len(output))
+        return output
+
+def get_session():
+    """Process-wide keep-alive session shared by every discovery fetch"""
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                session = requests.Session()
+                session.headers.update(DEFAULT_HEADERS)
+                adapter = HTTPAdapter(
+                    pool_connections=MAX_POOLED_HOSTS,
+                    pool_maxsize=MAX_CONNECTIONS_PER_HOST,
+                    pool_block=True
+                )
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                _session = session
+    return _session
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=MAX_FETCH_WORKERS, thread_name_prefix='fetch')
+    return _executor
+
+def fetch_page(url, timeout=5, max_seconds=None):
+    """Fetch one page over the shared session, capturing errors instead of raising.
+
+    Pages in the HTTP cache are served from disk while fresh and revalidated
+    with a conditional GET once stale, so unchanged pages cost at most a 304.
+    Downloads are streamed: non-HTML types are dropped at the headers, bodies
+    stop at FETCH_MAX_BYTES, and the whole fetch gives up after `max_seconds`
+    (at most FETCH_DEADLINE).
+    """
+    max_seconds = FETCH_DEADLINE if max_seconds is None else min(max_seconds, FETCH_DEADLINE)
+    with FETCH_IN_FLIGHT.track():
+        result = _fetch_page(url, timeout, max_seconds)
+    source = 'error' if result.error is not None else 'cache' if result.from_cache else 'network'
+    FETCH_SECONDS.observe(result.elapsed, source=source)
+    return result
+
+def _fetch_page(url, timeout, max_seconds):
+    started = time.monotonic()
+    cache = get_http_cache()
+    try:
+        entry = cache.lookup(url) if cache else None
+        if entry is not None and entry.is_fresh(cache.ttl):
+            cache.record_hit()
+            return FetchResult(url, entry.meta.get('status_code', 200), entry.content, entry.encoding,
+                               elapsed=time.monotonic() - started, from_cache=True)
+
+        headers = entry.conditional_headers() if entry is not None else None
+        response = get_session().get(url, timeout=timeout, headers=headers, stream=True)
+        try:
+            if response.status_code == 304 and entry is not None:
+                cache.revalidated(entry, response)
+                return FetchResult(url, entry.meta.get('status_code', 200), entry.content, entry.encoding,
+                                   elapsed=time.monotonic() - started, from_cache=True)
+
+            content_type = response.headers.get('Content-Type', '')
+            media_type = content_type.split(';')[0].strip().lower()
+            if media_type and media_type not in ACCEPTED_CONTENT_TYPES:
+                raise DownloadStopped('content_type', f"not a web page ({media_type})")
+            content, truncated = read_body(response, started + max_seconds)
+        finally:
+            # Hands a fully read connection back to the pool; one cut short is closed
+            response.close()
+
+        encoding = detect_encoding(content_type, content)
+        FETCH_BYTES.observe(len(content))
+        if truncated:
+            FETCH_STOPPED.inc(reason='max_bytes')
+            logger.info("Stopped reading %s at %d bytes", url, len(content))
+        if cache:
+            cache.record_miss()
+            if not truncated:
+                cache.store_response(url, response, content, encoding)
+        return FetchResult(url, response.status_code, content, encoding,
+                           elapsed=time.monotonic() - started, truncated=truncated)
+    except DownloadStopped as e:
+        FETCH_STOPPED.inc(reason=e.reason)
+        return FetchResult(url, error=e, elapsed=time.monotonic() - started)
+    except Exception as e:
+        return FetchResult(url, error=e, elapsed=time.monotonic() - started)
+
+def read_body(response, deadline, max_bytes=None):
+    """(body, truncated) for a streamed response: read in chunks, inflated as they come,
+    and cut off after `max_bytes` (FETCH_MAX_BYTES). Raises DownloadStopped once
+    time.monotonic() passes `deadline`."""
+    max_bytes = FETCH_MAX_BYTES if max_bytes is None else max_bytes
+    decoder = _Decoder(response.headers.get('Content-Encoding', ''))
+    chunks = []
+    size = 0
+    for chunk in _raw_chunks(response):
+        if time.monotonic() > deadline:
+            raise DownloadStopped('deadline', f"download still running after {size} bytes")
+        # One byte past the cap tells a page that is exactly max_bytes from a longer one
+        data = decoder.decompress(chunk, max_bytes - size + 1)
+        if size + len(data) > max_bytes:
+            chunks.append(data[:max_bytes - size])
+            return b''.join(chunks), True
+        chunks.append(data)
+        size += len(data)
+    # Read to the end, so the connection can serve the next request
+    response.raw.release_conn()
+    return b''.join(chunks), False
+
+def _raw_chunks(response):
+    """The body as it arrives, still content-encoded.
+
+    http.client's read1() returns whatever has arrived, while urllib3 2.0's
+    read(amt) waits for a full chunk, which would keep a slow-drip server out of
+    sight of the deadline. urllib3 keeps the http.client response in the private
+    `_fp` (checked against the urllib3 2.0 pinned in requirements.txt); when it
+    isn't there, this falls back to urllib3's own reader.
+    """
+    body = getattr(response.raw, '_fp', None)
+    if not hasattr(body, 'read1'):
+        yield from response.raw.stream(CHUNK_SIZE, decode_content=False)
+        return
+    while True:
+        chunk = body.read1(CHUNK_SIZE)
+        if not chunk:
+            break
+        yield chunk
+    # read1() ends quietly when the server hangs up early; urllib3's reader raises instead
+    if getattr(body, 'length', None):
+        raise DownloadStopped('incomplete', f"connection closed {body.length} bytes short of Content-Length")
+
+def detect_encoding(content_type, content):
+    """The charset from the Content-Type header, else from a <meta> tag near the top of
+    the page, else UTF-8"""
+    match = HEADER_CHARSET.search(content_type)
+    if match:
+        name = match.group(1)
+    else:
+        match = META_CHARSET.search(content, 0, CHARSET_SNIFF_BYTES)
+        name = match.group(1).decode('ascii', 'replace') if match else 'utf-8'
+    try:
+        return codecs.lookup(name).name
+    except LookupError:
+        return 'utf-8'
+
+def fetch_pages(urls, timeout=5, max_seconds=None):
+    """Fetch all URLs concurrently; results come back in the order of `urls`"""
+    urls = list(urls)
+    if len(urls) <= 1:
+        return [fetch_page(page_url, timeout, max_seconds) for page_url in urls]
+
+    executor = _get_executor()
+    fetch = run_in_context(fetch_page)
+    futures = [executor.submit(fetch, page_url, timeout, max_seconds) for page_url in urls]
+    return [future.result() for future in futures]
@@ -0,0 +1,139 @@
+import os
+import sqlite3
+import threading
+import time
+from agents.sqlite_store import SQLiteStore, default_cache_path
+from agents.urls import normalize_url
+from agents.log import get_logger
+
+HTTP_CACHE_ENABLED = os.getenv('HTTP_CACHE_ENABLED', '1') != '0'
+HTTP_CACHE_PATH = os.getenv('HTTP_CACHE_PATH', default_cache_path('http_cache.sqlite3'))
+# Pages younger than this are served straight from disk; older ones are revalidated
+HTTP_CACHE_TTL = float(os.getenv('HTTP_CACHE_TTL', '3600'))
+HTTP_CACHE_MAX_ENTRIES = int(os.getenv('HTTP_CACHE_MAX_ENTRIES', '5000'))
+HTTP_CACHE_MAX_BYTES = int(os.getenv('HTTP_CACHE_MAX_BYTES', str(200 * 1024 * 1024)))
+
+_cache = None
+_cache_lock = threading.Lock()
+
+logger = get_logger(__name__)
+
+class CachedPage:
+    """A page body held in the HTTP cache, as the decoded bytes of its download"""
+
+    def __init__(self, key, content, meta, stored_at):
+        self.key = key
+        self.content = content
+        self.meta = meta
+        self.stored_at = stored_at
+
+    @property
+    def encoding(self):
+        # Entries written before the encoding was recorded hold UTF-8 text
+        return self.meta.get('encoding', 'utf-8')
+
+    def is_fresh(self, ttl):
+        return time.time() - self.stored_at < ttl
+
+    def conditional_headers(self):
+        headers = {}
+        if self.meta.get('etag'):
+            headers['If-None-Match'] = self.meta['etag']
+        if self.meta.get('last_modified'):
+            headers['If-Modified-Since'] = self.meta['last_modified']
+        return headers
+
+class HTTPCache:
+    """On-disk page cache with TTL, LRU eviction and conditional revalidation"""
+
+    def __init__(self, path=HTTP_CACHE_PATH, ttl=HTTP_CACHE_TTL,
+                 max_entries=HTTP_CACHE_MAX_ENTRIES, max_bytes=HTTP_CACHE_MAX_BYTES):
+        self.ttl = ttl
+        self.store = SQLiteStore(path, max_entries=max_entries, max_bytes=max_bytes)
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'revalidated': 0, 'misses': 0, 'stores': 0}
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def lookup(self, url):
+        key = normalize_url(url)
+        try:
+            row = self.store.get(key)
+        except sqlite3.Error as e:
+            # A broken or locked cache must never fail the crawl itself
+            logger.warning("HTTP cache read failed for %s: %s", url, e)
+            return None
+        if row is None:
+            return None
+        value, meta, stored_at = row
+        return CachedPage(key, value, meta, stored_at)
+
+    def record_hit(self):
+        self._count('hits')
+
+    def record_miss(self):
+        self._count('misses')
+
+    def revalidated(self, entry, response):
+        """A 304 came back: keep the stored body and restart its TTL"""
+        meta = dict(entry.meta)
+        meta.update(_validators(response))
+        try:
+            self.store.touch(entry.key, meta)
+        except sqlite3.Error as e:
+            logger.warning("HTTP cache update failed for %s: %s", entry.key, e)
+        self._count('revalidated')
+
+    def store_response(self, url, response, content, encoding):
+        """Keep a 200 response's body (`content`, already decoded from any Content-Encoding)"""
+        if response.status_code != 200:
+            return
+        if 'no-store' in response.headers.get('Cache-Control', '').lower():
+            return
+        meta = _validators(response)
+        meta['status_code'] = response.status_code
+        meta['encoding'] = encoding
+        try:
+            self.store.put(normalize_url(url), content, meta)
+        except sqlite3.Error as e:
+            logger.warning("HTTP cache write failed for %s: %s", url, e)
+            return
+        self._count('stores')
+
+    def stats(self):
+        """Hit/miss counters for this process; a revalidated page counts as a hit"""
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats['hits'] + stats['revalidated'] + stats['misses']
+        stats['hit_ratio'] = round((stats['hits'] + stats['revalidated']) / lookups, 3) if lookups else 0.0
+        return stats
+
+def _validators(response):
+    meta = {}
+    if response.headers.get('ETag'):
+        meta['etag'] = response.headers['ETag']
+    if response.headers.get('Last-Modified'):
+        meta['last_modified'] = response.headers['Last-Modified']
+    return meta
+
+def get_http_cache():
+    """Process-wide HTTP cache, or None when disabled or the cache file can't be opened"""
+    global _cache, HTTP_CACHE_ENABLED
+    if not HTTP_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                try:
+                    _cache = HTTPCache()
+                except (OSError, sqlite3.Error) as e:
+                    logger.warning("HTTP cache disabled: %s", e)
+                    HTTP_CACHE_ENABLED = False
+                    return None
+    return _cache
+
+def stats():
+    cache = get_http_cache()
+    return cache.stats() if cache else {}
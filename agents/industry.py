@@ -0,0 +1,115 @@
+"""Industry classification shared by every agent.
+
+The keyword taxonomy is compiled at import into one pattern, factored into a
+trie so terms sharing a prefix are tried together. A profile's services are
+scanned once and every industry is scored in the same pass. Terms match whole
+words (with an optional plural), so "ai" no longer fires inside "maintenance".
+A profile is classified once; the result is kept on it and reused by the
+consultant, campaign and portfolio planners.
+"""
+import re
+
+GENERAL = 'general'
+
+# industry -> (term, weight); listed in tie-break order
+TAXONOMY = {
+    'hvac': [
+        ('hvac', 3), ('air conditioning', 3), ('heating', 2), ('cooling', 2), ('furnace', 2),
+        ('heat pump', 2), ('ventilation', 2), ('boiler', 2), ('ac', 1), ('duct', 1),
+        ('thermostat', 1), ('plumbing', 1), ('electrical', 1),
+    ],
+    'tech': [
+        ('software', 3), ('saas', 3), ('machine learning', 3), ('technology', 2), ('tech', 2),
+        ('ai', 2), ('cloud', 2), ('data analytics', 2), ('app development', 2),
+        ('web development', 2), ('cybersecurity', 2), ('devops', 2), ('it services', 2),
+        ('ml', 1), ('api', 1),
+    ],
+}
+
+# Hostnames run words together, so the domain fallback matches substrings of these
+DOMAIN_TERMS = {
+    'hvac': ['hvac', 'heating', 'cooling', 'air', 'belred'],
+    'tech': ['fission', 'tech', 'labs'],
+}
+
+LABELS = {
+    'hvac': "HVAC and energy services",
+    'tech': "technology and software",
+    GENERAL: "professional services",
+}
+
+# Words of a multi-word term may be separated by spaces or hyphens
+WORD_GAP = r'[\s-]+'
+WORD_GAP_RUN = re.compile(WORD_GAP)
+
+# Weight added to the total when computing confidence, so one weak keyword isn't
+# reported as certainty
+EVIDENCE_PRIOR = 2.0
+
+def _trie_pattern(terms):
+    """Regex for a set of terms, factored into a trie so shared prefixes are tried once"""
+    trie = {}
+    for term in terms:
+        node = trie
+        for char in term:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def build(node):
+        branches = [(WORD_GAP if char == ' ' else re.escape(char)) + build(child)
+                    for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        pattern = '(?:' + '|'.join(branches) + ')'
+        return pattern + '?' if '' in node else pattern
+
+    return build(trie)
+
+def _compile(taxonomy, whole_words=True):
+    """One pattern for the whole taxonomy (matched against lowercased text); returns it with
+    {term: (industry, weight)}"""
+    weights = {term: (industry, weight) for industry, entries in taxonomy.items() for term, weight in entries}
+    pattern = '(' + _trie_pattern(weights) + ')'
+    if whole_words:
+        pattern = r'\b' + pattern + r'(?:e?s)?\b'
+    return re.compile(pattern), weights
+
+SCANNER, TERM_WEIGHTS = _compile(TAXONOMY)
+DOMAIN_SCANNER, DOMAIN_WEIGHTS = _compile(
+    {industry: [(term, 1) for term in terms] for industry, terms in DOMAIN_TERMS.items()}, whole_words=False
+)
+
+def _best(scores):
+    total = sum(scores.values())
+    if not total:
+        return GENERAL, 0.0
+    industry = max(scores, key=scores.get)  # first listed wins a tie
+    return industry, round(scores[industry] / (total + EVIDENCE_PRIOR), 3)
+
+def score(texts, scanner=SCANNER, weights=TERM_WEIGHTS):
+    """Keyword weight per industry over all of `texts`, in one scan"""
+    scores = dict.fromkeys(TAXONOMY, 0)
+    for term in scanner.findall('\n'.join(texts).lower()):
+        if term not in weights:
+            term = ' '.join(WORD_GAP_RUN.split(term))  # "air-conditioning" -> "air conditioning"
+        industry, weight = weights[term]
+        scores[industry] += weight
+    return scores
+
+def classify(texts):
+    """(industry, confidence) for service names or other text; GENERAL with 0.0 when nothing matches"""
+    return _best(score(texts))
+
+def classify_domain(host):
+    """Industry guessed from a hostname alone, for sites where no services were found"""
+    return _best(score([host], DOMAIN_SCANNER, DOMAIN_WEIGHTS))[0]
+
+def classify_profile(profile):
+    """The profile's industry, classified from its services on first use and cached on it"""
+    if not profile.industry:
+        profile.industry, profile.industry_confidence = classify(profile.services)
+    return profile.industry
+
+def label(industry):
+    """Industry as phrased in the consultant prompt"""
+    return LABELS.get(industry, LABELS[GENERAL])
@@ -0,0 +1,199 @@
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from agents import metrics
+from agents.log import get_logger, request_context
+
+# Pipelines running at once, and how many more may wait for a free worker
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', '4'))
+JOB_QUEUE_SIZE = int(os.getenv('JOB_QUEUE_SIZE', '32'))
+# Finished jobs are kept this long (seconds) for their status/result to be fetched
+JOB_RESULT_TTL = float(os.getenv('JOB_RESULT_TTL', '3600'))
+JOB_MAX_STORED = int(os.getenv('JOB_MAX_STORED', '500'))
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = 'queued', 'running', 'done', 'failed', 'cancelled'
+# A job in one of these never changes again
+FINAL_STATUSES = (DONE, FAILED, CANCELLED)
+
+JOB_QUEUE_SECONDS = metrics.histogram('job_queue_seconds', "Time a job waited for a free worker")
+JOB_SECONDS = metrics.histogram('job_seconds', "Time from submitting an analysis to its result, "
+                                "queueing included", ['status'])
+
+_manager = None
+_manager_lock = threading.Lock()
+
+logger = get_logger(__name__)
+
+class JobQueueFull(Exception):
+    """Every worker is busy and the waiting queue is at capacity"""
+
+class Job:
+    """One submitted pipeline run; `log` grows while it runs so callers can show progress.
+
+    Every change is also recorded as a numbered event (a finished log section,
+    a streamed token, the end of the job) so streaming clients can follow along
+    and resume after a reconnect from the last event id they saw.
+    """
+
+    def __init__(self, url):
+        self.id = uuid.uuid4().hex
+        self.url = url
+        self.status = QUEUED
+        self.log = []
+        self.events = []
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.cancel_event = threading.Event()
+        self._last_event_id = 0
+        self._changed = threading.Condition()
+
+    @property
+    def finished(self):
+        return self.status in FINAL_STATUSES
+
+    def cancel(self):
+        """Ask the job to stop; a queued job never starts, a running one drops unfinished work"""
+        self.cancel_event.set()
+
+    def emit(self, name, data):
+        with self._changed:
+            self._emit(name, data)
+
+    def _emit(self, name, data):
+        self._last_event_id += 1
+        self.events.append((self._last_event_id, name, data))
+        self._changed.notify_all()
+
+    def add_log(self, line):
+        """Append a finished section to the log and announce it"""
+        with self._changed:
+            self.log.append(line)
+            self._emit('section', line)
+
+    def snapshot(self):
+        """(log so far, id of the last event it reflects), taken atomically"""
+        with self._changed:
+            return list(self.log), self._last_event_id
+
+    def events_after(self, event_id, timeout):
+        """Events newer than `event_id`, waiting up to `timeout` seconds for one to arrive"""
+        with self._changed:
+            self._changed.wait_for(lambda: self._last_event_id > event_id or self.finished, timeout)
+            return [event for event in self.events if event[0] > event_id]
+
+    def finish(self, status, result=None, error=None):
+        with self._changed:
+            self.result = result
+            self.error = error
+            # finished_at first: pruning reads it as soon as the status says finished
+            self.finished_at = time.time()
+            self.status = status
+            # Streamed tokens only matter live; the finished sections carry the same text
+            self.events = [event for event in self.events if event[1] != 'token']
+            self._emit('end', {'status': status, 'error': error})
+
+    def to_dict(self):
+        return {
+            'job_id': self.id,
+            'url': self.url,
+            'status': self.status,
+            'log': list(self.log),
+            'result': self.result,
+            'error': self.error,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+        }
+
+class JobManager:
+    """Runs jobs on a fixed worker pool with a bounded backlog, keeping results for a while.
+
+    Jobs live in the memory of the process that accepted them, so status must be
+    polled from the same process (one web process with threads).
+    """
+
+    def __init__(self, workers=JOB_WORKERS, queue_size=JOB_QUEUE_SIZE,
+                 result_ttl=JOB_RESULT_TTL, max_stored=JOB_MAX_STORED):
+        self.result_ttl = result_ttl
+        self.max_stored = max_stored
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='job')
+        # One slot per running or waiting job; a full pool rejects instead of queueing forever
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, url, func):
+        """Queue `func(job)` and return the job at once; raises JobQueueFull when saturated"""
+        if not self._slots.acquire(blocking=False):
+            raise JobQueueFull("all job workers are busy and the queue is full")
+        job = Job(url)
+        with self._lock:
+            self._prune()
+            self._jobs[job.id] = job
+        try:
+            self._executor.submit(self._run, job, func)
+        except RuntimeError:
+            self._slots.release()
+            raise
+        return job
+
+    def _run(self, job, func):
+        if job.cancel_event.is_set():
+            self._slots.release()
+            job.finish(CANCELLED)
+            return
+        job.started_at = time.time()
+        job.status = RUNNING
+        JOB_QUEUE_SECONDS.observe(job.started_at - job.created_at)
+        try:
+            with request_context(job.id):
+                result = func(job)
+        except Exception as e:
+            logger.exception("Job %s failed: %s", job.id, e)
+            job.add_log(f"Analysis failed: {e}")
+            job.finish(FAILED, error=str(e))
+        else:
+            job.finish(CANCELLED if job.cancel_event.is_set() else DONE, result=result)
+        finally:
+            self._slots.release()
+            JOB_SECONDS.observe(time.time() - job.created_at, status=job.status)
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def stats(self):
+        """Jobs held by this process, by status"""
+        with self._lock:
+            jobs = list(self._jobs.values())
+        counts = dict.fromkeys((QUEUED, RUNNING, DONE, FAILED, CANCELLED), 0)
+        for job in jobs:
+            counts[job.status] += 1
+        return counts
+
+    def _prune(self):
+        """Drop finished jobs past their TTL, then the oldest finished ones over the cap"""
+        now = time.time()
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.finished and now - job.finished_at > self.result_ttl]
+        for job_id in expired:
+            del self._jobs[job_id]
+        if len(self._jobs) >= self.max_stored:
+            finished = sorted((job for job in self._jobs.values() if job.finished),
+                              key=lambda job: job.finished_at)
+            for job in finished[:len(self._jobs) - self.max_stored + 1]:
+                del self._jobs[job.id]
+
+def get_job_manager():
+    """Process-wide job manager"""
+    global _manager
+    if _manager is None:
+        with _manager_lock:
+            if _manager is None:
+                _manager = JobManager()
+    return _manager
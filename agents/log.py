@@ -0,0 +1,126 @@
+"""Logging for the agents: records are queued by the calling thread and written by one
+background thread, so a slow or contended stderr never stalls an analysis.
+
+Use `logger = get_logger(__name__)` and pass arguments instead of formatting, e.g.
+`logger.debug("Found service: %s", name)`; disabled levels then cost one check.
+Every record carries the id bound with `request_context()` (the job id in the
+web app), also in threads started with `run_in_context()`, so the lines of one
+analysis can be picked out of interleaved output.
+"""
+import atexit
+import contextlib
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+# 'text' for people, 'json' (one object per line) for log pipelines
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'text')
+# Records waiting for the writer thread; beyond this they are dropped, not waited for
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000'))
+
+ROOT_LOGGER = 'agents'
+TEXT_FORMAT = '%(asctime)s %(levelname)-7s %(name)s [%(request_id)s] %(message)s'
+
+_request_id = contextvars.ContextVar('request_id', default='-')
+_listener = None
+_setup_lock = threading.Lock()
+_dropped = 0
+_dropped_lock = threading.Lock()
+
+def current_request_id():
+    return _request_id.get()
+
+@contextlib.contextmanager
+def request_context(request_id):
+    """Tag every record logged inside the block (in this thread) with `request_id`"""
+    token = _request_id.set(request_id)
+    try:
+        yield
+    finally:
+        _request_id.reset(token)
+
+def run_in_context(func):
+    """`func` wrapped to run in the caller's context (a fresh copy per call, so calls may
+    overlap), for handing to a thread pool: pool threads don't inherit the
+    submitter's request id otherwise"""
+    context = contextvars.copy_context()
+    return lambda *args, **kwargs: context.copy().run(func, *args, **kwargs)
+
+class RequestIdFilter(logging.Filter):
+    def filter(self, record):
+        record.request_id = _request_id.get()
+        return True
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            'level': record.levelname,
+            'logger': record.name,
+            'request_id': getattr(record, 'request_id', '-'),
+            'thread': record.threadName,
+            'message': record.getMessage(),
+        }
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """Hands records to the writer thread without ever blocking the caller"""
+
+    def prepare(self, record):
+        # Only merge the arguments here; timestamps and layout are rendered by the writer
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        global _dropped
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with _dropped_lock:
+                _dropped += 1
+
+def setup(level=None, fmt=LOG_FORMAT, stream=None):
+    """Route the agents' loggers through the queue to `stream` (stderr by default) at
+    `level` (default LOG_LEVEL). Safe to call again; later calls only change the level."""
+    global _listener
+    logger = logging.getLogger(ROOT_LOGGER)
+    with _setup_lock:
+        if level is not None:
+            logger.setLevel(level)
+        if _listener is not None:
+            return logger
+        if level is None:
+            logger.setLevel(LOG_LEVEL)
+        records = queue.Queue(LOG_QUEUE_SIZE)
+        handler = NonBlockingQueueHandler(records)
+        handler.addFilter(RequestIdFilter())
+        output = logging.StreamHandler(stream or sys.stderr)
+        output.setFormatter(JsonFormatter() if fmt == 'json' else logging.Formatter(TEXT_FORMAT))
+        _listener = logging.handlers.QueueListener(records, output)
+        _listener.start()
+        atexit.register(_listener.stop)  # flush what's queued on exit
+        logger.addHandler(handler)
+        # Handled here; don't print twice when the host app configures the root logger
+        logger.propagate = False
+    return logger
+
+def get_logger(name):
+    setup()
+    return logging.getLogger(name)
+
+def stats():
+    return {'queued': _listener.queue.qsize() if _listener else 0, 'dropped': _dropped}
@@ -0,0 +1,179 @@
+"""Counters, gauges and histograms rendered in the Prometheus text format for /metrics.
+
+Metrics are defined next to the code that records them, e.g.
+
+    FETCH_SECONDS = metrics.histogram('fetch_seconds', "Page fetch latency", ['source'])
+    FETCH_SECONDS.observe(elapsed, source='network')
+
+and live in this process only, like the rest of the per-process stats; scrape
+every worker. Numeric /stats values are exported alongside as fission_stats_* gauges.
+"""
+import bisect
+import contextlib
+import math
+import os
+import threading
+import time
+
+METRICS_PREFIX = os.getenv('METRICS_PREFIX', 'fission')
+
+# Seconds: agent stages and API calls, then the sub-millisecond work inside one page
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+FAST_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1)
+SIZE_BUCKETS = tuple(1024 * 4 ** i for i in range(9))  # 1 KB .. 64 MB
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+def _number(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Metric:
+    """A named family of values, one per combination of label values"""
+    kind = 'untyped'
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = f"{METRICS_PREFIX}_{name}"
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+            lines.extend(self._render_value(key, value) for key, value in items)
+        return '\n'.join(lines)
+
+    def _render_value(self, key, value):
+        return f"{self.name}{_labels(self.labelnames, key)} {_number(value)}"
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    @contextlib.contextmanager
+    def track(self, **labels):
+        """Count the block as in progress while it runs"""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextlib.contextmanager
+    def time(self, **labels):
+        """Observe how long the block takes, in seconds"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _render_value(self, key, value):
+        counts, total, count = value
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+            cumulative += bucket_count
+            lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, [('le', _number(bound))])} {cumulative}")
+        lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}")
+        lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {count}")
+        return '\n'.join(lines)
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        """Add a metric; defining the same name twice returns the first one"""
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def render(self, stats=None):
+        """Every metric in the text format, then the numeric leaves of `stats` (as returned
+        by /stats) as gauges named after their path, e.g. fission_stats_http_cache_hit_ratio"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        parts = [metric.render() for metric in metrics]
+        if stats:
+            parts.extend(_stats_gauges(stats))
+        return '\n'.join(parts) + '\n'
+
+def _stats_gauges(stats, path=()):
+    for key, value in stats.items():
+        name = path + (str(key),)
+        if isinstance(value, dict):
+            yield from _stats_gauges(value, name)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            full_name = f"{METRICS_PREFIX}_stats_{'_'.join(name)}"
+            yield f"# TYPE {full_name} gauge\n{full_name} {_number(value)}"
+
+REGISTRY = Registry()
+
+def counter(name, help_text, labelnames=()):
+    return REGISTRY.register(Counter(name, help_text, labelnames))
+
+def gauge(name, help_text, labelnames=()):
+    return REGISTRY.register(Gauge(name, help_text, labelnames))
+
+def histogram(name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+    return REGISTRY.register(Histogram(name, help_text, labelnames, buckets))
+
+def render(stats=None):
+    return REGISTRY.render(stats)
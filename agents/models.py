@@ -0,0 +1,90 @@
+import json
+from dataclasses import dataclass, field, fields
+from functools import lru_cache
+
+@lru_cache(maxsize=None)
+def _field_types(cls):
+    return tuple((f.name, f.type) for f in fields(cls))
+
+class Model:
+    """Shared (de)serialization for the slotted result dataclasses.
+
+    to_dict() is a shallow field copy (no dataclasses.asdict deep copy), and
+    from_dict() checks each field's type, so an agent handed the wrong shape fails
+    at the boundary instead of deep inside a formatter.
+    """
+    __slots__ = ()
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), ensure_ascii=False, separators=(',', ':'))
+
+    @classmethod
+    def from_dict(cls, data):
+        """Build from a dict; unknown keys are ignored, missing ones take their defaults"""
+        values = {}
+        for name, expected in _field_types(cls):
+            if name not in data:
+                continue
+            value = data[name]
+            if expected is float and isinstance(value, int) and not isinstance(value, bool):
+                value = float(value)  # other JSON writers may drop the .0
+            if not isinstance(value, expected):
+                raise ValueError(f"{cls.__name__}.{name} must be {expected.__name__}, got {type(value).__name__}")
+            values[name] = value
+        return cls(**values)
+
+    @classmethod
+    def from_json(cls, text):
+        return cls.from_dict(json.loads(text))
+
+@dataclass(slots=True)
+class DiscoveryProfile(Model):
+    """What discovery found on a site; `error` is set (and the lists empty) when the crawl failed"""
+    company_name: str = ''
+    website: str = ''
+    emails: list = field(default_factory=list)
+    phones: list = field(default_factory=list)
+    addresses: list = field(default_factory=list)
+    hours: list = field(default_factory=list)
+    services: list = field(default_factory=list)
+    testimonials: list = field(default_factory=list)
+    social_media: dict = field(default_factory=dict)
+    pages_analyzed: int = 0
+    # Set by industry.classify_profile on first use
+    industry: str = ''
+    industry_confidence: float = 0.0
+    error: str = ''
+
+@dataclass(slots=True)
+class Strategy(Model):
+    """The consultant's recommendations; `source` is 'claude', 'cache' or 'fallback'"""
+    company_name: str = ''
+    industry: str = ''
+    analysis: str = ''
+    source: str = ''
+    report: str = ''
+    error: str = ''
+
+@dataclass(slots=True)
+class CampaignPlan(Model):
+    """Budget split across ad platforms with the expected results"""
+    company_name: str = ''
+    industry: str = ''
+    target_audience: str = ''
+    keywords: str = ''
+    total_budget: int = 0
+    channels: dict = field(default_factory=dict)
+    metrics: dict = field(default_factory=dict)
+    report: str = ''
+    error: str = ''
+
+def as_profile(discovery_data):
+    """A DiscoveryProfile from a profile or its dict form; None for anything else"""
+    if isinstance(discovery_data, DiscoveryProfile):
+        return discovery_data
+    if isinstance(discovery_data, dict):
+        return DiscoveryProfile.from_dict(discovery_data)
+    return None
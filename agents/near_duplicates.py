@@ -0,0 +1,116 @@
+"""Near-duplicate text detection with MinHash signatures and an LSH band index.
+
+Each text is tokenized once into its set of lowercase words. Its MinHash
+signature is split into bands, and texts that share any band become candidates.
+Candidates are then confirmed with the exact word-set Jaccard similarity, so a
+match always means "more than `threshold` similar", exactly as a pairwise
+comparison would decide. With the default 20 bands of 3 rows, a pair at 0.7
+similarity becomes a candidate with probability above 0.999, and each new text
+is compared only with the handful of texts it shares a bucket with. Until
+`LSH_MIN_TEXTS` texts are accepted, new texts are compared directly against the
+precomputed token sets, which is cheaper than signing them.
+"""
+import random
+import zlib
+
+SIMILARITY_THRESHOLD = 0.7
+LSH_BANDS = 20
+LSH_ROWS = 3
+LSH_MIN_TEXTS = 64
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+def _permutations(count, seed=1):
+    """Fixed (a, b) pairs for the universal hashes h(x) = (a*x + b) mod p"""
+    rng = random.Random(seed)
+    return [(rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME)) for _ in range(count)]
+
+def tokenize(text):
+    return frozenset(text.lower().split())
+
+def jaccard(tokens, other_tokens):
+    if not tokens:
+        return 0.0
+    return len(tokens & other_tokens) / len(tokens | other_tokens)
+
+class NearDuplicateIndex:
+    """Accepts texts one by one, rejecting any that is too similar to one already accepted"""
+
+    def __init__(self, threshold=SIMILARITY_THRESHOLD, bands=LSH_BANDS, rows=LSH_ROWS,
+                 min_texts=LSH_MIN_TEXTS):
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = rows
+        self.min_texts = min_texts
+        self._permutations = _permutations(bands * rows)
+        self._buckets = None
+        self._tokens = []
+        self.texts = []
+
+    def signature(self, tokens):
+        hashes = [zlib.crc32(token.encode('utf-8')) for token in tokens]
+        if not hashes:
+            return ()
+        prime = _MERSENNE_PRIME
+        return tuple(
+            min([(a * value + b) % prime for value in hashes]) & _MAX_HASH
+            for a, b in self._permutations
+        )
+
+    def _band_keys(self, signature):
+        rows = self.rows
+        return [signature[band * rows:(band + 1) * rows] for band in range(self.bands)]
+
+    def _is_similar(self, tokens, candidate):
+        other = self._tokens[candidate]
+        # Jaccard can't exceed the ratio of the two set sizes
+        if min(len(tokens), len(other)) <= self.threshold * max(len(tokens), len(other)):
+            return False
+        return jaccard(tokens, other) > self.threshold
+
+    def _candidates(self, band_keys):
+        seen = set()
+        for bucket, key in zip(self._buckets, band_keys):
+            for candidate in bucket.get(key, ()):
+                if candidate not in seen:
+                    seen.add(candidate)
+                    yield candidate
+
+    def _index(self, position, band_keys):
+        for bucket, key in zip(self._buckets, band_keys):
+            bucket.setdefault(key, []).append(position)
+
+    def _build_buckets(self):
+        self._buckets = [{} for _ in range(self.bands)]
+        for position, tokens in enumerate(self._tokens):
+            if tokens:
+                self._index(position, self._band_keys(self.signature(tokens)))
+
+    def add(self, text):
+        """Keep `text` unless it near-duplicates an accepted text; returns True if kept"""
+        tokens = tokenize(text)
+        band_keys = None
+        if tokens:
+            if self._buckets is None and len(self.texts) >= self.min_texts:
+                self._build_buckets()
+            if self._buckets is None:
+                candidates = range(len(self.texts))
+            else:
+                band_keys = self._band_keys(self.signature(tokens))
+                candidates = self._candidates(band_keys)
+            if any(self._is_similar(tokens, candidate) for candidate in candidates):
+                return False
+        position = len(self.texts)
+        self.texts.append(text)
+        self._tokens.append(tokens)
+        if band_keys is not None:
+            self._index(position, band_keys)
+        return True
+
+def unique_texts(texts, threshold=SIMILARITY_THRESHOLD):
+    """Texts in their original order, dropping each that near-duplicates an earlier one"""
+    index = NearDuplicateIndex(threshold)
+    for text in texts:
+        index.add(text)
+    return index.texts
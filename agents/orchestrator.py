@@ -0,0 +1,145 @@
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from agents import metrics
+from agents.log import get_logger, run_in_context
+
+# Threads shared by every pipeline for running agents; a timed-out agent keeps its
+# thread until its own I/O timeouts fire, so leave headroom above JOB_WORKERS * agents
+AGENT_WORKERS = int(os.getenv('AGENT_WORKERS', '16'))
+
+DONE, FAILED, TIMED_OUT, CANCELLED, SKIPPED = 'done', 'failed', 'timed_out', 'cancelled', 'skipped'
+
+AGENT_SECONDS = metrics.histogram('agent_seconds', "Time each pipeline agent ran until it settled",
+                                  ['agent', 'status'])
+
+_executor = None
+_executor_lock = threading.Lock()
+
+logger = get_logger(__name__)
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=AGENT_WORKERS, thread_name_prefix='agent')
+    return _executor
+
+class Agent:
+    """One node of the pipeline DAG.
+
+    `run(results)` receives the results of the agents named in `requires`.
+    `timeout` (seconds, counted from when the agent is scheduled) bounds how long the
+    pipeline waits for it; on a miss its dependents are skipped and the rest of
+    the DAG carries on.
+    """
+
+    def __init__(self, name, run, requires=(), timeout=None):
+        self.name = name
+        self.run = run
+        self.requires = tuple(requires)
+        self.timeout = timeout
+
+class DagResult:
+    """Results of the agents that finished, and what happened to the others"""
+
+    def __init__(self):
+        self.results = {}
+        self.status = {}
+        self.errors = {}
+        self.elapsed = {}
+
+    @property
+    def complete(self):
+        return all(status == DONE for status in self.status.values())
+
+def _validate(agents):
+    names = [agent.name for agent in agents]
+    if len(set(names)) != len(names):
+        raise ValueError(f"duplicate agent names: {names}")
+    known = set()
+    for agent in agents:
+        missing = [name for name in agent.requires if name not in known]
+        if missing:
+            raise ValueError(f"agent '{agent.name}' requires {missing}, which must be listed before it")
+        known.add(agent.name)
+
+def run_dag(agents, on_complete=None, cancel_event=None):
+    """Run agents as soon as their requirements are met, independent ones concurrently.
+
+    `agents` must be listed in dependency order. `on_complete(name, outcome)` is
+    called from this thread as each agent settles, with the DagResult so far.
+    Setting `cancel_event` abandons everything still pending or running. Agents
+    are not interrupted mid-call (threads can't be), their results are dropped.
+    """
+    _validate(agents)
+    executor = _get_executor()
+    outcome = DagResult()
+    pending = list(agents)
+    running = {}  # future -> (agent, started, deadline)
+
+    def settle(agent, status, result=None, error=None, started=None):
+        outcome.status[agent.name] = status
+        if status == DONE:
+            outcome.results[agent.name] = result
+        if error is not None:
+            outcome.errors[agent.name] = error
+        if started is not None:
+            outcome.elapsed[agent.name] = round(time.time() - started, 3)
+            AGENT_SECONDS.observe(time.time() - started, agent=agent.name, status=status)
+        if on_complete:
+            on_complete(agent.name, outcome)
+
+    while pending or running:
+        if cancel_event is not None and cancel_event.is_set():
+            for future, (agent, started, _) in running.items():
+                future.cancel()
+                settle(agent, CANCELLED, started=started)
+            for agent in pending:
+                settle(agent, CANCELLED)
+            break
+
+        # Start everything whose requirements are settled; skip what can no longer run
+        for agent in list(pending):
+            states = [outcome.status.get(name) for name in agent.requires]
+            if any(state not in (None, DONE) for state in states):
+                pending.remove(agent)
+                settle(agent, SKIPPED, error=f"requirement did not finish: {agent.requires}")
+            elif all(state == DONE for state in states):
+                pending.remove(agent)
+                inputs = {name: outcome.results[name] for name in agent.requires}
+                started = time.time()
+                deadline = started + agent.timeout if agent.timeout else None
+                running[executor.submit(run_in_context(agent.run), inputs)] = (agent, started, deadline)
+
+        if not running:
+            continue
+
+        deadlines = [deadline for _, _, deadline in running.values() if deadline is not None]
+        wait_for = max(0.0, min(deadlines) - time.time()) if deadlines else None
+        if cancel_event is not None:
+            # Wake up now and then to notice a cancellation
+            wait_for = 0.5 if wait_for is None else min(wait_for, 0.5)
+        finished, _ = wait(list(running), timeout=wait_for, return_when=FIRST_COMPLETED)
+
+        for future in finished:
+            agent, started, _ = running.pop(future)
+            try:
+                result = future.result()
+            except Exception as e:
+                logger.warning("Agent %s failed: %s", agent.name, e)
+                settle(agent, FAILED, error=str(e), started=started)
+            else:
+                settle(agent, DONE, result=result, started=started)
+
+        now = time.time()
+        for future, (agent, started, deadline) in list(running.items()):
+            if deadline is not None and now >= deadline:
+                del running[future]
+                future.cancel()
+                logger.warning("Agent %s missed its %ss deadline", agent.name, agent.timeout)
+                settle(agent, TIMED_OUT, error=f"no result within {agent.timeout}s", started=started)
+
+    return outcome
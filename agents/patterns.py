@@ -0,0 +1,153 @@
+"""Compiled regular expressions shared by the discovery extractors.
+
+Every pattern is compiled once at import. The contact scanner combines the
+phone, street address and business hours patterns into one expression with
+named groups, so the regex engine walks page text once instead of once per
+pattern. Emails are only matched where the text has an '@'.
+"""
+import re
+
+WHITESPACE = re.compile(r'\s+')
+DIGITS = re.compile(r'\d+')
+
+# Company name cleanup
+LOGO_WORD = re.compile(r'\s*logo\s*', re.IGNORECASE)
+TITLE_SUFFIXES = [
+    re.compile(r'\s*[-|–]\s*.+$'),
+    re.compile(r'\s*\|\s*.+$'),
+    re.compile(r'\s*-\s*Home\s*$', re.IGNORECASE),
+    re.compile(r'\s*Home\s*$', re.IGNORECASE),
+]
+
+_STREET = r'\d+\s+[A-Za-z\s]+(?:Street|Avenue|Road|Boulevard|Drive|Lane|St|Ave|Rd|Blvd|Dr|Way)'
+_HOURS_RANGE = r'\s*:?\s*\d{1,2}:\d{2}\s*(?:AM|PM)\s*[-–]\s*\d{1,2}:\d{2}\s*(?:AM|PM)'
+
+# Address inside a contact section, where the comma after the street is optional
+SECTION_ADDRESS = re.compile(_STREET + r'\s*,?\s*[A-Za-z\s]+,\s*[A-Z]{2}', re.IGNORECASE)
+
+# Emails stay out of the combined scanner: their TLD run would swallow a glued-on
+# "Mon - Fri" (page text joins elements without a separator), and a branch that can
+# start at any letter would take away the scanner's first-character skip below
+EMAIL = re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b', re.IGNORECASE)
+EMAIL_LOCAL_CHARS = frozenset('ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789._%+-')
+# Every branch starts with a digit, '(' or "Mon"; the leading lookahead lets the regex
+# engine skip other positions without trying each branch there
+CONTACT_SCANNER = re.compile(
+    r'(?=[(0-9M])'
+    r'(?:(?P<phone>\b\(?(?P<area>[0-9]{3})\)?[-.\s]?(?P<exchange>[0-9]{3})[-.\s]?(?P<line>[0-9]{4})\b)'
+    r'|(?P<hours>(?:Mon|Monday)(?:(?P<through>\s+through\s+)|\s*[-–]?\s*)(?:Fri|Friday)' + _HOURS_RANGE + r')'
+    r'|(?P<address>(?P<street_city>' + _STREET + r'\s*,\s*[A-Za-z\s]+,\s*[A-Z]{2})(?P<zip>\s*\d{5})?))',
+    re.IGNORECASE
+)
+
+ADDRESS_EXCLUDE = re.compile(
+    'emergency service|quick links|book now|financing|careers|blog|customer tools|'
+    'comfort|care|years|looking forward|about us|our company'
+)
+HOURS_JUNK = re.compile(
+    'quick links|book now|financing|careers|blog|customer tools|comfort|care|emergency service'
+)
+
+# Testimonials
+TESTIMONIAL_EXCLUDE = re.compile(
+    r'we credit our success|about us|our company|quick links|book now|financing|careers|'
+    r'emergency service|years?\s+&\s+are\s+looking\s+forward|superior products that res|'
+    r'hard-working employees'
+)
+REVIEW_INDICATORS = [
+    'recommend', 'excellent', 'professional', 'great', 'satisfied',
+    'outstanding', 'quality', 'amazing', 'fantastic', 'helpful',
+    'installed', 'service', 'work', 'team', 'staff', 'technician',
+    'quick', 'fast', 'reliable', 'trust', 'experience', 'pleased'
+]
+TESTIMONIAL_PATTERNS = [
+    re.compile(r'"([^"]{30,200})"'),  # Quoted text
+    re.compile(r'[A-Z][a-z]+\s+[A-Z]\.\s+[^.]{30,200}\.'),  # Name initial + testimonial
+]
+
+SOCIAL_PATTERNS = {
+    'Facebook': re.compile(r'facebook\.com/[a-zA-Z0-9._-]+', re.IGNORECASE),
+    'LinkedIn': re.compile(r'linkedin\.com/company/[a-zA-Z0-9._-]+', re.IGNORECASE),
+    'Instagram': re.compile(r'instagram\.com/[a-zA-Z0-9._-]+', re.IGNORECASE),
+    'Twitter': re.compile(r'twitter\.com/[a-zA-Z0-9._-]+', re.IGNORECASE),
+}
+
+# Service detection: one alternation scans for every keyword at once
+# (plain substring semantics, like `keyword in text`)
+SERVICE_KEYWORDS = [
+    'solution', 'service', 'product', 'offering', 'platform',
+    'technology', 'consulting', 'analytics', 'intelligence',
+    'ai', 'data', 'machine learning', 'automation', 'optimization',
+    'installation', 'repair', 'maintenance', 'hvac', 'heating',
+    'cooling', 'air conditioning', 'furnace', 'plumbing',
+    'development', 'engineering', 'cloud', 'mobile', 'web'
+]
+SERVICE_KEYWORD = re.compile('|'.join(re.escape(keyword) for keyword in SERVICE_KEYWORDS))
+
+# Service text cleanup and validation
+SERVICE_PREFIX = re.compile(r'^(Service\s*\d*:?\s*)', re.IGNORECASE)
+LIST_MARKERS = re.compile(r'^[•\-\*\d\.\s]+')
+WEEKDAY_HOURS = re.compile(r'Mon\s*[–-]\s*Fri.*?(?:AM|PM)', re.IGNORECASE)
+CLOCK_TIME = re.compile(r'\d{1,2}:\d{2}\s*(?:AM|PM)', re.IGNORECASE)
+PHONE_LIKE = re.compile(r'\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4}')
+EMAIL_LIKE = re.compile(r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}')
+NUMBERS_ONLY = re.compile(r'^[\d\s\-\(\)]+$')
+
+class ContactScan:
+    """Emails, phones, address and hours candidates found in one pass over page text"""
+    __slots__ = ('emails', 'phones', 'addresses_with_zip', 'addresses', 'hours_dash', 'hours_through')
+
+    def __init__(self):
+        self.emails = []
+        self.phones = []
+        self.addresses_with_zip = []
+        self.addresses = []
+        self.hours_dash = []
+        self.hours_through = []
+
+def find_emails(text):
+    """EMAIL.findall(text), trying the pattern only at the local part before each '@'
+    instead of at every word of the page"""
+    emails = []
+    pos = 0
+    while True:
+        at = text.find('@', pos)
+        if at < 0:
+            return emails
+        start = at
+        while start > pos and text[start - 1] in EMAIL_LOCAL_CHARS:
+            start -= 1
+        for begin in range(start, at):
+            match = EMAIL.match(text, begin)
+            if match:
+                emails.append(match.group())
+                pos = match.end()
+                break
+        else:
+            pos = at + 1
+
+def scan_contact_text(text):
+    """Scan page text once for phones, addresses and hours, sorting matches by kind, and
+    pick out the emails around each '@'.
+
+    Address and hours candidates keep their variants apart so callers can keep
+    the old preference order: addresses with a ZIP before those without, and
+    "Mon - Fri" hours before "Mon through Fri". Phone, hours and address
+    matches never overlap each other.
+    """
+    scan = ContactScan()
+    scan.emails = find_emails(text)
+    for match in CONTACT_SCANNER.finditer(text):
+        kind = match.lastgroup
+        if kind == 'phone':
+            scan.phones.append(f"({match.group('area')}) {match.group('exchange')}-{match.group('line')}")
+        elif kind == 'hours':
+            if match.group('through'):
+                scan.hours_through.append(match.group('hours'))
+            else:
+                scan.hours_dash.append(match.group('hours'))
+        else:
+            if match.group('zip'):
+                scan.addresses_with_zip.append(match.group('address'))
+            scan.addresses.append(match.group('street_city'))
+    return scan
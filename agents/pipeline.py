@@ -0,0 +1,59 @@
+import os
+import agents.discovery as discovery
+import agents.creative as creative
+import agents.campaign as campaign
+from agents.models import CampaignPlan, DiscoveryProfile, Strategy
+from agents.orchestrator import Agent, run_dag
+from agents.single_flight import coalesce
+from agents.urls import normalize_url
+
+# How long the pipeline waits for each agent before reporting what it has
+DISCOVERY_TIMEOUT = float(os.getenv('DISCOVERY_TIMEOUT', '60'))
+CONSULTANT_TIMEOUT = float(os.getenv('CONSULTANT_TIMEOUT', '120'))
+CAMPAIGN_TIMEOUT = float(os.getenv('CAMPAIGN_TIMEOUT', '30'))
+
+def build_agents(url, on_token=None):
+    """Discovery first, then the consultant and campaign agents side by side.
+
+    Each stage is coalesced per site: a run that starts while another (in this or
+    another worker process) is analysing the same site waits for that one and
+    takes its results, giving up at the stage's own timeout. Such a run doesn't
+    stream the consultant's tokens.
+    """
+    site = normalize_url(url)
+
+    def run_discovery(inputs):
+        return coalesce(f"discovery:{site}", lambda: discovery.analyze(url), DiscoveryProfile,
+                        timeout=DISCOVERY_TIMEOUT)
+
+    def run_strategy(inputs):
+        return coalesce(f"strategy:{site}", lambda: creative.run(inputs['discovery'], on_token=on_token), Strategy,
+                        timeout=CONSULTANT_TIMEOUT)
+
+    def run_campaign(inputs):
+        return coalesce(f"campaign:{site}", lambda: campaign.run(inputs['discovery']), CampaignPlan,
+                        timeout=CAMPAIGN_TIMEOUT)
+
+    return [
+        Agent('discovery', run_discovery, timeout=DISCOVERY_TIMEOUT),
+        # Both only need the discovery profile, so the campaign plan is built during the Claude call
+        Agent('strategy', run_strategy, requires=['discovery'], timeout=CONSULTANT_TIMEOUT),
+        Agent('campaign', run_campaign, requires=['discovery'], timeout=CAMPAIGN_TIMEOUT),
+    ]
+
+def run(url, on_complete=None, cancel_event=None, on_token=None):
+    """Run every agent for one site; returns the DagResult (see orchestrator.run_dag)"""
+    return run_dag(build_agents(url, on_token), on_complete=on_complete, cancel_event=cancel_event)
+
+def summarize(outcome):
+    """The sections that finished, as plain dicts, plus each agent's status and timing, as
+    returned by the job API"""
+    sections = {}
+    for name in ('discovery', 'strategy', 'campaign'):
+        result = outcome.results.get(name)
+        sections[name] = result.to_dict() if result is not None else None
+    return {
+        **sections,
+        'agents': outcome.status,
+        'timings': outcome.elapsed,
+    }
@@ -0,0 +1,191 @@
+import argparse
+import json
+import sys
+from dataclasses import dataclass
+import numpy as np
+from agents.industry import classify_profile
+from agents.models import as_profile
+
+INDUSTRIES = ('hvac', 'tech', 'general')
+CHANNELS = ('google_ads', 'linkedin_ads', 'facebook_ads')
+CHANNEL_NAMES = ('GOOGLE ADS', 'LINKEDIN ADS', 'FACEBOOK ADS')
+
+# Calibrated to the single-company campaign plan: at its budget split each channel
+# returns its ROI target, with CPCs at the middle of its quoted ranges.
+# Rows follow INDUSTRIES, columns CHANNELS.
+REFERENCE_SPEND = np.array([[600.0, 150.0, 250.0], [400.0, 400.0, 200.0], [500.0, 350.0, 150.0]])
+BASE_CPC = np.array([[3.5, 7.5, 2.5], [5.0, 7.5, 2.5], [5.0, 7.5, 2.5]])
+ROI_TARGET = np.array([[3.5, 4.0, 2.5], [3.0, 4.0, 2.5], [3.0, 4.0, 2.5]])
+# Revenue per lead: expected revenue over target leads (midpoints)
+LEAD_VALUE = np.array([10000 / 25, 6500 / 20, 8000 / 23])
+# CPC rises linearly with spend and doubles at this multiple of the reference spend,
+# so each extra dollar on a channel buys fewer clicks than the last
+SATURATION_MULTIPLE = 4.0
+
+SATURATION = SATURATION_MULTIPLE * REFERENCE_SPEND
+# Revenue per click at zero spend; with the CPC curve this puts each channel on its
+# ROI target at the reference spend
+CLICK_VALUE = (1 + ROI_TARGET) * BASE_CPC * (1 + 1 / SATURATION_MULTIPLE)
+LEAD_RATE = CLICK_VALUE / LEAD_VALUE[:, None]
+
+@dataclass(slots=True)
+class PortfolioPlan:
+    """Spend and expected results per company (rows) and channel (columns, as CHANNELS)"""
+    companies: list
+    industries: list
+    spend: np.ndarray
+    cpc: np.ndarray
+    clicks: np.ndarray
+    leads: np.ndarray
+    revenue: np.ndarray
+
+    @property
+    def roi(self):
+        """Revenue over spend, minus one; NaN where nothing is spent"""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(self.spend > 0, self.revenue / self.spend - 1, np.nan)
+
+    def to_records(self):
+        """One JSON-ready dict per company, numbers rounded for display"""
+        records = []
+        for i, company in enumerate(self.companies):
+            channels = {}
+            for c, channel in enumerate(CHANNELS):
+                channels[channel] = {
+                    'budget': round(float(self.spend[i, c]), 2), 'cpc': round(float(self.cpc[i, c]), 2),
+                    'clicks': round(float(self.clicks[i, c]), 1), 'leads': round(float(self.leads[i, c]), 2),
+                    'revenue': round(float(self.revenue[i, c]), 2),
+                }
+            records.append({
+                'company_name': company, 'industry': self.industries[i],
+                'budget': round(float(self.spend[i].sum()), 2), 'revenue': round(float(self.revenue[i].sum()), 2),
+                'channels': channels,
+            })
+        return records
+
+def _water_fill(gain, saturation, budgets):
+    """Spend per item that maximizes revenue within each group's budget.
+
+    Arrays are (groups, items). With revenue = gain * saturation * s / (saturation + s)
+    the marginal return is gain * (saturation / (saturation + s))**2, so at the
+    optimum every funded item has the same marginal return `lam` and gets
+    saturation * (sqrt(gain / lam) - 1). Funding the k best items first, `lam`
+    for each k has a closed form; the right k is the last whose k-th item is
+    still worth funding at that `lam`.
+    """
+    order = np.argsort(-gain, axis=1)
+    gain_sorted = np.take_along_axis(gain, order, axis=1)
+    saturation_sorted = np.take_along_axis(saturation, order, axis=1)
+    funded = np.cumsum(saturation_sorted * np.sqrt(gain_sorted), axis=1)
+    lam = (funded / (budgets[:, None] + np.cumsum(saturation_sorted, axis=1))) ** 2
+    worth = gain_sorted > lam
+    last = worth.shape[1] - 1 - np.argmax(worth[:, ::-1], axis=1)
+    lam_star = np.where(worth.any(axis=1), lam[np.arange(len(lam)), last], np.inf)
+    return saturation * np.maximum(0.0, np.sqrt(gain / lam_star[:, None]) - 1)
+
+def allocate(industry_index, total_budget=None, budgets=None, reach=None):
+    """Split ad spend across Google, LinkedIn and Facebook for many companies at once.
+
+    `industry_index` holds each company's row in INDUSTRIES. Give `total_budget` to
+    spend one budget across the whole portfolio where it returns most, or `budgets`
+    for a fixed budget per company. `reach` (default 1) scales how much a company
+    can spend before its CPCs climb, e.g. by market size. Returns the spend,
+    effective CPC, clicks, leads and revenue arrays, each (companies, channels).
+    """
+    industry_index = np.asarray(industry_index, dtype=np.intp)
+    count = len(industry_index)
+    reach = np.ones(count) if reach is None else np.asarray(reach, dtype=float)
+    saturation = SATURATION[industry_index] * reach[:, None]
+    gain = (CLICK_VALUE / BASE_CPC)[industry_index]
+    if budgets is not None:
+        spend = _water_fill(gain, saturation, np.asarray(budgets, dtype=float))
+    elif total_budget is not None:
+        spend = _water_fill(gain.reshape(1, -1), saturation.reshape(1, -1),
+                            np.array([float(total_budget)])).reshape(count, len(CHANNELS))
+    else:
+        raise ValueError("give total_budget or budgets")
+
+    cpc = BASE_CPC[industry_index] * (1 + spend / saturation)
+    clicks = spend / cpc
+    leads = clicks * LEAD_RATE[industry_index]
+    revenue = leads * LEAD_VALUE[industry_index][:, None]
+    return spend, cpc, clicks, leads, revenue
+
+def plan_portfolio(profiles, total_budget=None, budgets=None, reach=None):
+    """A PortfolioPlan for discovery profiles (or their dict form); see allocate()"""
+    profiles = [as_profile(profile) for profile in profiles]
+    industries = [classify_profile(profile) for profile in profiles]
+    industry_index = [INDUSTRIES.index(industry) for industry in industries]
+    spend, cpc, clicks, leads, revenue = allocate(industry_index, total_budget, budgets, reach)
+    return PortfolioPlan([profile.company_name for profile in profiles], industries,
+                         spend, cpc, clicks, leads, revenue)
+
+def format_company(plan, i):
+    """Render one company's allocation in the campaign agent's style"""
+    total = plan.spend[i].sum()
+    roi = plan.roi[i]
+    lines = [f" PORTFOLIO ALLOCATION - {plan.companies[i] or 'Target Company'} "
+             f"({plan.industries[i].upper()}, ${total:,.0f})"]
+    for c, name in enumerate(CHANNEL_NAMES):
+        if plan.spend[i, c] <= 0:
+            lines.append(f"   • {name}: not funded")
+            continue
+        lines.append(f"   • {name}: ${plan.spend[i, c]:,.0f} ({plan.spend[i, c] / total:.0%}), "
+                     f"CPC ${plan.cpc[i, c]:.2f}, {plan.clicks[i, c]:,.0f} clicks, "
+                     f"{plan.leads[i, c]:.1f} leads, ${plan.revenue[i, c]:,.0f} revenue, ROI {roi[c]:.0%}")
+    return "\n".join(lines)
+
+def format_summary(plan):
+    spend = plan.spend.sum()
+    revenue = plan.revenue.sum()
+    lines = [" PORTFOLIO CAMPAIGN PLAN", "=" * 50,
+             f"   • Companies: {len(plan.companies)}",
+             f"   • Total Budget: ${spend:,.0f}",
+             f"   • Expected Leads: {plan.leads.sum():,.0f}",
+             f"   • Expected Revenue: ${revenue:,.0f}",
+             f"   • Portfolio ROI: {revenue / spend - 1:.0%}" if spend else "   • Portfolio ROI: n/a"]
+    for c, name in enumerate(CHANNEL_NAMES):
+        lines.append(f"   • {name}: ${plan.spend[:, c].sum():,.0f}")
+    return "\n".join(lines)
+
+def read_profiles(path):
+    """Profiles from a JSONL file of bulk/batch results (their `discovery` field) or bare profiles"""
+    profiles = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                profile = record.get('discovery', record)
+                if profile:
+                    profiles.append(profile)
+    return profiles
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Allocate one ad budget across a portfolio of companies.")
+    parser.add_argument('results', help="JSONL from agents.bulk or agents.batch, or one profile per line")
+    parser.add_argument('--budget', type=float, required=True, help="total budget for the portfolio")
+    parser.add_argument('--per-company', action='store_true',
+                        help="give every company an equal share of --budget instead of optimizing across them")
+    parser.add_argument('--json', action='store_true', help="print one JSON record per company")
+    args = parser.parse_args(argv)
+
+    profiles = read_profiles(args.results)
+    if not profiles:
+        print(" No profiles to plan for")
+        return 1
+    if args.per_company:
+        plan = plan_portfolio(profiles, budgets=np.full(len(profiles), args.budget / len(profiles)))
+    else:
+        plan = plan_portfolio(profiles, total_budget=args.budget)
+    if args.json:
+        for record in plan.to_records():
+            print(json.dumps(record, ensure_ascii=False))
+        return 0
+    print(format_summary(plan))
+    print("")
+    for i in range(len(plan.companies)):
+        print(format_company(plan, i))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
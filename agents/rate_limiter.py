@@ -0,0 +1,277 @@
+import itertools
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from agents.sqlite_store import default_cache_path
+from agents.log import get_logger
+
+# Account limits to stay under; requests and (estimated) tokens per minute
+CLAUDE_RPM = float(os.getenv('CLAUDE_RPM', '50'))
+CLAUDE_TPM = float(os.getenv('CLAUDE_TPM', '40000'))
+CLAUDE_MAX_IN_FLIGHT = int(os.getenv('CLAUDE_MAX_IN_FLIGHT', '4'))
+# 'sqlite' shares the limits between worker processes; 'memory' is per process
+CLAUDE_LIMITER_BACKEND = os.getenv('CLAUDE_LIMITER_BACKEND', 'sqlite')
+CLAUDE_LIMITER_PATH = os.getenv('CLAUDE_LIMITER_PATH', default_cache_path('claude_limiter.sqlite3'))
+# Longest a call waits for its turn before giving up
+CLAUDE_LIMITER_MAX_WAIT = float(os.getenv('CLAUDE_LIMITER_MAX_WAIT', '120'))
+# A slot whose holder died is reclaimed after this many seconds
+CLAUDE_LEASE_TTL = float(os.getenv('CLAUDE_LEASE_TTL', '300'))
+
+# Waiters check their place in line this often (a read); only the head of the line
+# takes the write lock to try for a slot. The others rewrite their entry once per
+# HEARTBEAT to keep their place; silent ones are dropped after STALE.
+POLL_INTERVAL = 0.05
+WAITER_HEARTBEAT = 1.0
+WAITER_STALE = 10.0
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+logger = get_logger(__name__)
+
+class RateLimitTimeout(Exception):
+    """No slot became free within the maximum wait"""
+
+def estimate_tokens(payload):
+    """Rough token cost of a Messages request: ~4 characters per prompt token plus max_tokens"""
+    chars = sum(len(json.dumps(message.get('content', ''))) for message in payload.get('messages', []))
+    return chars // 4 + int(payload.get('max_tokens', 0))
+
+def _new_state(now, rpm, tpm):
+    return {
+        'requests': rpm, 'tokens': tpm, 'updated': now,
+        'paused_until': 0.0, 'leases': {}, 'queue': [],
+    }
+
+class MemoryBackend:
+    """Limiter state for one process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._state = {}
+
+    def transact(self, update):
+        """Run update(state) atomically; returns what it returns"""
+        with self._lock:
+            return update(self._state)
+
+    def peek(self, view):
+        """view(state) on the current state, which it must not change"""
+        with self._lock:
+            return view(self._state)
+
+class SQLiteBackend:
+    """Limiter state in one SQLite row, so every worker process shares the same buckets"""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn().execute('CREATE TABLE IF NOT EXISTS limiter (id INTEGER PRIMARY KEY, state TEXT)')
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        return conn
+
+    def transact(self, update):
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT state FROM limiter WHERE id = 1').fetchone()
+            state = json.loads(row[0]) if row else {}
+            result = update(state)
+            conn.execute('INSERT OR REPLACE INTO limiter (id, state) VALUES (1, ?)', (json.dumps(state),))
+            conn.execute('COMMIT')
+            return result
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+
+    def peek(self, view):
+        # A plain read: under WAL it neither takes nor waits for the write lock
+        row = self._conn().execute('SELECT state FROM limiter WHERE id = 1').fetchone()
+        return view(json.loads(row[0]) if row else {})
+
+class Lease:
+    """Permission for one API request; release it when the request is over"""
+
+    def __init__(self, lease_id, tokens, waited):
+        self.id = lease_id
+        self.tokens = tokens
+        self.waited = waited
+
+class RateLimiter:
+    """Token buckets for requests and tokens per minute plus a cap on requests in flight.
+
+    Callers line up in one FIFO queue (shared by all processes with the SQLite
+    backend), so a large request at the head isn't starved by small ones behind it.
+    A 429 pauses the whole line via `pause()` instead of each caller finding out
+    on its own.
+    """
+
+    def __init__(self, backend, rpm=CLAUDE_RPM, tpm=CLAUDE_TPM, max_in_flight=CLAUDE_MAX_IN_FLIGHT,
+                 max_wait=CLAUDE_LIMITER_MAX_WAIT, lease_ttl=CLAUDE_LEASE_TTL):
+        self.backend = backend
+        self.rpm = rpm
+        self.tpm = tpm
+        self.max_in_flight = max_in_flight
+        self.max_wait = max_wait
+        self.lease_ttl = lease_ttl
+        self._tickets = itertools.count()
+        self._stats_lock = threading.Lock()
+        self._stats = {'acquired': 0, 'timeouts': 0, 'wait_seconds_total': 0.0, 'wait_seconds_max': 0.0,
+                       'waiting': 0, 'queue_depth': 0}
+
+    def _refresh(self, state, now):
+        """Refill the buckets and drop expired leases and vanished waiters"""
+        if 'updated' not in state:
+            state.update(_new_state(now, self.rpm, self.tpm))
+        elapsed = max(0.0, now - state['updated'])
+        state['requests'] = min(self.rpm, state['requests'] + elapsed * self.rpm / 60)
+        state['tokens'] = min(self.tpm, state['tokens'] + elapsed * self.tpm / 60)
+        state['updated'] = now
+        state['leases'] = {key: expires for key, expires in state['leases'].items() if expires > now}
+        state['queue'] = [entry for entry in state['queue'] if now - entry[1] < WAITER_STALE]
+
+    def acquire(self, tokens):
+        """Wait for this caller's turn and capacity for `tokens`; returns a Lease"""
+        tokens = min(tokens, self.tpm)
+        ticket = f"{os.getpid()}:{next(self._tickets)}:{uuid.uuid4().hex[:8]}"
+        started = time.time()
+        deadline = started + self.max_wait
+        self._count('waiting', 1)
+
+        def try_acquire(state):
+            now = time.time()
+            self._refresh(state, now)
+            queue = state['queue']
+            for entry in queue:
+                if entry[0] == ticket:
+                    entry[1] = now
+                    break
+            else:
+                queue.append([ticket, now])
+            self._set_queue_depth(len(queue))
+            if queue[0][0] != ticket:
+                return None, POLL_INTERVAL
+            if now < state['paused_until']:
+                return None, state['paused_until'] - now
+            if len(state['leases']) >= self.max_in_flight:
+                return None, POLL_INTERVAL
+            if state['requests'] < 1 or state['tokens'] < tokens:
+                short_requests = max(0.0, 1 - state['requests']) * 60 / self.rpm
+                short_tokens = max(0.0, tokens - state['tokens']) * 60 / self.tpm
+                return None, max(short_requests, short_tokens)
+            state['requests'] -= 1
+            state['tokens'] -= tokens
+            queue.pop(0)
+            lease_id = ticket
+            state['leases'][lease_id] = now + self.lease_ttl
+            return lease_id, 0
+
+        def place(state):
+            # Position among the live waiters, or None when not (or no longer) in line
+            now = time.time()
+            live = [entry[0] for entry in state.get('queue', []) if now - entry[1] < WAITER_STALE]
+            self._set_queue_depth(len(live))
+            return live.index(ticket) if ticket in live else None
+
+        def leave_queue(state):
+            state['queue'] = [entry for entry in state.get('queue', []) if entry[0] != ticket]
+
+        lease = None
+        heartbeat = None
+        try:
+            while True:
+                position = None
+                if heartbeat is not None and time.time() - heartbeat < WAITER_HEARTBEAT:
+                    position = self.backend.peek(place)
+                if position is None or position == 0:
+                    # Joining, heartbeat due, or first in line: take the lock
+                    lease_id, wait = self.backend.transact(try_acquire)
+                    heartbeat = time.time()
+                    if lease_id is not None:
+                        waited = heartbeat - started
+                        self._record_wait(waited)
+                        lease = Lease(lease_id, tokens, waited)
+                        return lease
+                else:
+                    wait = POLL_INTERVAL
+                if time.time() + min(wait, POLL_INTERVAL) > deadline:
+                    self._count('timeouts', 1)
+                    raise RateLimitTimeout(f"no Claude capacity within {self.max_wait:g}s")
+                time.sleep(min(max(wait, 0.01), POLL_INTERVAL * 4))
+        finally:
+            self._count('waiting', -1)
+            if lease is None:
+                # Don't hold up the line for the callers behind us
+                try:
+                    self.backend.transact(leave_queue)
+                except sqlite3.Error:
+                    pass
+
+    def release(self, lease, actual_tokens=None):
+        """Free the in-flight slot; refund the estimate when the real token count is known"""
+        def update(state):
+            self._refresh(state, time.time())
+            self._set_queue_depth(len(state['queue']))
+            state['leases'].pop(lease.id, None)
+            if actual_tokens is not None and actual_tokens < lease.tokens:
+                state['tokens'] = min(self.tpm, state['tokens'] + lease.tokens - actual_tokens)
+        self.backend.transact(update)
+
+    def pause(self, seconds):
+        """Hold every caller back, e.g. for a 429's retry-after"""
+        def update(state):
+            now = time.time()
+            self._refresh(state, now)
+            state['paused_until'] = max(state['paused_until'], now + seconds)
+        self.backend.transact(update)
+
+    def _count(self, name, delta):
+        with self._stats_lock:
+            self._stats[name] += delta
+
+    def _set_queue_depth(self, depth):
+        with self._stats_lock:
+            self._stats['queue_depth'] = depth
+
+    def _record_wait(self, waited):
+        with self._stats_lock:
+            self._stats['acquired'] += 1
+            self._stats['wait_seconds_total'] += waited
+            self._stats['wait_seconds_max'] = max(self._stats['wait_seconds_max'], waited)
+
+    def stats(self):
+        """Queue depth (all processes, as last seen) and this process's wait times"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats['wait_seconds_avg'] = round(stats['wait_seconds_total'] / stats['acquired'], 3) if stats['acquired'] else 0.0
+        stats['wait_seconds_total'] = round(stats['wait_seconds_total'], 3)
+        stats['wait_seconds_max'] = round(stats['wait_seconds_max'], 3)
+        return stats
+
+def get_rate_limiter():
+    """Process-wide limiter, on the shared SQLite backend unless it can't be opened"""
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                backend = None
+                if CLAUDE_LIMITER_BACKEND == 'sqlite':
+                    try:
+                        backend = SQLiteBackend(CLAUDE_LIMITER_PATH)
+                    except (OSError, sqlite3.Error) as e:
+                        logger.warning("Shared Claude rate limiter unavailable, limiting per process: %s", e)
+                _limiter = RateLimiter(backend or MemoryBackend())
+    return _limiter
+
+def stats():
+    return get_rate_limiter().stats()
@@ -0,0 +1,273 @@
+import contextlib
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from agents.sqlite_store import default_cache_path
+from agents.log import get_logger
+
+SINGLE_FLIGHT_ENABLED = os.getenv('SINGLE_FLIGHT_ENABLED', '1') != '0'
+# 'sqlite' also coalesces between worker processes; 'memory' only between threads
+SINGLE_FLIGHT_BACKEND = os.getenv('SINGLE_FLIGHT_BACKEND', 'sqlite')
+SINGLE_FLIGHT_PATH = os.getenv('SINGLE_FLIGHT_PATH', default_cache_path('single_flight.sqlite3'))
+# A computation whose process died is taken over after this many seconds; results
+# its waiters never collected are dropped after as long
+SINGLE_FLIGHT_LEASE_TTL = float(os.getenv('SINGLE_FLIGHT_LEASE_TTL', '300'))
+
+# Waiters in other processes check for the result this often
+POLL_INTERVAL = 0.2
+
+LEAD, WAIT, SHARED = 'lead', 'wait', 'shared'
+
+_flight = None
+_flight_lock = threading.Lock()
+
+logger = get_logger(__name__)
+
+class LeaseStore:
+    """Who is computing which key, and who is waiting for it, in SQLite so every worker
+    process sees the same leases.
+
+    A finished result is kept only for the waiters that registered while its lease
+    was held, and deleted once the last of them has collected it; a caller that
+    arrives after the computation finished starts a new one.
+    """
+
+    def __init__(self, path, lease_ttl=SINGLE_FLIGHT_LEASE_TTL):
+        self.path = path
+        self.lease_ttl = lease_ttl
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = self._conn()
+        conn.execute('CREATE TABLE IF NOT EXISTS leases (key TEXT PRIMARY KEY, owner TEXT, expires REAL,'
+                     ' waiters INTEGER NOT NULL DEFAULT 0)')
+        # Keyed by the lease owner, so a result only reaches the waiters of that computation
+        conn.execute('CREATE TABLE IF NOT EXISTS results (owner TEXT PRIMARY KEY, value TEXT,'
+                     ' waiters INTEGER, finished_at REAL)')
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        return conn
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+
+    def claim(self, key, owner, waiting_on=None):
+        """(LEAD, None) if `owner` now holds the lease; (WAIT, holder) while another owner
+        does, registering `owner` as one of its waiters; (SHARED, value) once the
+        holder `owner` is `waiting_on` has stored its result"""
+        now = time.time()
+        with self._transaction() as conn:
+            if waiting_on is not None:
+                row = conn.execute('SELECT value, waiters FROM results WHERE owner = ?', (waiting_on,)).fetchone()
+                if row is not None:
+                    value, waiters = row
+                    if waiters <= 1:
+                        conn.execute('DELETE FROM results WHERE owner = ?', (waiting_on,))
+                    else:
+                        conn.execute('UPDATE results SET waiters = waiters - 1 WHERE owner = ?', (waiting_on,))
+                    return SHARED, value
+            row = conn.execute('SELECT owner, expires FROM leases WHERE key = ?', (key,)).fetchone()
+            if row is not None and row[1] > now and row[0] != owner:
+                holder = row[0]
+                if holder != waiting_on:
+                    conn.execute('UPDATE leases SET waiters = waiters + 1 WHERE key = ?', (key,))
+                return WAIT, holder
+            # No computation running (or its holder died): this caller starts one
+            conn.execute('DELETE FROM results WHERE finished_at < ?', (now - self.lease_ttl,))
+            conn.execute('INSERT OR REPLACE INTO leases (key, owner, expires, waiters) VALUES (?, ?, ?, 0)',
+                         (key, owner, now + self.lease_ttl))
+            return LEAD, None
+
+    def finish(self, key, owner, value):
+        """Release the lease, keeping `value` for the waiters it has, if any"""
+        with self._transaction() as conn:
+            row = conn.execute('SELECT waiters FROM leases WHERE key = ? AND owner = ?', (key, owner)).fetchone()
+            if row is None:
+                return  # taken over after the lease expired; its waiters follow the new holder
+            if row[0] > 0:
+                conn.execute('INSERT OR REPLACE INTO results (owner, value, waiters, finished_at) VALUES (?, ?, ?, ?)',
+                             (owner, value, row[0], time.time()))
+            conn.execute('DELETE FROM leases WHERE key = ? AND owner = ?', (key, owner))
+
+    def abandon(self, key, owner):
+        """Give the key up without a result, so the next waiter computes it"""
+        self._conn().execute('DELETE FROM leases WHERE key = ? AND owner = ?', (key, owner))
+
+    def leave(self, key, holder):
+        """A waiter of `holder` stops waiting; it no longer counts towards the result"""
+        with self._transaction() as conn:
+            conn.execute('UPDATE leases SET waiters = waiters - 1 WHERE key = ? AND owner = ? AND waiters > 0',
+                         (key, holder))
+            conn.execute('UPDATE results SET waiters = waiters - 1 WHERE owner = ?', (holder,))
+            conn.execute('DELETE FROM results WHERE owner = ? AND waiters <= 0', (holder,))
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """Runs each key's computation once at a time, handing its result to every caller
+    that asks for the same key meanwhile.
+
+    Threads of one process attach to the running call and get the same object back
+    (or the same exception). With a LeaseStore, one thread per process takes part in
+    a cross-process lease: the holder computes and stores `model.to_json()` for the
+    waiters registered with it, which poll and rebuild it with `model.from_json()`.
+    A holder that fails gives the lease up and a waiter computes instead; one that
+    dies is taken over when its lease expires. Nothing is reused once a computation
+    has finished.
+    """
+
+    def __init__(self, store=None):
+        self.store = store
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._stats = {'calls': 0, 'computed': 0, 'coalesced': 0, 'shared': 0, 'waits': 0, 'timeouts': 0,
+                       'in_flight': 0}
+
+    def do(self, key, func, model=None, timeout=None):
+        """func() for `key`, or the result of the call already running for it. Results
+        are only shared between processes when `model` (a Model class) is given.
+        Waiting for another caller's computation raises TimeoutError after `timeout`
+        seconds; func() itself is not bounded."""
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        with self._lock:
+            self._stats['calls'] += 1
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self._stats['in_flight'] += 1
+            else:
+                self._stats['coalesced'] += 1
+        if not leader:
+            if not call.done.wait(timeout):
+                self._count('timeouts')
+                raise TimeoutError(f"{key} still running after {timeout}s")
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = self._run_shared(key, func, model, deadline)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+                self._stats['in_flight'] -= 1
+            call.done.set()
+
+    def _run_shared(self, key, func, model, deadline):
+        if self.store is None or model is None:
+            return self._compute(func)
+        owner = f"{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        holder = None
+        while True:
+            try:
+                state, value = self.store.claim(key, owner, holder)
+            except sqlite3.Error as e:
+                logger.warning("Single-flight lease unavailable for %s, computing here: %s", key, e)
+                return self._compute(func)
+            if state == SHARED:
+                try:
+                    result = model.from_json(value)
+                except ValueError as e:
+                    logger.warning("Ignoring unreadable shared result for %s: %s", key, e)
+                    return self._compute(func)
+                self._count('shared')
+                return result
+            if state == LEAD:
+                break
+            if holder is None:
+                self._count('waits')
+            holder = value
+            if deadline is not None and time.monotonic() + POLL_INTERVAL > deadline:
+                self._leave(key, holder)
+                self._count('timeouts')
+                raise TimeoutError(f"{key} still running in another worker")
+            time.sleep(POLL_INTERVAL)
+
+        try:
+            result = self._compute(func)
+        except BaseException:
+            self._release(key, owner)
+            raise
+        try:
+            self.store.finish(key, owner, result.to_json())
+        except (TypeError, ValueError, sqlite3.Error) as e:
+            logger.warning("Could not share result for %s: %s", key, e)
+            self._release(key, owner)
+        return result
+
+    def _compute(self, func):
+        self._count('computed')
+        return func()
+
+    def _release(self, key, owner):
+        try:
+            self.store.abandon(key, owner)
+        except sqlite3.Error:
+            pass  # the lease expires on its own
+
+    def _leave(self, key, holder):
+        try:
+            self.store.leave(key, holder)
+        except sqlite3.Error:
+            pass  # an uncollected result is dropped after the lease TTL
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def stats(self):
+        """Calls this process made, how many ran the computation, and how many got a result
+        from another thread (coalesced) or process (shared)"""
+        with self._lock:
+            stats = dict(self._stats)
+        stats['coalesced_ratio'] = round((stats['coalesced'] + stats['shared']) / stats['calls'], 3) if stats['calls'] else 0.0
+        return stats
+
+def get_single_flight():
+    """Process-wide coalescer, or None when disabled; falls back to per-process when the
+    lease store can't be opened"""
+    global _flight
+    if not SINGLE_FLIGHT_ENABLED:
+        return None
+    if _flight is None:
+        with _flight_lock:
+            if _flight is None:
+                store = None
+                if SINGLE_FLIGHT_BACKEND == 'sqlite':
+                    try:
+                        store = LeaseStore(SINGLE_FLIGHT_PATH)
+                    except (OSError, sqlite3.Error) as e:
+                        logger.warning("Shared single-flight leases unavailable, coalescing per process: %s", e)
+                _flight = SingleFlight(store)
+    return _flight
+
+def coalesce(key, func, model=None, timeout=None):
+    """SingleFlight.do on the process-wide coalescer, or just func() when it's disabled"""
+    flight = get_single_flight()
+    return flight.do(key, func, model, timeout) if flight else func()
+
+def stats():
+    flight = get_single_flight()
+    return flight.stats() if flight else {}
@@ -0,0 +1,122 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+CACHE_DIR = os.getenv('CACHE_DIR', '.cache')
+# A hit only records its access time when the last one is older than this, so cache
+# reads don't each take the write lock; LRU order is kept to this granularity
+CACHE_TOUCH_INTERVAL = float(os.getenv('CACHE_TOUCH_INTERVAL', '60'))
+
+def default_cache_path(filename):
+    """Location of an on-disk cache file under CACHE_DIR"""
+    return os.path.join(CACHE_DIR, filename)
+
+class SQLiteStore:
+    """Small key/value store in SQLite with least-recently-used eviction.
+
+    Safe to share between threads (one connection per thread) and between
+    processes (WAL journal plus a busy timeout). Values are bytes; `meta` is a
+    JSON-serializable dict stored alongside.
+    """
+
+    def __init__(self, path, max_entries=None, max_bytes=None, touch_interval=CACHE_TOUCH_INTERVAL):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.touch_interval = touch_interval
+        self._local = threading.local()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        conn = self._conn()
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS entries ('
+            ' key TEXT PRIMARY KEY, value BLOB, meta TEXT,'
+            ' stored_at REAL, accessed_at REAL, size INTEGER)'
+        )
+        conn.execute('CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at)')
+        conn.commit()
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        """Return (value, meta, stored_at) or None, marking the entry as recently used
+        (at most once per touch_interval; other hits are read-only)"""
+        conn = self._conn()
+        row = conn.execute('SELECT value, meta, stored_at, accessed_at FROM entries WHERE key = ?',
+                           (key,)).fetchone()
+        if row is None:
+            return None
+        now = time.time()
+        if now - row[3] >= self.touch_interval:
+            # Another process may have touched it meanwhile; then there's nothing to write
+            conn.execute('UPDATE entries SET accessed_at = ? WHERE key = ? AND accessed_at < ?',
+                         (now, key, now - self.touch_interval))
+            conn.commit()
+        return row[0], json.loads(row[1] or '{}'), row[2]
+
+    def put(self, key, value, meta=None):
+        now = time.time()
+        conn = self._conn()
+        conn.execute(
+            'INSERT OR REPLACE INTO entries (key, value, meta, stored_at, accessed_at, size)'
+            ' VALUES (?, ?, ?, ?, ?, ?)',
+            (key, value, json.dumps(meta or {}), now, now, len(value))
+        )
+        conn.commit()
+        self.evict()
+
+    def touch(self, key, meta=None):
+        """Mark an entry as freshly stored without rewriting its value"""
+        now = time.time()
+        conn = self._conn()
+        if meta is None:
+            conn.execute('UPDATE entries SET stored_at = ?, accessed_at = ? WHERE key = ?', (now, now, key))
+        else:
+            conn.execute(
+                'UPDATE entries SET stored_at = ?, accessed_at = ?, meta = ? WHERE key = ?',
+                (now, now, json.dumps(meta), key)
+            )
+        conn.commit()
+
+    def delete(self, key):
+        conn = self._conn()
+        conn.execute('DELETE FROM entries WHERE key = ?', (key,))
+        conn.commit()
+
+    def purge_older_than(self, max_age):
+        conn = self._conn()
+        conn.execute('DELETE FROM entries WHERE stored_at < ?', (time.time() - max_age,))
+        conn.commit()
+
+    def evict(self):
+        """Drop least-recently-used entries until the store is within its limits"""
+        if not self.max_entries and not self.max_bytes:
+            return
+        conn = self._conn()
+        count, total = conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries').fetchone()
+        if (not self.max_entries or count <= self.max_entries) and (not self.max_bytes or total <= self.max_bytes):
+            return
+
+        excess_count = count - self.max_entries if self.max_entries else 0
+        excess_bytes = total - self.max_bytes if self.max_bytes else 0
+        doomed = []
+        for key, size in conn.execute('SELECT key, size FROM entries ORDER BY accessed_at'):
+            if excess_count <= 0 and excess_bytes <= 0:
+                break
+            doomed.append((key,))
+            excess_count -= 1
+            excess_bytes -= size
+        conn.executemany('DELETE FROM entries WHERE key = ?', doomed)
+        conn.commit()
+
+    def __len__(self):
+        return self._conn().execute('SELECT COUNT(*) FROM entries').fetchone()[0]
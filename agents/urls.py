@@ -0,0 +1,28 @@
+import re
+from urllib.parse import urlparse, urlunparse
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+def normalize_target_url(url):
+    """A URL as typed by a user, with https:// added when no scheme was given"""
+    url = (url or "").strip()
+    if not url.startswith("http"):
+        url = "https://" + url
+    return url
+
+def normalize_url(url):
+    """Canonical form of a URL, used for crawl de-duplication and cache keys"""
+    parsed = urlparse(url.strip())
+    scheme = parsed.scheme.lower()
+    netloc = parsed.netloc.lower()
+    if parsed.port and DEFAULT_PORTS.get(scheme) == parsed.port:
+        netloc = netloc.rsplit(':', 1)[0]
+    path = re.sub(r'/{2,}', '/', parsed.path or '/')
+    if len(path) > 1:
+        path = path.rstrip('/')
+    return urlunparse((scheme, netloc, path, '', parsed.query, ''))
+
+def site_key(url):
+    """Host without `www.` so apex and www pages count as the same site"""
+    netloc = urlparse(url).netloc.lower()
+    return netloc[4:] if netloc.startswith('www.') else netloc
@@ -1,40 +1,186 @@
-from flask import Flask, render_template, request
+from flask import Flask, Response, g, jsonify, redirect, render_template, request, stream_with_context, url_for
 import agents.discovery as discovery
-import agents.creative as creative
-import agents.campaign as campaign
+import agents.pipeline as pipeline
+from agents import consultant_cache, extraction_cache, http_cache, log, metrics, rate_limiter, single_flight
+from agents.jobs import FINAL_STATUSES, JobQueueFull, get_job_manager
+from agents.orchestrator import DONE
+from agents.urls import normalize_target_url
+import json
 import os
+import time
 
 app = Flask(__name__)
 
+HTTP_REQUEST_SECONDS = metrics.histogram('http_request_seconds', "Time to handle a web request (until the "
+                                         "response starts, for event streams)", ['endpoint', 'method', 'status'])
+
+@app.before_request
+def start_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_time(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint=request.endpoint or 'unknown',
+                                     method=request.method, status=response.status_code)
+    return response
+
+# Seconds between keep-alive comments on an idle event stream
+SSE_KEEPALIVE = 15
+
+# Report order: (agent, line shown when it starts, section title for errors)
+SECTIONS = [
+    ('discovery', "Discovery Agent: Starting comprehensive business intelligence analysis...", "Discovery Agent"),
+    ('strategy', "Business Consultant: Analyzing company data for strategic transformation...", "Business Consultant"),
+    ('campaign', "Campaign Agent: Creating implementation marketing strategy...", "Campaign Agent"),
+]
+
+def run_pipeline(job):
+    """Discovery first, then the consultant and campaign agents side by side, publishing sections in order"""
+    def stream_token(text):
+        if 'strategy' in published:
+            return  # the consultant missed its deadline; its section is already out
+        if text is None:
+            job.emit('draft_reset', None)
+        else:
+            job.emit('token', text)
+    
+    # Sections are published in report order even when a later agent finishes first
+    published = []
+    
+    def publish_ready(name, outcome):
+        while len(published) < len(SECTIONS):
+            agent_name, _, title = SECTIONS[len(published)]
+            status = outcome.status.get(agent_name)
+            if status is None:
+                return
+            if status == DONE:
+                result = outcome.results[agent_name]
+                job.add_log(discovery.format_report(result) if agent_name == 'discovery' else result.report)
+            else:
+                job.add_log(f"{title} {status.replace('_', ' ')}: {outcome.errors.get(agent_name, '')}")
+            published.append(agent_name)
+            if len(published) < len(SECTIONS):
+                job.add_log(SECTIONS[len(published)][1])
+    
+    job.add_log(SECTIONS[0][1])
+    outcome = pipeline.run(job.url, on_complete=publish_ready, cancel_event=job.cancel_event,
+                           on_token=stream_token)
+    
+    if outcome.complete:
+        job.add_log("All Strategic Agents Completed Successfully!")
+    else:
+        job.add_log("Strategic Agents Finished With Partial Results")
+    return pipeline.summarize(outcome)
+
 @app.route("/", methods=["GET", "POST"])
 def run_agents():
-    log = []
-    url = ""
-    
     if request.method == "POST":
-        url = request.form.get("url", "").strip()
-        if not url.startswith("http"):
-            url = "https://" + url
-        
-        # Step 1: Discovery Agent - Get both formatted output and raw data
-        log.append("Discovery Agent: Starting comprehensive business intelligence analysis...")
-        discovery_output = discovery.run(url)  # Formatted output for display
-        discovery_data = discovery.run(url, return_data=True)  # Raw data for Creative Agent
-        log.append(discovery_output)
-        
-        # Step 2: Business Consultant Agent - Use discovery data
-        log.append("Business Consultant: Analyzing company data for strategic transformation...")
-        consulting_result = creative.run(discovery_data)  # Pass structured data
-        log.append(consulting_result)
-        
-        # Step 3: Campaign Agent
-        log.append("Campaign Agent: Creating implementation marketing strategy...")
-        campaign_result = campaign.run(discovery_data)
-        log.append(campaign_result)
-        
-        log.append("All Strategic Agents Completed Successfully!")
+        url = normalize_target_url(request.form.get("url", ""))
+        try:
+            job = get_job_manager().submit(url, run_pipeline)
+        except JobQueueFull:
+            log = ["Too many analyses are running right now. Please try again in a minute."]
+            return render_template("index.html", log=log, url=url), 503
+        # Post/redirect/get: the page then polls the job instead of holding this worker
+        return redirect(url_for("run_agents", job=job.id), code=303)
+    
+    job = get_job_manager().get(request.args.get("job", ""))
+    if job is None:
+        return render_template("index.html", log=[], url="")
+    log, last_event_id = job.snapshot()
+    return render_template("index.html", log=log, url=job.url, job=job, last_event_id=last_event_id,
+                           final_statuses=FINAL_STATUSES)
+
+@app.route("/jobs", methods=["POST"])
+def submit_job():
+    payload = request.get_json(silent=True) or request.form
+    if not payload.get("url"):
+        return jsonify({'error': "'url' is required"}), 400
+    try:
+        job = get_job_manager().submit(normalize_target_url(payload["url"]), run_pipeline)
+    except JobQueueFull:
+        return jsonify({'error': 'job queue is full'}), 503, {'Retry-After': '30'}
+    status_url = url_for("job_status", job_id=job.id)
+    return jsonify({'job_id': job.id, 'status': job.status, 'status_url': status_url}), 202, {'Location': status_url}
+
+@app.route("/jobs/<job_id>", methods=["GET", "DELETE"])
+def job_status(job_id):
+    job = get_job_manager().get(job_id)
+    if job is None:
+        return jsonify({'error': 'unknown job'}), 404
+    if request.method == "DELETE":
+        job.cancel()
+        return jsonify({'job_id': job.id, 'status': job.status, 'cancel_requested': True}), 202
+    return jsonify(job.to_dict())
+
+@app.route("/jobs/<job_id>/log")
+def job_log(job_id):
+    """Rendered log entries so far, for the results page to poll"""
+    job = get_job_manager().get(job_id)
+    if job is None:
+        return "", 404
+    return render_template("log.html", log=list(job.log)), 200, {'X-Job-Status': job.status}
+
+def process_stats():
+    """Cache hit ratios, Claude rate-limiter queue depth / wait times, coalesced analyses,
+    jobs by status and the log queue for this process"""
+    return {
+        'http_cache': http_cache.stats(),
+        'extraction_cache': extraction_cache.stats(),
+        'claude_limiter': rate_limiter.stats(),
+        'consultant_cache': consultant_cache.stats(),
+        'single_flight': single_flight.stats(),
+        'jobs': get_job_manager().stats(),
+        'log': log.stats(),
+    }
+
+@app.route("/stats")
+def stats():
+    return jsonify(process_stats())
+
+@app.route("/metrics")
+def prometheus_metrics():
+    """Latency histograms and counters in the Prometheus text format, plus /stats as gauges"""
+    return metrics.render(process_stats()), 200, {'Content-Type': metrics.CONTENT_TYPE}
+
+def sse_message(event_id, name, data):
+    payload = json.dumps(data)
+    return f"id: {event_id}\nevent: {name}\ndata: {payload}\n\n"
+
+@app.route("/jobs/<job_id>/events")
+def job_events(job_id):
+    """Server-Sent Events: each finished section, the consultant's tokens as they stream, then 'end'.
+
+    Resumes after the `Last-Event-ID` header (sent by EventSource on reconnect) or `?after=`.
+    """
+    job = get_job_manager().get(job_id)
+    if job is None:
+        return jsonify({'error': 'unknown job'}), 404
+    last_id = request.headers.get("Last-Event-ID") or request.args.get("after") or "0"
+    last_id = int(last_id) if last_id.isdigit() else 0
+    
+    def stream():
+        # Flush headers straight away so the browser knows the stream is live
+        yield ": connected\n\n"
+        event_id = last_id
+        while True:
+            events = job.events_after(event_id, timeout=SSE_KEEPALIVE)
+            if not events:
+                if job.finished:
+                    return
+                yield ": keep-alive\n\n"
+                continue
+            for event_id, name, data in events:
+                if name == 'section':
+                    data = {'html': render_template("log.html", log=[data])}
+                yield sse_message(event_id, name, data)
+                if name == 'end':
+                    return
     
-    return render_template("index.html", log=log, url=url)
+    headers = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    return Response(stream_with_context(stream()), mimetype="text/event-stream", headers=headers)
 
 if __name__ == "__main__":
     # Get port from environment variable or default to 5000
@@ -0,0 +1,75 @@
+"""Parse + traversal benchmark: BeautifulSoup/html.parser with per-extractor queries
+versus one lxml parse and a single indexing walk.
+
+Run from the repository root:  python -m benchmarks.bench_parse [--repeat N]
+"""
+import argparse
+import re
+import time
+from bs4 import BeautifulSoup
+from agents.dom_index import build_dom_index
+from benchmarks.corpus import corpus
+
+BRAND_SELECTORS = [
+    'img[alt*="logo"]', 'img[alt*="brand"]', 'img[class*="logo"]',
+    '.logo img', '.brand img', '.header-logo img',
+    '[class*="logo"] img', '[class*="brand"] img'
+]
+
+def legacy_parse_and_traverse(html):
+    """The lookups the extractors made before the DOM index, each a separate tree scan"""
+    soup = BeautifulSoup(html, 'html.parser')
+    soup.get_text()
+    for selector in BRAND_SELECTORS:
+        soup.select(selector)
+    soup.find('title')
+    for element in soup.find_all(['div', 'section'], attrs={'class': re.compile(r'contact|address|location', re.I)}):
+        element.get_text()
+    for element in soup.find_all(attrs={'itemprop': re.compile(r'address|streetAddress', re.I)}):
+        element.get_text()
+    for element in soup.find_all(['div', 'p', 'blockquote', 'span'],
+                                 attrs={'class': re.compile(r'review|testimonial|feedback|comment', re.I)}):
+        element.get_text()
+    for element in soup.find_all(['blockquote', 'q']):
+        element.get_text()
+    for link in soup.find_all('a', href=True):
+        link.get_text(' ', strip=True)
+    for element in soup.find_all(['h1', 'h2', 'h3', 'h4', 'nav', 'ul', 'li', 'div']):
+        element.get_text()
+
+def indexed_parse_and_traverse(html):
+    """The same lookups served from one lxml parse and one indexing walk"""
+    index = build_dom_index(html)
+    index.text
+    index.first('title')
+    for bucket in ('contact', 'review'):
+        for node in index.by_class[bucket]:
+            index.text_of(node)
+    for node in index.itemprop_addresses + index.tagged('blockquote', 'q'):
+        index.text_of(node)
+    for link in index.anchors:
+        index.strings_of(link)
+    for node in index.tagged('h1', 'h2', 'h3', 'h4', 'nav', 'ul', 'li', 'div'):
+        index.text_of(node)
+
+def best_of(func, html, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(html)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'page':<14}{'size':>10}{'legacy ms':>12}{'indexed ms':>12}{'speedup':>10}")
+    for name, html in corpus():
+        legacy = best_of(legacy_parse_and_traverse, html, args.repeat)
+        indexed = best_of(indexed_parse_and_traverse, html, args.repeat)
+        print(f"{name:<14}{len(html):>10}{legacy * 1000:>12.1f}{indexed * 1000:>12.1f}{legacy / indexed:>9.1f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""Contact pattern benchmark: one re.findall per raw pattern string (the old extractor
+code) versus the precompiled combined scanner in agents.patterns.
+
+Run from the repository root:  python -m benchmarks.bench_patterns [--repeat N]
+"""
+import argparse
+import random
+import re
+import time
+from agents import patterns
+from agents.dom_index import build_dom_index
+from benchmarks.corpus import corpus
+
+LEGACY_EMAIL = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
+LEGACY_PHONE = r'\b\(?([0-9]{3})\)?[-.\s]?([0-9]{3})[-.\s]?([0-9]{4})\b'
+LEGACY_ADDRESSES = [
+    r'\d+\s+[A-Za-z\s]+(?:Street|Avenue|Road|Boulevard|Drive|Lane|St|Ave|Rd|Blvd|Dr|Way)\s*,\s*[A-Za-z\s]+,\s*[A-Z]{2}\s*\d{5}',
+    r'\d+\s+[A-Za-z\s]+(?:Street|Avenue|Road|Boulevard|Drive|Lane|St|Ave|Rd|Blvd|Dr|Way)\s*,\s*[A-Za-z\s]+,\s*[A-Z]{2}',
+]
+LEGACY_HOURS = [
+    r'(?:Mon|Monday)\s*[-–]?\s*(?:Fri|Friday)\s*:?\s*\d{1,2}:\d{2}\s*(?:AM|PM)\s*[-–]\s*\d{1,2}:\d{2}\s*(?:AM|PM)',
+    r'(?:Mon|Monday)\s+through\s+(?:Fri|Friday)\s*:?\s*\d{1,2}:\d{2}\s*(?:AM|PM)\s*[-–]\s*\d{1,2}:\d{2}\s*(?:AM|PM)',
+    r'(?:Monday|Mon)\s*[-–]\s*(?:Friday|Fri)\s*:?\s*\d{1,2}:\d{2}\s*(?:AM|PM)\s*[-–]\s*\d{1,2}:\d{2}\s*(?:AM|PM)'
+]
+
+FRAGMENTS = [
+    'Call us at (425) 555-0142 today. ', 'Email info@example.com for a quote. ',
+    'Visit 1450 Northeast Bellevue Way, Bellevue, WA 98004 ', 'Find us at 77 Ocean Drive, Miami Beach, FL. ',
+    'Open Mon - Fri: 8:00 AM - 5:00 PM ', 'Monday through Friday 9:00 AM - 6:00 PM ',
+    'Serving 25 cities with 300 technicians and 40 years of experience. ',
+    'We install, repair and maintain heating and cooling systems for homes and businesses. ',
+    'Order 12345 shipped. ', 'Fax 206.555.0199 ', 'sales@acme-hvac.co ',
+]
+
+def legacy_scan(text):
+    """Seven separate passes over the text with uncompiled pattern strings"""
+    emails = re.findall(LEGACY_EMAIL, text, re.IGNORECASE)
+    phones = [f"({m[0]}) {m[1]}-{m[2]}" for m in re.findall(LEGACY_PHONE, text)]
+    addresses = [re.findall(pattern, text, re.IGNORECASE) for pattern in LEGACY_ADDRESSES]
+    hours = [re.findall(pattern, text, re.IGNORECASE) for pattern in LEGACY_HOURS]
+    return emails, phones, addresses, hours
+
+def combined_scan(text):
+    return patterns.scan_contact_text(text)
+
+def same_result(text):
+    """The combined scanner finds the same candidates the separate passes did"""
+    emails, phones, addresses, hours = legacy_scan(text)
+    scan = combined_scan(text)
+    return (
+        scan.emails == emails and scan.phones == phones
+        and scan.addresses_with_zip == addresses[0] and scan.addresses == addresses[1]
+        and scan.hours_dash == hours[0] and scan.hours_through == hours[1]
+    )
+
+def text_blobs():
+    """Page text from the corpus plus a large blob dense with contact-like fragments"""
+    blobs = [(name, build_dom_index(html).text) for name, html in corpus()]
+    rng = random.Random(11)
+    blobs.append(('contact_dense', ''.join(rng.choice(FRAGMENTS) for _ in range(20000))))
+    return blobs
+
+def best_of(func, text, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(text)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'text':<14}{'chars':>10}{'legacy ms':>12}{'combined ms':>13}{'speedup':>10}  same result")
+    for name, text in text_blobs():
+        legacy = best_of(legacy_scan, text, args.repeat)
+        combined = best_of(combined_scan, text, args.repeat)
+        print(f"{name:<14}{len(text):>10}{legacy * 1000:>12.2f}{combined * 1000:>13.2f}"
+              f"{legacy / combined:>9.1f}x  {same_result(text)}")
+
+if __name__ == '__main__':
+    main()
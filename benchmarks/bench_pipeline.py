@@ -0,0 +1,227 @@
+"""End-to-end pipeline benchmark, fully offline: recorded sites served locally and a stub
+Messages API with configurable latency and 429s.
+
+Times every stage on each site (fetch, parse, each extractor, the consultant, the
+campaign agent, report formatting and the whole pipeline), writes the medians as
+JSON, and with --baseline fails when a stage got much slower than in a saved run.
+
+Run from the repository root:
+    python -m benchmarks.bench_pipeline --out baseline.json
+    python -m benchmarks.bench_pipeline --baseline baseline.json [--out latest.json]
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from benchmarks.stubs import SiteServer, StubMessagesAPI, generated_sites, load_sites, save_sites
+
+# Every run starts cold: no page, extraction, consultant or coalescing cache, and no
+# shared limiter state from other processes. Read by the agents at import, so main()
+# imports them after setting these.
+BENCH_ENV = {
+    'HTTP_CACHE_ENABLED': '0',
+    'EXTRACTION_CACHE_SIZE': '0',
+    'EXTRACTION_CACHE_DISK': '0',
+    'CONSULTANT_CACHE_ENABLED': '0',
+    'SINGLE_FLIGHT_ENABLED': '0',
+    'CLAUDE_LIMITER_BACKEND': 'memory',
+    'CLAUDE_RPM': '100000',
+    'CLAUDE_TPM': '100000000',
+    'CLAUDE_BACKOFF_BASE': '0.05',
+    # Injected 429s would otherwise log a retry warning each
+    'LOG_LEVEL': 'ERROR',
+}
+
+def median_ms(timings):
+    return round(statistics.median(timings) * 1000, 3)
+
+class StageTimer:
+    """Collects repeated timings per stage"""
+
+    def __init__(self):
+        self.timings = {}
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - started)
+
+    def add(self, name, seconds):
+        self.timings.setdefault(name, []).append(seconds)
+
+    def medians(self):
+        return {name: median_ms(timings) for name, timings in self.timings.items()}
+
+def time_into(totals, name, func, *args):
+    """Call func(*args), adding its duration to totals[name]; returns its result"""
+    started = time.perf_counter()
+    result = func(*args)
+    totals[name] = totals.get(name, 0.0) + time.perf_counter() - started
+    return result
+
+def bench_site(base_url, pages, repeat):
+    """Median milliseconds per stage for one site served at `base_url`"""
+    from agents import discovery, patterns, pipeline
+    from agents.campaign import FormattedCampaignAgent
+    from agents.creative import WorldClassBusinessConsultant
+    from agents.dom_index import build_dom_index
+    from agents.fetcher import fetch_pages
+
+    timer = StageTimer()
+    page_urls = [base_url + path for path in pages]
+    consultant = WorldClassBusinessConsultant()
+    campaign_agent = FormattedCampaignAgent()
+    # One untimed pass warms up connections and lazily built state
+    outcome = pipeline.run(base_url)
+    profile = outcome.results['discovery']
+
+    for _ in range(repeat):
+        with timer.stage('fetch'):
+            fetched = fetch_pages(page_urls)
+        parse_time = 0.0
+        extract_times = {}
+        for page in fetched:
+            started = time.perf_counter()
+            index = build_dom_index(page.content, page.encoding)
+            text = index.text
+            parse_time += time.perf_counter() - started
+            contact_scan = time_into(extract_times, 'scan_contact_text', patterns.scan_contact_text, text)
+            for name, func, *func_args in [
+                ('extract_company_name', discovery.extract_company_name, index, page.url),
+                ('extract_real_address', discovery.extract_real_address, index, contact_scan),
+                ('extract_clean_business_hours', discovery.extract_clean_business_hours, contact_scan),
+                ('extract_services_dynamically', discovery.extract_services_dynamically, index, text, page.url),
+                ('extract_unique_testimonials', discovery.extract_unique_testimonials, index, text),
+                ('extract_social_media', discovery.extract_social_media, index, page.text),
+                ('extract_links', discovery.extract_links, index),
+            ]:
+                time_into(extract_times, name, func, *func_args)
+        timer.add('parse', parse_time)
+        for name, seconds in extract_times.items():
+            timer.add(name, seconds)
+
+        with timer.stage('consultant'):
+            analysis, _, source = consultant.analyze_company_with_claude(profile)
+        with timer.stage('campaign'):
+            market_analysis = campaign_agent.analyze_target_market(profile)
+            strategies, total_budget = campaign_agent.generate_platform_strategy(market_analysis)
+            success_metrics = campaign_agent.calculate_success_metrics(total_budget, market_analysis['industry'])
+        with timer.stage('format_discovery'):
+            discovery.format_report(profile)
+        with timer.stage('format_strategy'):
+            consultant.format_world_class_output(analysis, profile)
+        with timer.stage('format_campaign'):
+            campaign_agent.format_campaign_output(market_analysis, strategies, total_budget, success_metrics)
+
+        with timer.stage('pipeline'):
+            outcome = pipeline.run(base_url)
+        for name, seconds in outcome.elapsed.items():
+            timer.add(f"pipeline.{name}", seconds)
+    return timer.medians(), source
+
+def compare(results, baseline, tolerance, min_delta_ms):
+    """(report lines, regressions) for stages slower than the baseline by more than
+    `tolerance` (a fraction) and `min_delta_ms`"""
+    lines = []
+    regressions = []
+    for site, stages in sorted(results['timings_ms'].items()):
+        for stage, current in stages.items():
+            previous = baseline.get('timings_ms', {}).get(site, {}).get(stage)
+            if previous is None:
+                continue
+            change = (current - previous) / previous if previous else 0.0
+            regressed = change > tolerance and current - previous > min_delta_ms
+            lines.append(f"{site:<14}{stage:<30}{previous:>12.2f}{current:>12.2f}{change:>+9.0%}"
+                         f"{'  REGRESSION' if regressed else ''}")
+            if regressed:
+                regressions.append((site, stage, previous, current))
+    return lines, regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sites', help="directory of recorded sites (<site>/<page>.html); default: generated corpus")
+    parser.add_argument('--record', metavar='DIR', help="write the generated corpus to DIR in the --sites layout and exit")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--site-latency', type=float, default=0.0, help="seconds added to every page response")
+    parser.add_argument('--claude-latency', type=float, default=0.2, help="seconds before the stub answers")
+    parser.add_argument('--claude-429-every', type=int, default=0,
+                        help="reject every Nth Messages request with a 429 (0: never)")
+    parser.add_argument('--claude-retry-after', type=float, default=0.05)
+    parser.add_argument('--out', help="write the results here as JSON")
+    parser.add_argument('--baseline', help="results JSON from an earlier run to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.5,
+                        help="fail when a stage is slower than the baseline by more than this fraction")
+    parser.add_argument('--min-delta-ms', type=float, default=1.0,
+                        help="ignore slowdowns smaller than this, which are mostly noise")
+    args = parser.parse_args(argv)
+
+    if args.record:
+        save_sites(generated_sites(), args.record)
+        print(f" Wrote the generated corpus to {args.record}")
+        return 0
+    sites = load_sites(args.sites) if args.sites else generated_sites()
+
+    claude = StubMessagesAPI(latency=args.claude_latency, rate_limit_every=args.claude_429_every,
+                             retry_after=args.claude_retry_after)
+    os.environ.update(BENCH_ENV)
+    os.environ['CLAUDE_API_URL'] = claude.url
+    os.environ['CACHE_DIR'] = tempfile.mkdtemp(prefix='bench-pipeline-')
+
+    results = {
+        'meta': {
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'), 'python': platform.python_version(),
+            'repeat': args.repeat, 'site_latency': args.site_latency, 'claude_latency': args.claude_latency,
+            'claude_429_every': args.claude_429_every,
+        },
+        'timings_ms': {},
+        'sources': {},
+    }
+    for site, pages in sites.items():
+        server = SiteServer(pages, latency=args.site_latency)
+        try:
+            timings, source = bench_site(server.base_url, pages, args.repeat)
+        finally:
+            server.stop()
+        results['timings_ms'][site] = timings
+        results['sources'][site] = source
+        size = sum(len(html) for html in pages.values())
+        print(f" {site}: {len(pages)} pages, {size / 1024:,.0f} KB, pipeline {timings['pipeline']:.1f} ms "
+              f"(consultant answer from {source})")
+    results['claude'] = {'requests': claude.requests, 'rate_limited': claude.rate_limited}
+    claude.stop()
+
+    print("")
+    print(f"{'site':<14}{'stage':<30}{'median ms':>12}")
+    for site, stages in results['timings_ms'].items():
+        for stage, value in stages.items():
+            print(f"{site:<14}{stage:<30}{value:>12.2f}")
+
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n Results written to {args.out}")
+
+    if not args.baseline:
+        return 0
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    lines, regressions = compare(results, baseline, args.tolerance, args.min_delta_ms)
+    print("")
+    print(f"{'site':<14}{'stage':<30}{'baseline ms':>12}{'now ms':>12}{'change':>9}")
+    print("\n".join(lines))
+    if regressions:
+        print(f"\n {len(regressions)} stage(s) regressed by more than {args.tolerance:.0%} against {args.baseline}")
+        return 1
+    print(f"\n No regressions against {args.baseline}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
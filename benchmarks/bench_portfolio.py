@@ -0,0 +1,50 @@
+"""Campaign planning benchmark: the single-company campaign agent called once per company
+versus the vectorized portfolio planner in agents.portfolio, on synthetic portfolios.
+
+Run from the repository root:  python -m benchmarks.bench_portfolio [--sizes 100 1000 10000]
+"""
+import argparse
+import contextlib
+import io
+import random
+import time
+from agents.campaign import FormattedCampaignAgent
+from agents.models import DiscoveryProfile
+from agents.portfolio import plan_portfolio
+from benchmarks.corpus import SERVICES
+
+def portfolio(size, seed=11):
+    rng = random.Random(seed)
+    return [DiscoveryProfile(company_name=f"Company {i}", services=rng.sample(SERVICES, 3)) for i in range(size)]
+
+def per_company(profiles):
+    """Market analysis, platform split and metrics strings for each company in turn"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        agent = FormattedCampaignAgent()
+    plans = []
+    for profile in profiles:
+        market_analysis = agent.analyze_target_market(profile)
+        strategies, total_budget = agent.generate_platform_strategy(market_analysis)
+        plans.append((strategies, agent.calculate_success_metrics(total_budget, market_analysis['industry'])))
+    return plans
+
+def timed(func, *args, **kwargs):
+    started = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - started
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000])
+    args = parser.parse_args()
+
+    print(f"{'companies':>10}{'per-company ms':>16}{'portfolio ms':>14}{'fixed budgets ms':>18}")
+    for size in args.sizes:
+        # Fresh profiles each time: the industry is cached on a profile once classified
+        _, legacy_time = timed(per_company, portfolio(size))
+        _, total_time = timed(plan_portfolio, portfolio(size), total_budget=1000.0 * size)
+        _, fixed_time = timed(plan_portfolio, portfolio(size), budgets=[1000.0] * size)
+        print(f"{size:>10}{legacy_time * 1000:>16.1f}{total_time * 1000:>14.1f}{fixed_time * 1000:>18.1f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""Service extraction benchmark: per-element get_text() scan with pairwise dedup versus
+the span-based single pass in agents.discovery.
+
+Run from the repository root:  python -m benchmarks.bench_services [--repeat N]
+"""
+import argparse
+import contextlib
+import io
+import time
+from agents import discovery, patterns
+from agents.dom_index import build_dom_index
+from benchmarks.corpus import corpus
+
+LEGACY_KEYWORDS = patterns.SERVICE_KEYWORDS
+
+def legacy_extract_services(index):
+    """The previous algorithm: full text of every element, keyword loop, O(n^2) dedup"""
+    services = set()
+    for element in index.tagged(*discovery.SERVICE_TAGS):
+        element_text = index.text_of(element).strip()
+        if len(element_text) < 3 or len(element_text) > 80:
+            continue
+        if any(keyword in element_text.lower() for keyword in LEGACY_KEYWORDS):
+            cleaned_service = discovery.clean_service_text(element_text)
+            if cleaned_service and discovery.is_valid_service(cleaned_service) and 5 < len(cleaned_service) < 60:
+                services.add(cleaned_service)
+    final_services = []
+    for service in sorted(services):
+        if not any(service.lower() in existing.lower() or existing.lower() in service.lower()
+                   for existing in final_services):
+            final_services.append(service)
+    return final_services[:6]
+
+def current_extract_services(index):
+    # Span metrics are built lazily per page; include that cost in every run
+    index._metrics = None
+    with contextlib.redirect_stdout(io.StringIO()):
+        return discovery.extract_services_dynamically(index, index.text, 'https://example.com')
+
+def best_of(func, index, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func(index)
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'page':<14}{'elements':>10}{'legacy ms':>12}{'current ms':>12}{'speedup':>10}  same result")
+    for name, html in corpus():
+        index = build_dom_index(html)
+        elements = len(index.tagged(*discovery.SERVICE_TAGS))
+        legacy, legacy_result = best_of(legacy_extract_services, index, args.repeat)
+        current, current_result = best_of(current_extract_services, index, args.repeat)
+        same = legacy_result == current_result or not legacy_result
+        print(f"{name:<14}{elements:>10}{legacy * 1000:>12.1f}{current * 1000:>12.1f}"
+              f"{legacy / current:>9.1f}x  {same}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""Testimonial dedup benchmark: pairwise Jaccard (the old extractor loop) versus the
+MinHash/LSH index in agents.near_duplicates, on synthetic review sets with edited copies.
+
+Run from the repository root:  python -m benchmarks.bench_testimonials [--sizes 100 500 2000]
+"""
+import argparse
+import random
+import time
+from agents.near_duplicates import unique_texts
+
+def legacy_unique(testimonials):
+    """Compare each candidate with every accepted one, re-tokenizing both each time"""
+    final_testimonials = []
+    for testimonial in testimonials:
+        is_similar = False
+        for existing in final_testimonials:
+            testimonial_words = set(testimonial.lower().split())
+            existing_words = set(existing.lower().split())
+            if len(testimonial_words) > 0:
+                similarity = len(testimonial_words & existing_words) / len(testimonial_words | existing_words)
+                if similarity > 0.7:
+                    is_similar = True
+                    break
+        if not is_similar:
+            final_testimonials.append(testimonial)
+    return final_testimonials
+
+def review_set(size, seed=5):
+    """`size` distinct reviews: originals plus copies with a few words edited, added or dropped"""
+    rng = random.Random(seed)
+    vocab = [f"word{i}" for i in range(3000)]
+    originals = [[rng.choice(vocab) for _ in range(rng.randint(8, 35))] for _ in range(max(1, size // 5))]
+    reviews = {}
+    while len(reviews) < size:
+        words = list(rng.choice(originals))
+        for _ in range(rng.randint(0, 6)):
+            edit = rng.random()
+            if edit < 0.4 and words:
+                words[rng.randrange(len(words))] = rng.choice(vocab)
+            elif edit < 0.7:
+                words.append(rng.choice(vocab))
+            elif words:
+                words.pop(rng.randrange(len(words)))
+        reviews[' '.join(words)] = None
+    return list(reviews)
+
+def timed(func, reviews):
+    started = time.perf_counter()
+    result = func(reviews)
+    return result, time.perf_counter() - started
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 500, 2000])
+    args = parser.parse_args()
+
+    print(f"{'reviews':>8}{'unique':>8}{'pairwise ms':>13}{'lsh ms':>10}{'speedup':>10}  same result")
+    for size in args.sizes:
+        reviews = review_set(size)
+        legacy, legacy_time = timed(legacy_unique, reviews)
+        current, current_time = timed(unique_texts, reviews)
+        print(f"{size:>8}{len(current):>8}{legacy_time * 1000:>13.1f}{current_time * 1000:>10.1f}"
+              f"{legacy_time / current_time:>9.1f}x  {legacy == current}")
+
+if __name__ == '__main__':
+    main()
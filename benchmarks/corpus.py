@@ -0,0 +1,91 @@
+"""Deterministic synthetic business pages for benchmarking the discovery agent.
+
+Pages range from a small brochure site to the deeply nested markup that page
+builders (Elementor, Wix) emit, and carry the same kinds of content the
+extractors look for: contact blocks, hours, services, reviews and social links.
+"""
+import random
+
+SERVICES = [
+    'HVAC Repair', 'Furnace Installation', 'Air Conditioning Maintenance', 'Duct Cleaning Service',
+    'Cloud Migration Consulting', 'Data Analytics Platform', 'Mobile App Development',
+    'Machine Learning Solutions', 'Plumbing Repair', 'Web Development', 'Heat Pump Installation',
+    'Energy Optimization Audit'
+]
+
+REVIEWS = [
+    'Excellent service from a professional team, they installed our new furnace quickly. Highly recommend!',
+    'The technician was fast, reliable and very helpful. Great experience from start to finish.',
+    'Outstanding quality work and friendly staff. We are very pleased and will recommend them.',
+    'Amazing team, quick response and fantastic service. Trust them with any repair work.',
+    'Professional, reliable and great value. The team explained everything and the work was quality.',
+]
+
+FILLER = (
+    'We are committed to delivering value to every customer in the region with a focus on '
+    'long term relationships and transparent pricing across all of our offerings. '
+)
+
+PROFILES = {
+    # name: (sections, nesting depth, filler paragraphs per section)
+    'brochure': (4, 2, 1),
+    'medium': (20, 4, 3),
+    'builder': (60, 12, 4),
+    'huge_builder': (200, 18, 6),
+}
+
+def _nest(inner, depth, rng, prefix='elementor'):
+    for level in range(depth):
+        classes = f"{prefix}-widget-wrap {prefix}-element-{rng.randint(1000, 9999)} e-con-inner"
+        inner = f'<div class="{classes}" data-id="{rng.randint(10**6, 10**7)}">{inner}</div>'
+    return inner
+
+def generate_page(profile='medium', seed=7, company='Acme Comfort Systems'):
+    """Return the HTML for one synthetic page of the given size profile"""
+    sections, depth, filler = PROFILES[profile]
+    rng = random.Random(f"{profile}:{seed}")
+    parts = [
+        '<!DOCTYPE html><html><head>',
+        f'<title>{company} | Heating, Cooling &amp; More</title>',
+        '<style>.hero{color:red} .nav a{padding:4px}</style>',
+        '<script>window.dataLayer = window.dataLayer || []; function gtag(){}</script>',
+        '</head><body>',
+        '<header class="site-header"><div class="header-logo">'
+        f'<img src="/logo.png" alt="{company}" class="custom-logo"></div>',
+        '<nav class="main-nav"><ul>',
+        '<li><a href="/">Home</a></li><li><a href="/about-us">About Us</a></li>',
+        '<li><a href="/services">Our Services</a></li><li><a href="/contact">Contact</a></li>',
+        '<li><a href="/blog">Blog</a></li><li><a href="/reviews">Reviews</a></li>',
+        '</ul></nav></header>',
+    ]
+    for index in range(sections):
+        service = SERVICES[index % len(SERVICES)]
+        body = f'<h3 class="elementor-heading-title">{service}</h3>'
+        body += ''.join(f'<p>{FILLER}</p>' for _ in range(filler))
+        body += '<ul>' + ''.join(f'<li>{rng.choice(SERVICES)}</li>' for _ in range(3)) + '</ul>'
+        if index % 5 == 2:
+            body += f'<div class="testimonial-item"><p>{REVIEWS[index % len(REVIEWS)]}</p></div>'
+        if index % 7 == 3:
+            body += f'<blockquote>"{REVIEWS[(index + 2) % len(REVIEWS)]}"</blockquote>'
+        parts.append(_nest(body, depth, rng))
+    contact = (
+        '<section class="contact-section"><h2>Contact Us</h2>'
+        '<p>Call (425) 555-0142 or (206) 555-0199</p>'
+        '<p>Email: info@acmecomfort.com, sales@acmecomfort.com</p>'
+        '<p>1450 Northeast Bellevue Way, Bellevue, WA 98004</p>'
+        '<p>Mon - Fri: 8:00 AM - 5:00 PM</p></section>'
+    )
+    parts.append(_nest(contact, depth, rng))
+    parts.append(
+        '<footer><span itemprop="streetAddress">1450 Northeast Bellevue Way</span>'
+        '<a href="https://www.facebook.com/acmecomfort">Facebook</a>'
+        '<a href="https://www.linkedin.com/company/acme-comfort">LinkedIn</a>'
+        '<a href="https://instagram.com/acmecomfort">Instagram</a>'
+        '<a href="/privacy-policy">Privacy</a></footer>'
+    )
+    parts.append('<script>console.log("tracking pixel loaded")</script></body></html>')
+    return ''.join(parts)
+
+def corpus():
+    """(name, html) pairs covering every size profile"""
+    return [(profile, generate_page(profile)) for profile in PROFILES]
@@ -0,0 +1,191 @@
+"""Local stand-ins for the network the pipeline talks to, so benchmarks run offline.
+
+SiteServer serves a recorded (or generated) site from memory, one server per
+site so the crawler sees each on its own host. StubMessagesAPI answers Messages
+API requests after a configurable latency and can reject every Nth request with
+a 429 to exercise the client's retry path.
+"""
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from benchmarks.corpus import PROFILES, SERVICES, generate_page
+
+# Pages every generated site has, all linked from the home page's navigation
+SITE_PATHS = ['/', '/about-us', '/services', '/contact', '/reviews']
+
+ANALYSIS = "\n".join(
+    f"STRATEGY {i}: {service} growth plan. Lead with the customer reviews that mention "
+    f"fast, reliable work, bundle {service.lower()} with a maintenance plan, and measure "
+    f"booked jobs per channel every week."
+    for i, service in enumerate(SERVICES[:4], 1)
+)
+
+def generated_sites():
+    """{site name: {path: html}} for every corpus size profile"""
+    sites = {}
+    for profile in PROFILES:
+        sites[profile] = {path: generate_page(profile, seed=seed) for seed, path in enumerate(SITE_PATHS)}
+    return sites
+
+def _page_file(path):
+    return 'index.html' if path == '/' else path.strip('/').replace('/', '__') + '.html'
+
+def _page_path(filename):
+    name = filename[:-len('.html')]
+    return '/' if name == 'index' else '/' + name.replace('__', '/')
+
+def load_sites(directory):
+    """Recorded sites from `directory`/<site>/<page>.html; index.html is the home page and
+    '__' in a file name stands for '/' in the path"""
+    sites = {}
+    for site in sorted(os.listdir(directory)):
+        site_dir = os.path.join(directory, site)
+        if not os.path.isdir(site_dir):
+            continue
+        pages = {}
+        for filename in sorted(os.listdir(site_dir)):
+            if filename.endswith('.html'):
+                with open(os.path.join(site_dir, filename), encoding='utf-8') as f:
+                    pages[_page_path(filename)] = f.read()
+        if pages:
+            sites[site] = pages
+    return sites
+
+def save_sites(sites, directory):
+    """Write sites in the layout load_sites() reads, e.g. to freeze the generated corpus"""
+    for site, pages in sites.items():
+        site_dir = os.path.join(directory, site)
+        os.makedirs(site_dir, exist_ok=True)
+        for path, html in pages.items():
+            with open(os.path.join(site_dir, _page_file(path)), 'w', encoding='utf-8') as f:
+                f.write(html)
+
+class _Server:
+    """A ThreadingHTTPServer on a free local port, serving until stop()"""
+
+    def __init__(self, handler):
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.httpd.server_port}"
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+class SiteServer(_Server):
+    """Serves one site's pages; anything else (sitemap.xml, guessed paths) is a 404"""
+
+    def __init__(self, pages, latency=0.0):
+        self.pages = {path: html.encode('utf-8') for path, html in pages.items()}
+        self.latency = latency
+        self.requests = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Headers and body go out as separate writes; don't let Nagle hold the body back
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                server.requests += 1
+                if server.latency:
+                    time.sleep(server.latency)
+                body = server.pages.get(self.path.split('?')[0].rstrip('/') or '/')
+                self.send_response(200 if body is not None else 404)
+                body = body if body is not None else b'<html><body>Not found</body></html>'
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        super().__init__(Handler)
+
+class StubMessagesAPI(_Server):
+    """Answers POST /v1/messages with a canned analysis after `latency` seconds.
+
+    With `rate_limit_every` = N, every Nth request gets a 429 with `retry_after`.
+    Streaming requests get the analysis as server-sent text deltas.
+    """
+
+    def __init__(self, latency=0.5, rate_limit_every=0, retry_after=0.05, analysis=ANALYSIS):
+        self.latency = latency
+        self.rate_limit_every = rate_limit_every
+        self.retry_after = retry_after
+        self.analysis = analysis
+        self.requests = 0
+        self.rate_limited = 0
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                if server._should_rate_limit():
+                    self._send_json(429, {'type': 'error', 'error': {'type': 'rate_limit_error',
+                                                                     'message': 'stub rate limit'}},
+                                    {'retry-after': f"{server.retry_after:g}"})
+                    return
+                time.sleep(server.latency)
+                if payload.get('stream'):
+                    self._send_stream()
+                else:
+                    self._send_json(200, {
+                        'type': 'message', 'role': 'assistant',
+                        'content': [{'type': 'text', 'text': server.analysis}],
+                        'usage': {'input_tokens': 800, 'output_tokens': len(server.analysis) // 4},
+                    })
+
+            def _send_json(self, status, body, headers=None):
+                data = json.dumps(body).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _send_stream(self):
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.send_header('Connection', 'close')
+                self.end_headers()
+                events = [{'type': 'message_start', 'message': {'usage': {'input_tokens': 800}}}]
+                events += [{'type': 'content_block_delta', 'index': 0, 'delta': {'type': 'text_delta', 'text': line + "\n"}}
+                           for line in server.analysis.split("\n")]
+                events += [{'type': 'message_delta', 'usage': {'output_tokens': len(server.analysis) // 4}},
+                           {'type': 'message_stop'}]
+                for event in events:
+                    self.wfile.write(f"event: {event['type']}\ndata: {json.dumps(event)}\n\n".encode('utf-8'))
+                self.wfile.flush()
+                self.close_connection = True
+
+        super().__init__(Handler)
+
+    @property
+    def url(self):
+        return self.base_url + '/v1/messages'
+
+    def _should_rate_limit(self):
+        with self._lock:
+            self.requests += 1
+            if self.rate_limit_every and self.requests % self.rate_limit_every == 0:
+                self.rate_limited += 1
+                return True
+            return False